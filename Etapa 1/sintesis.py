@@ -0,0 +1,157 @@
+from collections import OrderedDict, namedtuple
+import numpy as np
+
+# Motor de síntesis del generador de señales de la Etapa 1.
+# Cada forma de onda de amplitud unitaria se guarda en un caché LRU con clave
+# (tipo, f, duty, fs, duración); la señal es la suma de las componentes y al
+# cambiar un control sólo se resta el aporte viejo y se suma el nuevo de las
+# componentes que cambiaron (un cambio de amplitud ni siquiera recalcula la
+# forma). El espectro y el THD se calculan una vez por señal, cuando se piden.
+#
+# Las formas son las mismas de scipy.signal (square con duty, sawtooth con
+# width=0.5) escritas con NumPy, para que el emulador de la Etapa 2 no dependa
+# de SciPy.
+
+TIPOS = ("Senoidal", "Cuadrada", "Triangular")
+CAPACIDAD = 64           # Formas de onda guardadas en el caché
+RESUMA_CADA = 256        # Actualizaciones incrementales antes de volver a sumar todo
+UMBRAL_PICOS = 0.05      # Picos del espectro mayores al 5% del máximo
+N_ARMONICOS = 9          # Armónicos usados para el THD (incluye la fundamental)
+
+Componente = namedtuple('Componente', 'A f tipo duty')
+Analisis = namedtuple('Analisis', 'freqs amps peak_freqs peak_amps rms thd')
+
+
+class CacheLRU:
+    # Diccionario acotado: al superar la capacidad se descarta lo usado hace más tiempo
+    def __init__(self, capacidad=CAPACIDAD):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def obtener(self, clave, calcular):
+        #Devuelve el valor de la clave; si no está lo calcula con calcular() y lo guarda
+        try:
+            valor = self._datos[clave]
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+        except KeyError:
+            pass
+        self.fallos += 1
+        valor = self._datos[clave] = calcular()
+        if len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+        return valor
+
+
+def forma_onda(tipo, f, duty, t):
+    #Forma de onda de amplitud 1; duty en % (sólo para la cuadrada)
+    fase = np.mod(2 * np.pi * f * t, 2 * np.pi)
+    if tipo == "Senoidal":
+        return np.sin(2 * np.pi * f * t)
+    if tipo == "Cuadrada":
+        return np.where(fase < 2 * np.pi * duty / 100, 1.0, -1.0)
+    if tipo == "Triangular":
+        return np.where(fase < np.pi, fase / np.pi * 2 - 1, 3 - fase / np.pi * 2)
+    raise ValueError(f"Tipo de señal desconocido: {tipo}")
+
+
+class Sintetizador:
+    def __init__(self, fs=2048, duracion=1.0, capacidad=CAPACIDAD):
+        self.fs = fs
+        self.duracion = duracion
+        self.t = np.linspace(0, duracion, int(fs * duracion), endpoint=False)
+        self.signal = np.zeros_like(self.t)
+        self.formas = CacheLRU(capacidad)
+        self.componentes = []
+        self._actualizaciones = 0
+        self._analisis = None
+        self._window = np.hanning(len(self.t))
+
+    def _forma(self, c):
+        #Forma unitaria de una componente (del caché)
+        duty = c.duty if c.tipo == "Cuadrada" else None   # duty sólo distingue cuadradas
+        clave = (c.tipo, c.f, duty, self.fs, self.duracion)
+
+        def calcular():
+            # La forma guardada se comparte entre componentes: queda de sólo lectura
+            forma = forma_onda(c.tipo, c.f, c.duty, self.t)
+            forma.flags.writeable = False
+            return forma
+        return self.formas.obtener(clave, calcular)
+
+    @staticmethod
+    def _activa(c):
+        return c is not None and c.A > 0 and c.f > 0
+
+    def actualizar(self, componentes):
+        #Ajusta la señal a la nueva lista de componentes (A, f, tipo, duty) y la devuelve
+        nuevas = [Componente(*c) for c in componentes]
+        viejas = self.componentes + [None] * (len(nuevas) - len(self.componentes))
+        viejas, sobrantes = viejas[:len(nuevas)], viejas[len(nuevas):]
+        cambios = [(v, n) for v, n in zip(viejas, nuevas) if v != n]
+        cambios += [(v, None) for v in sobrantes]
+        if not cambios:
+            return self.signal
+
+        self._actualizaciones += 1
+        if self._actualizaciones >= RESUMA_CADA:
+            # Cada tanto se vuelve a sumar todo para que no se acumule error de redondeo
+            self._actualizaciones = 0
+            self.signal = np.zeros_like(self.t)
+            cambios = [(None, n) for n in nuevas]
+
+        for vieja, nueva in cambios:
+            activa_v, activa_n = self._activa(vieja), self._activa(nueva)
+            if activa_v and activa_n and vieja._replace(A=0) == nueva._replace(A=0):
+                # Sólo cambió la amplitud: no hace falta la forma nueva
+                self.signal += (nueva.A - vieja.A) * self._forma(nueva)
+                continue
+            if activa_v:
+                self.signal -= vieja.A * self._forma(vieja)
+            if activa_n:
+                self.signal += nueva.A * self._forma(nueva)
+
+        self.componentes = nuevas
+        self._analisis = None
+        return self.signal
+
+    def analisis(self):
+        #Espectro (ventana Hanning), picos, RMS y THD de la señal actual, como en el generador
+        if self._analisis is not None:
+            return self._analisis
+        signal = self.signal
+        N = len(signal)
+        window = self._window
+        amps = (2 * np.abs(np.fft.rfft(signal * window)[:N // 2])) / N / np.mean(window)
+        freqs = np.arange(len(amps)) * (self.fs / N)
+
+        # Picos: máximos locales por encima del umbral
+        centro = amps[1:-1]
+        es_pico = ((centro > amps[:-2]) & (centro >= amps[2:])
+                   & (centro >= np.max(amps) * UMBRAL_PICOS))
+        peak_indices = np.flatnonzero(es_pico) + 1
+
+        rms_val = np.sqrt(np.mean(signal ** 2))
+
+        # THD con los primeros armónicos de la menor frecuencia cargada
+        f_nonzero = [c.f for c in self.componentes if c.f > 0]
+        if f_nonzero:
+            f1 = min(f_nonzero)
+            idx_h = np.rint(np.arange(1, N_ARMONICOS + 1) * f1 / (self.fs / N)).astype(int)
+            harmonics = amps[np.minimum(idx_h, len(amps) - 1)]
+            thd = np.sqrt(np.sum(harmonics[1:] ** 2)) / (harmonics[0] + 1e-12)
+        else:
+            thd = 0.0
+
+        self._analisis = Analisis(freqs, amps, freqs[peak_indices], amps[peak_indices], rms_val, thd)
+        return self._analisis
+
+    def tramo(self, inicio, N):
+        #N muestras desde inicio, repitiendo la señal (es periódica en la duración)
+        return np.take(self.signal, np.arange(inicio, inicio + N), mode='wrap')
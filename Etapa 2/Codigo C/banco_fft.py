@@ -0,0 +1,169 @@
+import argparse, ctypes, os, subprocess, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from punto_fijo import FormatoQ, twiddles_q   # Etapa 2/punto_fijo.py
+
+# Banco de pruebas de fft.c en la PC.
+# Compila fft.c con el gcc del sistema como biblioteca compartida, la carga
+# con ctypes y compara fft_real (y fft_complex sobre entrada real) contra
+# numpy.fft.rfft en precisión y tiempo para cada tamaño soportado.
+# fft_q15 se compara bit a bit contra FormatoQ(0, 15).fft de punto_fijo.py.
+# Con --generar regenera las tablas de twiddles de fft_twiddles.inc.
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+FFT_MAX_N = 4096                 # Debe coincidir con fft.h
+TOLERANCIA = 1e-5                # Error máximo relativo al pico del espectro
+
+
+def generar_twiddles(n_max=FFT_MAX_N, destino=os.path.join(DIRECTORIO, 'fft_twiddles.inc')):
+    #Escribe las tablas const de cos/sin(2*pi*k/n_max), k < n_max/2
+    k = np.arange(n_max // 2)
+    ang = 2 * np.pi * k / n_max
+    with open(destino, 'w') as f:
+        f.write(f"// Generado por banco_fft.py: W_{n_max}^k = cos - i*sin, k < {n_max // 2}\n")
+        f.write(f"#if FFT_MAX_N != {n_max}\n#error \"fft_twiddles.inc no coincide con FFT_MAX_N\"\n#endif\n")
+        for nombre, valores in (('fft_cos', np.cos(ang)), ('fft_sin', np.sin(ang))):
+            f.write(f"static const float {nombre}[{n_max // 2}] = {{\n")
+            for i in range(0, len(valores), 6):
+                f.write("    " + " ".join(f"{v:.9e}f," for v in valores[i:i + 6]) + "\n")
+            f.write("};\n")
+        for nombre, valores in zip(('fft_cos_q15', 'fft_sin_q15'), twiddles_q(15, n_max)):
+            f.write(f"static const int16_t {nombre}[{n_max // 2}] = {{\n")
+            for i in range(0, len(valores), 12):
+                f.write("    " + " ".join(f"{v:d}," for v in valores[i:i + 12]) + "\n")
+            f.write("};\n")
+
+
+def compilar(destino):
+    #Compila fft.c como biblioteca compartida y la carga
+    salida = os.path.join(destino, 'libfft.so')
+    subprocess.run(['gcc', '-O2', '-shared', '-fPIC', '-o', salida,
+                    os.path.join(DIRECTORIO, 'fft.c'), '-lm'], check=True)
+    lib = ctypes.CDLL(salida)
+    puntero = np.ctypeslib.ndpointer(dtype=np.float32, flags='C_CONTIGUOUS')
+    for funcion in (lib.fft_real, lib.fft_complex):
+        funcion.argtypes = [puntero, puntero, ctypes.c_int]
+        funcion.restype = ctypes.c_int
+    puntero_q15 = np.ctypeslib.ndpointer(dtype=np.int16, flags='C_CONTIGUOUS')
+    lib.fft_q15.argtypes = [puntero_q15, puntero_q15, ctypes.c_int]
+    lib.fft_q15.restype = ctypes.c_int
+    return lib
+
+
+def fft_real(lib, x):
+    #Llama a fft_real con las muestras pares/impares ya repartidas; devuelve n/2+1 bins
+    n = len(x)
+    real = np.zeros(n // 2 + 1, dtype=np.float32)
+    imag = np.zeros(n // 2 + 1, dtype=np.float32)
+    real[:n // 2] = x[0::2]
+    imag[:n // 2] = x[1::2]
+    if lib.fft_real(real, imag, n):
+        raise ValueError(f"Tamaño no soportado: {n}")
+    return real + 1j * imag.astype(np.float64)
+
+
+def fft_complex(lib, x):
+    real = np.array(x, dtype=np.float32)
+    imag = np.zeros_like(real)
+    if lib.fft_complex(real, imag, len(x)):
+        raise ValueError(f"Tamaño no soportado: {len(x)}")
+    return (real + 1j * imag.astype(np.float64))[:len(x) // 2 + 1]
+
+
+def cronometrar(lib, nombre, x, repeticiones):
+    #Tiempo medio por llamada en us; sólo se recargan los arrays de trabajo entre llamadas
+    n = len(x)
+    if nombre == 'fft_real':
+        entrada = (x[0::2].copy(), x[1::2].copy())
+        real = np.zeros(n // 2 + 1, dtype=np.float32)
+        imag = np.zeros(n // 2 + 1, dtype=np.float32)
+        destino = (real[:n // 2], imag[:n // 2])
+    else:
+        entrada = (x, np.zeros_like(x))
+        real, imag = np.zeros_like(x), np.zeros_like(x)
+        destino = (real, imag)
+    funcion = getattr(lib, nombre)
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        np.copyto(destino[0], entrada[0])
+        np.copyto(destino[1], entrada[1])
+        funcion(real, imag, n)
+    return (time.perf_counter() - t0) / repeticiones * 1e6
+
+
+def comparar(lib, tamanos, repeticiones=200, semilla=0):
+    #Imprime error y tiempos por tamaño; devuelve False si algún error supera la tolerancia
+    rng = np.random.default_rng(semilla)
+    ok = True
+    print(f"{'N':>6} {'err real':>10} {'err compleja':>12} {'real [us]':>10}"
+          f" {'compleja [us]':>14} {'numpy [us]':>11}")
+    for n in tamanos:
+        # Señal de prueba: tono con armónicos + ruido, como una trama del ADC
+        t = np.arange(n)
+        x = (np.sin(2 * np.pi * 7.3 * t / n) + 0.2 * np.sin(2 * np.pi * 21.9 * t / n)
+             + 0.01 * rng.standard_normal(n)).astype(np.float32)
+        ref = np.fft.rfft(x.astype(np.float64))
+        escala = np.max(np.abs(ref))
+        err_r = np.max(np.abs(fft_real(lib, x) - ref)) / escala
+        err_c = np.max(np.abs(fft_complex(lib, x) - ref)) / escala
+        ok &= err_r <= TOLERANCIA and err_c <= TOLERANCIA
+        us_r = cronometrar(lib, 'fft_real', x, repeticiones)
+        us_c = cronometrar(lib, 'fft_complex', x, repeticiones)
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            np.fft.rfft(x)
+        us_np = (time.perf_counter() - t0) / repeticiones * 1e6
+        print(f"{n:>6} {err_r:>10.2e} {err_c:>12.2e} {us_r:>10.1f} {us_c:>14.1f} {us_np:>11.1f}")
+    return ok
+
+
+def comparar_q15(lib, tamanos, repeticiones=200, semilla=0):
+    #Compara fft_q15 con el motor de punto fijo; devuelve False si algún bin difiere
+    rng = np.random.default_rng(semilla)
+    q15 = FormatoQ(0, 15)
+    ok = True
+    print(f"{'N':>6} {'bits distintos':>14} {'SNR [dB]':>9} {'q15 [us]':>9}")
+    for n in tamanos:
+        # Tono a escala completa (fuerza la saturación en -32768) y ruido uniforme
+        t = np.arange(n)
+        pruebas = [np.sin(2 * np.pi * 7.3 * t / n), rng.uniform(-1, 1, n) + 1j * rng.uniform(-1, 1, n)]
+        distintos = 0
+        for x in pruebas:
+            re, im = q15.cuantizar(x.real), q15.cuantizar(np.imag(x))
+            real, imag = re.astype(np.int16), im.astype(np.int16)
+            lib.fft_q15(real, imag, n)
+            esp_r, esp_i = q15.fft(re, im)
+            distintos += np.count_nonzero(real != esp_r) + np.count_nonzero(imag != esp_i)
+        ok &= distintos == 0
+        ref = np.fft.fft(q15.a_float(re) + 1j * q15.a_float(im)) / n
+        err = q15.a_float(real) + 1j * q15.a_float(imag) - ref
+        snr = 10 * np.log10(np.sum(np.abs(ref) ** 2) / np.sum(np.abs(err) ** 2))
+        entrada, destino = (re.astype(np.int16), im.astype(np.int16)), (real, imag)
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            np.copyto(destino[0], entrada[0])
+            np.copyto(destino[1], entrada[1])
+            lib.fft_q15(real, imag, n)
+        us = (time.perf_counter() - t0) / repeticiones * 1e6
+        print(f"{n:>6} {distintos:>14} {snr:>9.1f} {us:>9.1f}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara fft.c contra numpy.fft.rfft")
+    parser.add_argument("--generar", action="store_true", help="Regenera fft_twiddles.inc")
+    parser.add_argument("-r", "--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.generar:
+        generar_twiddles()
+    with tempfile.TemporaryDirectory() as tmp:
+        lib = compilar(tmp)
+        tamanos = [1 << k for k in range(4, FFT_MAX_N.bit_length())]
+        ok = comparar(lib, tamanos, args.repeticiones)
+        ok_q15 = comparar_q15(lib, tamanos, args.repeticiones)
+    print("OK" if ok else f"ERROR: diferencia mayor a {TOLERANCIA:g}")
+    print("Q15 bit a bit: OK" if ok_q15 else "ERROR: fft_q15 no coincide con punto_fijo.py")
+    ok &= ok_q15
+    sys.exit(0 if ok else 1)
@@ -1,9 +1,14 @@
-#include <math.h>
 #include <stdint.h>
+#include "fft.h"
 
-#ifndef M_PI
-#define M_PI 3.14159265358979323846
-#endif
+// Twiddles W_N^k = cos(2*pi*k/N) - i*sin(2*pi*k/N) para N = FFT_MAX_N y
+// k < N/2, generados en doble precisión: no hay deriva por recurrencia y
+// cualquier tamaño menor usa la misma tabla con paso FFT_MAX_N/len.
+#include "fft_twiddles.inc"
+
+static int es_potencia_valida(int n) {
+    return n >= 2 && n <= FFT_MAX_N && (n & (n - 1)) == 0;
+}
 
 // Intercambio bit-reversal
 static void bit_reverse(float *real, float *imag, int n) {
@@ -27,23 +32,22 @@ static void bit_reverse(float *real, float *imag, int n) {
 }
 
 // FFT radix-2
-void fft_1024(float *real, float *imag) {
-    int n = 1024*4;
+int fft_complex(float *real, float *imag, int n) {
+    if (!es_potencia_valida(n)) return -1;
 
     bit_reverse(real, imag, n);
 
     for (int len = 2; len <= n; len <<= 1) {
-        float ang = -2 * M_PI / len;
-        float wlen_r = cosf(ang);
-        float wlen_i = sinf(ang);
+        int half = len / 2;
+        int paso = FFT_MAX_N / len;     // W_len^j = W_N^(j*paso)
 
         for (int i = 0; i < n; i += len) {
-            float wr = 1.0f;
-            float wi = 0.0f;
+            for (int j = 0; j < half; j++) {
+                float wr = fft_cos[j * paso];
+                float wi = -fft_sin[j * paso];
 
-            for (int j = 0; j < len / 2; j++) {
                 int i0 = i + j;
-                int i1 = i + j + len/2;
+                int i1 = i0 + half;
 
                 float u_r = real[i0];
                 float u_i = imag[i0];
@@ -55,12 +59,118 @@ void fft_1024(float *real, float *imag) {
                 imag[i0] = u_i + v_i;
                 real[i1] = u_r - v_r;
                 imag[i1] = u_i - v_i;
+            }
+        }
+    }
+    return 0;
+}
+
+// FFT real: las muestras pares e impares forman una señal compleja z de n/2
+// puntos; con Z = FFT(z), los bins de x salen de separar las partes par (Fe)
+// e impar (Fo) y combinarlas con los twiddles de n puntos:
+//   X[k]     = Fe[k] + W^k Fo[k]
+//   X[M - k] = conj(Fe[k] - W^k Fo[k])        (M = n/2)
+int fft_real(float *real, float *imag, int n) {
+    if (!es_potencia_valida(n) || n < 4) return -1;
+    int m = n / 2;
+    int paso = FFT_MAX_N / n;
+
+    fft_complex(real, imag, m);
+
+    // Bins 0 y n/2: componentes puramente reales
+    float z0r = real[0];
+    float z0i = imag[0];
+    real[0] = z0r + z0i;
+    imag[0] = 0.0f;
+    real[m] = z0r - z0i;
+    imag[m] = 0.0f;
+
+    for (int k = 1; k <= m / 2; k++) {
+        float ar = real[k], ai = imag[k];
+        float br = real[m - k], bi = -imag[m - k];      // conj(Z[M - k])
+
+        float fe_r = 0.5f * (ar + br);
+        float fe_i = 0.5f * (ai + bi);
+        float fo_r = 0.5f * (ai - bi);
+        float fo_i = -0.5f * (ar - br);
+
+        float wr = fft_cos[k * paso];
+        float wi = -fft_sin[k * paso];
+        float t_r = wr * fo_r - wi * fo_i;
+        float t_i = wr * fo_i + wi * fo_r;
+
+        real[k] = fe_r + t_r;
+        imag[k] = fe_i + t_i;
+        real[m - k] = fe_r - t_r;
+        imag[m - k] = -(fe_i - t_i);
+    }
+    return 0;
+}
+
+// =====================================================
+//                FFT EN PUNTO FIJO Q15
+// =====================================================
+// Las muestras son int16 en Q15 y los twiddles vienen de la misma tabla de
+// FFT_MAX_N puntos cuantizada a Q15. Con |w| <= 32768 y |x| <= 32768 la suma
+// de dos productos más el redondeo entra en un int32. Cada etapa divide por 2
+// (redondeando al más cercano) para que la magnitud no crezca y la salida
+// quede en FFT(x) / n; la saturación sólo actúa en el caso límite de -32768.
+
+static inline int16_t sat16(int32_t v) {
+    if (v > 32767) return 32767;
+    if (v < -32768) return -32768;
+    return (int16_t)v;
+}
+
+static void bit_reverse_q15(int16_t *real, int16_t *imag, int n) {
+    int j = 0;
+    for (int i = 0; i < n; i++) {
+        if (i < j) {
+            int16_t tr = real[i];
+            int16_t ti = imag[i];
+            real[i] = real[j];
+            imag[i] = imag[j];
+            real[j] = tr;
+            imag[j] = ti;
+        }
+        int m = n >> 1;
+        while (m >= 1 && j >= m) {
+            j -= m;
+            m >>= 1;
+        }
+        j += m;
+    }
+}
+
+int fft_q15(int16_t *real, int16_t *imag, int n) {
+    if (!es_potencia_valida(n)) return -1;
+
+    bit_reverse_q15(real, imag, n);
+
+    for (int len = 2; len <= n; len <<= 1) {
+        int half = len / 2;
+        int paso = FFT_MAX_N / len;
+
+        for (int i = 0; i < n; i += len) {
+            for (int j = 0; j < half; j++) {
+                int32_t wr = fft_cos_q15[j * paso];
+                int32_t wi = -fft_sin_q15[j * paso];
+
+                int i0 = i + j;
+                int i1 = i0 + half;
+
+                int32_t u_r = real[i0];
+                int32_t u_i = imag[i0];
+
+                int32_t v_r = (real[i1] * wr - imag[i1] * wi + (1 << 14)) >> 15;
+                int32_t v_i = (real[i1] * wi + imag[i1] * wr + (1 << 14)) >> 15;
 
-                float nxt_r = wr * wlen_r - wi * wlen_i;
-                float nxt_i = wr * wlen_i + wi * wlen_r;
-                wr = nxt_r;
-                wi = nxt_i;
+                real[i0] = sat16((u_r + v_r + 1) >> 1);
+                imag[i0] = sat16((u_i + v_i + 1) >> 1);
+                real[i1] = sat16((u_r - v_r + 1) >> 1);
+                imag[i1] = sat16((u_i - v_i + 1) >> 1);
             }
         }
     }
+    return 0;
 }
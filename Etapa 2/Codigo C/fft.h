@@ -1,6 +1,23 @@
 #ifndef FFT_H
 #define FFT_H
 
-void fft_1024(float *real, float *imag);
+#include <stdint.h>
+
+// Tamaño máximo soportado: define el largo de la tabla de twiddles
+// (fft_twiddles.inc se genera con banco_fft.py --generar)
+#define FFT_MAX_N 4096
+
+// FFT compleja in-place de n puntos (potencia de 2, n <= FFT_MAX_N)
+int fft_complex(float *real, float *imag, int n);
+
+// FFT de n muestras reales con una FFT compleja de n/2 puntos.
+// Entrada: real[k] = x[2k], imag[k] = x[2k+1] (k < n/2).
+// Salida: bins 0..n/2 en real/imag, que deben tener lugar para n/2 + 1 valores.
+int fft_real(float *real, float *imag, int n);
+
+// FFT compleja in-place en punto fijo Q15, escalada por 1/n (1/2 por etapa,
+// con redondeo y saturación). Sólo usa productos de 32 bits; coincide bit a
+// bit con FormatoQ(0, 15).fft de punto_fijo.py (ver banco_fft.py).
+int fft_q15(int16_t *real, int16_t *imag, int n);
 
 #endif
@@ -7,10 +7,11 @@
 #include "hardware/i2c.h"
 #include "sh1106.h"
 
-#define SAMPLES   4096
-#define NFFT      4096
+#define SAMPLES   1024
+#define NFFT      1024
 
-// 1 Hz resolución
+// Bins de 4 Hz; la interpolación entre bins da f1 y armónicos con error
+// muy por debajo de 1 Hz sin necesidad de 4096 muestras
 #define FS        4096.0f   
 
 // ADC
@@ -18,18 +19,114 @@
 #define ADC_MAX   4095.0f
 #define ADC_OFFSET 2048     
 
-// Ventana HANN
-#define HANN_GAIN 0.6123f      // Ganancia coherente para correccion de la vrms
+// Ventana (se elige en compilación)
+#define VENTANA_HANN      0
+#define VENTANA_BLACKMAN  1
+#define VENTANA_FLATTOP   2
+#define VENTANA           VENTANA_HANN
 
 uint16_t buffer[SAMPLES];
-float real_fft[NFFT];
-float imag_fft[NFFT];
-float magnitude[NFFT];
+// FFT real: las muestras pares van en real_fft y las impares en imag_fft,
+// la salida son los bins 0..NFFT/2
+float real_fft[NFFT/2 + 1];
+float imag_fft[NFFT/2 + 1];
+float magnitude[NFFT/2 + 1];
+
+// Ventana precalculada y sus ganancias:
+//  - coherente (media de la ventana, 0.5 para Hann): amplitud de un tono, se
+//    usa para cada armonico
+//  - RMS (raiz del valor cuadratico medio, 0.6124 para Hann): potencia de un
+//    espectro repartido en muchos bins, se usa para la vrms total
+float window_tab[SAMPLES];
+float window_gain_coh;
+float window_gain_rms;
+
+// Coeficientes de la ventana de coseno: w[n] = sum_k (-1)^k a_k cos(2*pi*k*n/(N-1))
+#if VENTANA == VENTANA_BLACKMAN
+static const float coef_ventana[] = {0.42f, 0.5f, 0.08f};
+#elif VENTANA == VENTANA_FLATTOP
+static const float coef_ventana[] = {0.21557895f, 0.41663158f, 0.277263158f,
+                                     0.083578947f, 0.006947368f};
+#else
+static const float coef_ventana[] = {0.5f, 0.5f};
+#endif
+#define N_COEF (sizeof(coef_ventana) / sizeof(coef_ventana[0]))
+
+// Calcula la ventana una sola vez: evita SAMPLES llamadas a cosf por trama
+static void init_ventana(void) {
+    float suma = 0.0f, suma_cuad = 0.0f;
+    for (int i = 0; i < SAMPLES; i++) {
+        float fase = (2.0f * M_PI * i) / (SAMPLES - 1);
+        float w = 0.0f;
+        for (unsigned k = 0; k < N_COEF; k++)
+            w += ((k & 1) ? -coef_ventana[k] : coef_ventana[k]) * cosf(k * fase);
+        window_tab[i] = w;
+        suma += w;
+        suma_cuad += w * w;
+    }
+    window_gain_coh = suma / SAMPLES;
+    window_gain_rms = sqrtf(suma_cuad / SAMPLES);
+}
+
+// ============================
+// INTERPOLACIÓN ENTRE BINS
+// ============================
+// Misma técnica que procesamiento.py: el núcleo de la ventana es una suma de
+// sincs, G(d) = [a0 sinc(d) + sum a_k/2 (sinc(d-k) + sinc(d+k))] / a0, y el
+// cociente mayor vecino / pico = G(1-d)/G(d) se tabula para d en [0, 0.5] y
+// se invierte con interpolación lineal.
+#define PUNTOS_TABLA 65
+static float tab_razon[PUNTOS_TABLA];
+static float tab_desp[PUNTOS_TABLA];
+static float tab_gan[PUNTOS_TABLA];
+
+static float sincf(float x) {
+    return (x == 0.0f) ? 1.0f : sinf(M_PI * x) / (M_PI * x);
+}
+
+static float nucleo(float d) {
+    float g = coef_ventana[0] * sincf(d);
+    for (unsigned k = 1; k < N_COEF; k++)
+        g += coef_ventana[k] * 0.5f * (sincf(d - k) + sincf(d + k));
+    return fabsf(g) / coef_ventana[0];
+}
+
+static void init_interpolacion(void) {
+    for (int i = 0; i < PUNTOS_TABLA; i++) {
+        float d = 0.5f * i / (PUNTOS_TABLA - 1);
+        tab_desp[i] = d;
+        tab_gan[i] = nucleo(d);
+        tab_razon[i] = nucleo(1.0f - d) / tab_gan[i];
+    }
+}
+
+static float interp_tabla(float x, const float *xs, const float *ys) {
+    if (x <= xs[0]) return ys[0];
+    for (int i = 1; i < PUNTOS_TABLA; i++) {
+        if (x <= xs[i]) {
+            float t = (x - xs[i - 1]) / (xs[i] - xs[i - 1]);
+            return ys[i - 1] + t * (ys[i] - ys[i - 1]);
+        }
+    }
+    return ys[PUNTOS_TABLA - 1];
+}
+
+// Devuelve la posición del pico en bins (fraccionaria) y su magnitud corregida
+static float interpolar_pico(const float *mag, int k, float *amp) {
+    float izq = mag[k - 1], der = mag[k + 1];
+    int signo = (der > izq) ? 1 : -1;
+    float d = interp_tabla(((signo > 0) ? der : izq) / mag[k], tab_razon, tab_desp);
+    *amp = mag[k] / interp_tabla(d, tab_desp, tab_gan);
+    return k + signo * d;
+}
 
 int main() {
     stdio_init_all();
     sleep_ms(300);
 
+    init_ventana();
+    init_interpolacion();
+
     // I2C + OLED
     i2c_init(i2c0, 400000);
     gpio_set_function(8, GPIO_FUNC_I2C);
@@ -65,20 +162,19 @@ int main() {
         adc_run(false);
 
         // ============================
-        // PREPARAR DATOS + VENTANA HANN
+        // PREPARAR DATOS + VENTANA
         // ============================
-        for (int i = 0; i < SAMPLES; i++) {
-
-            float centered = (float)((int)buffer[i] - ADC_OFFSET);
+        for (int i = 0; i < SAMPLES; i += 2) {
 
-            float hann = 0.5f * (1.0f - cosf((2.0f * M_PI * i) / (SAMPLES - 1)));
+            float par = (float)((int)buffer[i] - ADC_OFFSET);
+            float impar = (float)((int)buffer[i + 1] - ADC_OFFSET);
 
-            real_fft[i] = centered * hann;
-            imag_fft[i] = 0.0f;
+            real_fft[i / 2] = par * window_tab[i];
+            imag_fft[i / 2] = impar * window_tab[i + 1];
         }
 
-        // FFT
-        fft_1024(real_fft, imag_fft);
+        // FFT de NFFT muestras reales (compleja de NFFT/2 puntos + separación)
+        fft_real(real_fft, imag_fft, NFFT);
 
         // Magnitudes FFT
         for (int i = 0; i < NFFT/2; i++) {
@@ -91,14 +187,16 @@ int main() {
         int f0_idx = 1;
         float max_val = magnitude[1];
 
-        for (int i = 2; i < FS/2; i++) {
+        for (int i = 2; i < NFFT/2 - 1; i++) {
             if (magnitude[i] > max_val) {
                 max_val = magnitude[i];
                 f0_idx = i;
             }
         }
 
-        float f0 = (FS * f0_idx) / NFFT;
+        float amp_f0;
+        float pos_f0 = interpolar_pico(magnitude, f0_idx, &amp_f0);
+        float f0 = (FS * pos_f0) / NFFT;
 
         printf("\n===============================\n");
         printf("FRECUENCIA DETECTADA: %.2f Hz\n", f0);
@@ -116,14 +214,19 @@ int main() {
 
         for (int n = 1; n <= 20; n++) {
 
-            float f_h = n * f0;
-            int idx = (int)roundf(f_h * NFFT / FS);
+            // Máximo local alrededor de n*f0 y su interpolación entre bins
+            int centro = (int)roundf(n * pos_f0);
+            if (centro + 2 >= NFFT/2) continue;
+            int idx = centro;
+            for (int j = centro - 1; j <= centro + 1; j++)
+                if (j > 0 && magnitude[j] > magnitude[idx]) idx = j;
 
-            if (idx >= NFFT/2) continue;
+            float amp_h;
+            float f_h = (FS * interpolar_pico(magnitude, idx, &amp_h)) / NFFT;
 
             float vrms_adc =
-                (magnitude[idx] / (NFFT/2)) / 1.4142f *
-                (1.0f / HANN_GAIN);       // CORRECCIÓN HANN
+                (amp_h / (NFFT/2)) / 1.4142f *
+                (1.0f / window_gain_coh);   // CORRECCIÓN VENTANA (tono)
 
             float mv = (vrms_adc * VREF / ADC_MAX) * 1000.0f;
 
@@ -138,7 +241,7 @@ int main() {
 
             float vrms =
                 (magnitude[i] / (NFFT/2)) / 1.4142f *
-                (1.0f / HANN_GAIN);   // CORRECCIÓN
+                (1.0f / window_gain_rms);   // CORRECCIÓN VENTANA (potencia)
 
             total_rms_sq += vrms * vrms;
         }
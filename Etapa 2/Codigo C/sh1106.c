@@ -1,4 +1,5 @@
 #include <stdio.h>
+#include <string.h>
 #include "pico/stdlib.h"
 #include "hardware/i2c.h"
 #include "sh1106.h"
@@ -7,58 +8,81 @@
 // Buffer de pantalla
 uint8_t sh1106_buffer[SH1106_BUFFERSIZE];
 
-// ---- Funciones internas ----
-static void sh1106_send_cmd(uint8_t cmd) {
-    uint8_t data[2] = {0x00, cmd};
-    i2c_write_blocking(SH1106_I2C_PORT, SH1106_I2C_ADDR, data, 2, false);
-}
+// Refresco parcial: copia de lo último enviado al display. sh1106_update sólo
+// transmite las páginas que difieren, cada una con una transacción de
+// direccionamiento y otra de datos armada en un buffer estático.
+static uint8_t sh1106_enviado[SH1106_BUFFERSIZE];
+static bool sh1106_forzar = true;
+static uint8_t sh1106_tx[1 + SH1106_WIDTH];
 
-static void sh1106_send_data(uint8_t data) {
-    uint8_t buf[2] = {0x40, data};
-    i2c_write_blocking(SH1106_I2C_PORT, SH1106_I2C_ADDR, buf, 2, false);
+// ---- Funciones internas ----
+static void sh1106_send_cmds(const uint8_t *cmds, size_t n) {
+    // Secuencia de comandos en una sola transacción (byte de control 0x00)
+    uint8_t buf[32];
+    buf[0] = 0x00;
+    memcpy(buf + 1, cmds, n);
+    i2c_write_blocking(SH1106_I2C_PORT, SH1106_I2C_ADDR, buf, n + 1, false);
 }
 
 // ---- Inicializar OLED ----
 void sh1106_init() {
     sleep_ms(50);
 
-    sh1106_send_cmd(0xAE);
-    sh1106_send_cmd(0xD5); sh1106_send_cmd(0x80);
-    sh1106_send_cmd(0xA8); sh1106_send_cmd(0x3F);
-    sh1106_send_cmd(0xD3); sh1106_send_cmd(0x00);
-    sh1106_send_cmd(0x40);
-    sh1106_send_cmd(0xAD); sh1106_send_cmd(0x8B);
-    sh1106_send_cmd(0xA1);
-    sh1106_send_cmd(0xC8);
-    sh1106_send_cmd(0xDA); sh1106_send_cmd(0x12);
-    sh1106_send_cmd(0x81); sh1106_send_cmd(0x7F);
-    sh1106_send_cmd(0xD9); sh1106_send_cmd(0xF1);
-    sh1106_send_cmd(0xDB); sh1106_send_cmd(0x40);
-    sh1106_send_cmd(0xA4);
-    sh1106_send_cmd(0xA6);
-    sh1106_send_cmd(0xAF);
+    static const uint8_t init_cmds[] = {
+        0xAE,
+        0xD5, 0x80,
+        0xA8, 0x3F,
+        0xD3, 0x00,
+        0x40,
+        0xAD, 0x8B,
+        0xA1,
+        0xC8,
+        0xDA, 0x12,
+        0x81, 0x7F,
+        0xD9, 0xF1,
+        0xDB, 0x40,
+        0xA4,
+        0xA6,
+        0xAF,
+    };
+    sh1106_send_cmds(init_cmds, sizeof(init_cmds));
 
     sh1106_clear();
+    sh1106_invalidate();
     sh1106_update();
 }
 
+// ---- Forzar el reenvío completo en el próximo update ----
+void sh1106_invalidate() {
+    sh1106_forzar = true;
+}
+
 // ---- Limpiar pantalla ----
 void sh1106_clear() {
     for (int i = 0; i < SH1106_BUFFERSIZE; i++)
         sh1106_buffer[i] = 0x00;
 }
 
-// ---- Actualizar OLED ----
-void sh1106_update() {
+// ---- Actualizar OLED (sólo las páginas modificadas) ----
+int sh1106_update() {
+    int enviadas = 0;
+    sh1106_tx[0] = 0x40;
     for (uint8_t page = 0; page < 8; page++) {
-        sh1106_send_cmd(0xB0 + page);
-        sh1106_send_cmd(0x02);
-        sh1106_send_cmd(0x10);
+        const uint8_t *src = &sh1106_buffer[page * SH1106_WIDTH];
+        uint8_t *prev = &sh1106_enviado[page * SH1106_WIDTH];
+        if (!sh1106_forzar && memcmp(src, prev, SH1106_WIDTH) == 0)
+            continue;
+
+        const uint8_t cmds[3] = {0xB0 + page, 0x02, 0x10};
+        sh1106_send_cmds(cmds, sizeof(cmds));
 
-        for (uint8_t col = 0; col < 128; col++) {
-            sh1106_send_data(sh1106_buffer[page * 128 + col]);
-        }
+        memcpy(sh1106_tx + 1, src, SH1106_WIDTH);
+        memcpy(prev, src, SH1106_WIDTH);
+        i2c_write_blocking(SH1106_I2C_PORT, SH1106_I2C_ADDR, sh1106_tx, sizeof(sh1106_tx), false);
+        enviadas++;
     }
+    sh1106_forzar = false;
+    return enviadas;
 }
 
 // ---- Dibujar un carácter ----
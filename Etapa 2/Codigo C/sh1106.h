@@ -18,8 +18,9 @@ extern uint8_t sh1106_buffer[SH1106_BUFFERSIZE];
 
 // Funciones públicas
 void sh1106_init();
-void sh1106_update();
+int sh1106_update();        // Devuelve la cantidad de páginas enviadas
 void sh1106_clear();
+void sh1106_invalidate();   // El próximo update reenvía todas las páginas
 
 void sh1106_draw_char(int x, int y, char c);
 void sh1106_draw_text(int x, int y, const char *txt);
@@ -1,16 +1,33 @@
 from ulab import numpy as np
-from machine import UART, Pin, ADC, Timer, I2C
-import struct, binascii, time
+from machine import UART, Pin, ADC, Timer, I2C, disable_irq, enable_irq
+from array import array
+import struct, time, gc
 from sh1106 import SH1106_I2C
+from oled_grafico import MiniGrafico
+from procesamiento import procesar, procesar_ciclos, invalidar_cache
+from trama_pico import (SerializadorTrama, HEADER_NEG, HEADER_CMD, BAUDIOS, LEN_TIEMPOS,
+                        largo_maximo, leer_negociacion, mensaje_ack, leer_comando,
+                        mensaje_respuesta, mensaje_tiempos, CMD_TRAZA,
+                        CMD_FS, CMD_N, CMD_VENTANA, CMD_INTERVALO, CMD_STREAMING,
+                        CMD_OLED, CMD_SINCRONISMO, VENTANAS_CMD, SINC_LIBRE, SINC_CRUCE,
+                        SINC_CICLOS, EST_OK, EST_RANGO, EST_DESCONOCIDO)
 
 # --- Configuración OLED ---
 WIDTH, HEIGHT = 128, 64
 i2c = I2C(0, scl=Pin(9), sda=Pin(8), freq=100000)
 oled = SH1106_I2C(WIDTH, HEIGHT, i2c)
 oled_enabled = True
+oled_grafico = False   # True: espectro de barras + forma de onda en lugar del texto
+mini_grafico = MiniGrafico(oled, WIDTH, HEIGHT)
 
 # --- UART ---
-uart = UART(1, baudrate=115200, tx=Pin(4), rx=Pin(5))
+# El buffer de transmisión alcanza para la trama más larga posible con el N
+# actual (v2 en el peor caso) más el mensaje de tiempos, y se redimensiona al
+# cambiar N: uart.write vuelve apenas copia la trama y el envío sigue por
+# interrupciones a velocidad de línea. Antes de escribir la trama siguiente se
+# espera txdone() atendiendo los comandos (ver enviar_trama).
+def configurar_uart(baud):
+    return UART(1, baudrate=baud, tx=Pin(4), rx=Pin(5), txbuf=largo_maximo(N) + LEN_TIEMPOS)
 
 # --- ADC ---
 adc = ADC(Pin(26))
@@ -18,138 +35,293 @@ adc = ADC(Pin(26))
 # --- Parámetros ---
 fs = 1024
 N = 1024
-HEADER = b'PICO'
+FS_MAX = 20000       # Máxima frecuencia de muestreo aceptada
+INTERVALO_MS = 0     # Período mínimo entre tramas (0: se procesa cada buffer completo)
+VENTANA = 'hann'     # Ventana del análisis: 'hann', 'blackman' o 'flattop'
+N_VALIDOS = (256, 512, 1024, 2048)   # Largos de trama aceptados por CMD_N
+streaming = True     # Envío de tramas a la PC (CMD_STREAMING)
+# Sincronismo (CMD_SINCRONISMO):
+#   SINC_LIBRE  : buffer libre, ventana + interpolación entre bins
+#   SINC_CRUCE  : cada buffer arranca en un cruce ascendente (espera con timeout)
+#   SINC_CICLOS : buffer libre; el análisis se hace sobre ciclos enteros
+SINCRONISMO = SINC_CICLOS
+TIMEOUT_CRUCE_MS = 100
+traza = False        # Envío de los tiempos de cada trama (CMD_TRAZA)
+
+baud_actual = 115200
+uart = configurar_uart(baud_actual)
+
+# Protocolo negociado con la PC: opciones=None mantiene las tramas v1
+opciones = None
+diezmado = 1
 
 # =====================================================
 #   DETECCIÓN DE CRUCE POR CERO ASCENDENTE (VCC/2)
 # =====================================================
-def esperar_cruce_cero():
-    UMBRAL = 1.65   # Punto medio VCC/2
-    prev = (adc.read_u16() * 3.3) / 65535
-
-    while True:
-        actual = (adc.read_u16() * 3.3) / 65535
-
-        # Cruce ascendente: antes abajo del medio y ahora arriba
-        if prev < UMBRAL and actual >= UMBRAL:
-            return
-
-        prev = actual
-        time.sleep_us(50)   # Lectura rápida
-
-
-# --- Función recepción frecuencia de muestreo ---
-def recibir_fs():
+# Con histéresis (el ruido cerca del umbral no dispara) y con timeout: con
+# una entrada continua o sin señal vuelve igual, como el modo "auto" de un
+# osciloscopio, en lugar de bloquear el bucle principal.
+def esperar_cruce_cero(timeout_ms=TIMEOUT_CRUCE_MS):
+    UMBRAL = 32768      # Punto medio VCC/2 en cuentas del ADC
+    HISTERESIS = 650    # ~33 mV
+    inicio = time.ticks_ms()
+    armado = False
+
+    while time.ticks_diff(time.ticks_ms(), inicio) < timeout_ms:
+        actual = adc.read_u16()
+
+        # Cruce ascendente: primero por debajo del medio (menos la histéresis), después arriba
+        if actual < UMBRAL - HISTERESIS:
+            armado = True
+        elif armado and actual >= UMBRAL:
+            return True
+    return False
+
+
+# --- Recepción de comandos de la PC ---
+# Los bytes recibidos se acumulan en un buffer preasignado. 'PNEG' y 'PCMD'
+# inician mensajes de 16 bytes (negociación y comandos) con CRC; como en el
+# FrameParser de la PC, los bytes que no empiezan una cabecera se saltean hasta
+# la próxima y un mensaje con CRC inválido se descarta de a un byte, así que un
+# byte perdido o de más no desalinea el canal. Sólo cuando quedan exactamente 4
+# bytes sin ninguna cabecera se toman como una frecuencia de muestreo suelta
+# (protocolo v1). Las demás palabras de esos mensajes son >= 0xFFFF0000: un
+# firmware v1 las descarta por estar fuera de rango.
+# atender_uart se llama entre tramas y mientras se espera el buffer del ADC,
+# así que un comando se aplica antes de la trama siguiente.
+rx = bytearray(64)
+rx_mv = memoryview(rx)
+rx_len = 0
+
+
+def cambiar_fs(new_fs):
     global fs
-    if uart.any() >= 4:
-        data = uart.read(4)
-        if data and len(data) == 4:
-            new_fs = struct.unpack('<I', data)[0]
-            if 10 <= new_fs <= 20000:
-                fs = new_fs
-                print("Nueva frecuencia de muestreo:", fs)
-                if fs > 10000:
-                    print("Advertencia: fs demasiado alta, ajustando a 10000 Hz")
-                    fs = 10000
+    if 10 <= new_fs <= FS_MAX:
+        fs = new_fs
+        print("Nueva frecuencia de muestreo:", fs)
+        invalidar_cache()   # Libera la ventana/eje de frecuencias del fs anterior
+        adquisidor.iniciar(fs)
+        return True
+    print("Frecuencia fuera de rango:", new_fs)
+    return False
+
+
+def cambiar_n(new_n):
+    global N, serializador, uart
+    N = new_n
+    invalidar_cache()
+    serializador = None
+    adquisidor.redimensionar(N)   # Libera los buffers anteriores antes de alocar
+    uart.flush()                  # Lo pendiente sale antes de rearmar la UART
+    uart = None
+    gc.collect()
+    uart = configurar_uart(baud_actual)
+    serializador = SerializadorTrama(N)
+    adquisidor.iniciar(fs)
+    print("Nuevo largo de trama:", N)
+
+
+def ejecutar_comando(mensaje):
+    #Aplica un comando de la PC y responde con el valor vigente
+    global VENTANA, INTERVALO_MS, streaming, oled_enabled, oled_grafico, SINCRONISMO, traza
+    cmd = leer_comando(mensaje)
+    if cmd is None:
+        print("Comando con CRC inválido")
+        return
+    comando, secuencia, valor = cmd
+    estado = EST_OK
+    if comando == CMD_FS:
+        if not cambiar_fs(valor):
+            estado = EST_RANGO
+        valor = fs
+    elif comando == CMD_N:
+        if valor not in N_VALIDOS:
+            estado = EST_RANGO
+        elif valor != N:
+            cambiar_n(valor)
+        valor = N
+    elif comando == CMD_VENTANA:
+        if valor < len(VENTANAS_CMD):
+            VENTANA = VENTANAS_CMD[valor]   # procesar cachea por nombre de ventana
+        else:
+            estado = EST_RANGO
+        valor = VENTANAS_CMD.index(VENTANA)
+    elif comando == CMD_INTERVALO:
+        INTERVALO_MS = valor
+    elif comando == CMD_STREAMING:
+        streaming = bool(valor)
+        valor = int(streaming)
+    elif comando == CMD_OLED:
+        # 0: apagada, 1: texto, 2: gráfico
+        if valor <= 2:
+            if not oled_enabled and valor:
+                oled.poweron()
+            elif oled_enabled and not valor:
+                oled.poweroff()
+            oled_enabled = valor > 0
+            oled_grafico = valor == 2
+        else:
+            estado = EST_RANGO
+        valor = (2 if oled_grafico else 1) if oled_enabled else 0
+    elif comando == CMD_SINCRONISMO:
+        if valor in (SINC_LIBRE, SINC_CRUCE, SINC_CICLOS):
+            SINCRONISMO = valor
+        else:
+            estado = EST_RANGO
+        valor = SINCRONISMO
+    elif comando == CMD_TRAZA:
+        if valor in (0, 1):
+            traza = bool(valor)
+        else:
+            estado = EST_RANGO
+        valor = int(traza)
+    else:
+        estado = EST_DESCONOCIDO
+    uart.write(mensaje_respuesta(comando, secuencia, estado, valor))
+
+
+def negociar(pedido):
+    #Acepta el pedido de la PC, responde con el ACK y cambia de velocidad
+    global uart, opciones, diezmado, baud_actual
+    neg = leer_negociacion(pedido)
+    if neg is None:
+        print("Negociación con CRC inválido")
+        return
+    version, opc, d, baud = neg
+    if version < 2:
+        opc, d, baud = 0, 1, 115200       # Vuelta al protocolo v1
+    if baud not in BAUDIOS:
+        baud = 115200
+    d = max(1, min(d, 8))
+    uart.write(mensaje_ack(2 if version >= 2 else 1, opc, d, baud))
+    uart.flush()                          # El ACK sale a la velocidad anterior
+    if baud != baud_actual:
+        uart = configurar_uart(baud)
+        baud_actual = baud
+    opciones, diezmado = (opc, d) if version >= 2 else (None, 1)
+    print("Protocolo v{} opciones={} diezmado={} baud={}".format(
+        2 if version >= 2 else 1, opc, d, baud))
+
+
+def _proxima_cabecera(desde):
+    #Posición de la próxima 'PNEG' o 'PCMD' en rx[desde:rx_len], o -1
+    resto = bytes(rx_mv[desde:rx_len])
+    i, j = resto.find(HEADER_NEG), resto.find(HEADER_CMD)
+    if i < 0 or 0 <= j < i:
+        i = j
+    return i if i < 0 else desde + i
+
+
+def atender_uart():
+    global rx_len
+    if uart.any():
+        n = uart.readinto(rx_mv[rx_len:])
+        if n:
+            rx_len += n
+    pos = 0
+    while rx_len - pos >= 4:
+        cab = bytes(rx_mv[pos:pos + 4])
+        if cab == HEADER_NEG or cab == HEADER_CMD:
+            if rx_len - pos < 16:
+                break          # El resto del mensaje todavía no llegó
+            mensaje = rx_mv[pos:pos + 16]
+            leer = leer_negociacion if cab == HEADER_NEG else leer_comando
+            if leer(mensaje) is None:
+                pos += 1       # CRC inválido: se busca una cabecera desde el byte siguiente
+                continue
+            if cab == HEADER_NEG:
+                negociar(mensaje)
             else:
-                print("Frecuencia fuera de rango:", new_fs)
-
-
-# =====================================================
-#                MUESTREO SINCRONIZADO
-# =====================================================
-def muestrear():
-    signal = []
-    sampling_done = False
-    start_time = time.ticks_ms()
-
-    # ---------- Esperar cruce por cero ----------
-    esperar_cruce_cero()
-
-    def sample_adc(timer):
-        nonlocal signal, sampling_done
-        if len(signal) < N:
-            val = ((adc.read_u16() * 3.3) / 65535)
-            signal.append(val)
+                ejecutar_comando(mensaje)
+            pos += 16
+            continue
+        siguiente = _proxima_cabecera(pos + 1)
+        if siguiente >= 0:
+            pos = siguiente    # Bytes sueltos antes de un mensaje: se descartan
+        elif rx_len - pos == 4:
+            cambiar_fs(struct.unpack('<I', cab)[0])
+            pos += 4
         else:
-            timer.deinit()
-            sampling_done = True
-
-    timer = Timer()
-    timer.init(freq=fs, mode=Timer.PERIODIC, callback=sample_adc)
-
-    while not sampling_done:
-        time.sleep_ms(1)
-        if time.ticks_diff(time.ticks_ms(), start_time) > 5000:
-            print("Error: muestreo no completado en tiempo esperado")
-            timer.deinit()
-            return None
-
-    return np.array(signal)
+            pos = rx_len - 3   # Se conservan por si la cabecera quedó cortada
+            break
+    if pos:
+        rx[:rx_len - pos] = bytes(rx_mv[pos:rx_len])
+        rx_len -= pos
 
 
 # =====================================================
-#                PROCESAMIENTO FFT + ARMÓNICOS
+#          MUESTREO CONTINUO CON DOBLE BUFFER
 # =====================================================
-def procesar(signal):
-    signal = signal - np.mean(signal)
-
-    #Ventana de Hanning
-    n = np.arange(N)
-    window = 0.5 - 0.5 * np.cos(2 * np.pi * n / (N - 1))
-    signal_windowed = signal * window
-    correction_factor = 1 / (np.sum(window) / N)
-
-    #Calculo de la FFT
-    spectrum = np.fft.fft(signal_windowed)
-    frequencies = np.linspace(0, fs, N)
-    magnitudes = np.sqrt(spectrum.real**2 + spectrum.imag**2)
-    amplitudes = correction_factor * (2 / N) * magnitudes
-
-    freqs_pos = frequencies[:N//2]
-    amplitudes_pos = amplitudes[:N//2]
-
-    # Pico detection
-    umbral = 0.01 * np.max(amplitudes_pos)
-    armonicos = []
-
-    for i in range(1, len(amplitudes_pos) - 1):
-        if (amplitudes_pos[i] > amplitudes_pos[i - 1] and
-            amplitudes_pos[i] > amplitudes_pos[i + 1] and
-            amplitudes_pos[i] > umbral):
-            armonicos.append((freqs_pos[i], amplitudes_pos[i]))
-
-    if len(armonicos) > 0:
-        armonicos.sort(key=lambda x: x[1], reverse=True)
-        f1, a1 = armonicos[0]
-    else:
-        f1, a1 = 0.0, 0.0
-
-    #Calculo de TRMS
-    Vrms = np.sqrt(np.mean(signal ** 2))
-
-    #Filtro los primeros 10 armonicos reales
-    arm_temp = []
-
-    for fr, a in armonicos:
-        if f1 <= 0:
-            continue
-
-        n = round(fr / f1)
-        if 1 <= n <= 10:
-            if abs(fr - n*f1) <= f1 * 0.10:  # tolerancia 10%
-                arm_temp.append((n, fr, a))
-
-    arm_temp.sort(key=lambda x: x[0])
-    armonicos_ordenados = [(fr, a) for (n, fr, a) in arm_temp[:10]]
+# El timer escribe los códigos crudos del ADC (uint16) en uno de dos buffers
+# preasignados; al completarlo lo marca como listo y sigue con el otro, sin
+# pausas entre tramas. El callback no aloca memoria ni opera con floats: la
+# conversión a volts se hace en un solo paso vectorizado al retirar el buffer.
+# Mientras se procesa y transmite la trama k, el timer ya adquiere la k+1.
+
+class Adquisidor:
+    def __init__(self, adc, N):
+        self.adc = adc
+        self.N = N
+        self.buffers = (array('H', bytes(2 * N)), array('H', bytes(2 * N)))
+        self.activo = 0      # Buffer que está llenando el timer
+        self.idx = 0
+        self.listo = -1      # Buffer completo pendiente de procesar (-1: ninguno)
+        self.desbordes = 0   # Buffers pisados antes de ser procesados
+        self.timer = Timer()
+        self._cb = self._muestra   # Se crea una sola vez: el callback no aloca
+
+    def _muestra(self, timer):
+        self.buffers[self.activo][self.idx] = self.adc.read_u16()
+        self.idx += 1
+        if self.idx >= self.N:
+            if self.listo != -1:
+                self.desbordes += 1
+            self.listo = self.activo
+            self.activo ^= 1
+            self.idx = 0
+
+    def iniciar(self, fs):
+        self.timer.deinit()
+        self.activo, self.idx, self.listo = 0, 0, -1
+        self.timer.init(freq=fs, mode=Timer.PERIODIC, callback=self._cb)
+
+    def detener(self):
+        self.timer.deinit()
+
+    def redimensionar(self, N):
+        #Cambia el largo de los buffers (hay que volver a llamar a iniciar)
+        self.timer.deinit()
+        self.buffers = None
+        self.N = N
+        self.buffers = (array('H', bytes(2 * N)), array('H', bytes(2 * N)))
+
+    def obtener(self, timeout_ms=5000, atender=None):
+        #Espera un buffer completo y lo devuelve convertido a volts.
+        #Mientras espera llama a atender() (p. ej. para recibir comandos)
+        inicio = time.ticks_ms()
+        while self.listo == -1:
+            if time.ticks_diff(time.ticks_ms(), inicio) > timeout_ms:
+                return None
+            if atender is not None:
+                atender()
+            time.sleep_ms(1)
+        estado = disable_irq()
+        i, self.listo = self.listo, -1
+        enable_irq(estado)
+        # La conversión tiene que terminar antes de que el timer vuelva a este
+        # buffer (N/fs segundos): es una única operación vectorizada
+        codigos = np.frombuffer(self.buffers[i], dtype=np.uint16)
+        return np.array(codigos, dtype=np.float) * (3.3 / 65535)
+
+
+adquisidor = Adquisidor(adc, N)
 
-    # THD con los 10 armónicos
-    suma = 0
-    for fr, a in armonicos_ordenados[1:]:
-        suma += a*a
-    THD = (np.sqrt(suma) / (a1 + 1e-12)) * 100
 
-    return armonicos_ordenados, Vrms, THD, f1
+def muestrear():
+    signal = adquisidor.obtener(5000, atender_uart)
+    if signal is None:
+        print("Error: muestreo no completado en tiempo esperado")
+    return signal
 
 
 # --- Imprimir resultados ---
@@ -165,45 +337,21 @@ def imprimir(armonicos_ordenados, Vrms, THD, f1):
 
 
 # --- Enviar trama ---
+serializador = SerializadorTrama(N)
+
 def enviar_trama(signal, armonicos_ordenados, Vrms, THD):
     try:
-        frame = bytearray()
-        frame.extend(HEADER)
-        
-        # Frecuencia de muestreo
-        frame.extend(struct.pack('<I', fs))
-        
-        # Número de muestras
-        frame.extend(struct.pack('<H', N))
-
-        # Muestras en int16
-        samples_int16 = [max(min(int((v / 3.3) * 32767), 32767), -32767) for v in signal]
-        for s in samples_int16:
-            frame.extend(struct.pack('<h', s))
-
-        # Armónicos
-        M = len(armonicos_ordenados)
-        frame.extend(struct.pack('<H', M))
-        for f, a in armonicos_ordenados:
-            frame.extend(struct.pack('<ff', f, a))
-
-        # RMS y THD
-        frame.extend(struct.pack('<f', Vrms))
-        frame.extend(struct.pack('<f', THD))
-
-        # Calcular CRC desde el byte 4 en adelante
-        crc = binascii.crc32(frame[4:]) & 0xFFFFFFFF
-        frame.extend(struct.pack('<I', crc))
-
-        MAX_CHUNK = 512  # Tamaño seguro por bloque
-        if len(frame) > MAX_CHUNK:
-            print("Enviando trama en bloques...")
-            for i in range(0, len(frame), MAX_CHUNK):
-                uart.write(frame[i:i+MAX_CHUNK])
-                time.sleep_ms(10)  # Pequeña pausa para evitar saturación
+        if opciones is None:
+            trama = serializador.armar(signal, fs, armonicos_ordenados, Vrms, THD)
         else:
-            uart.write(frame)
-            
+            trama = serializador.armar_v2(signal, fs, armonicos_ordenados, Vrms, THD,
+                                          opciones, diezmado)
+        # Si todavía se está transmitiendo la trama anterior se espera a que
+        # termine atendiendo los comandos (contrapresión de la UART, sin pausas
+        # fijas); después write sólo copia la trama al buffer de transmisión
+        while not uart.txdone():
+            atender_uart()
+        uart.write(trama)
     except Exception as e:
         print("Error en enviar_trama:", e)
 
@@ -220,16 +368,52 @@ def OLED(f1, Vrms, THD):
 # =====================================================
 #                 BUCLE PRINCIPAL
 # =====================================================
+# La adquisición es continua salvo en SINC_CRUCE, donde cada buffer se
+# vuelve a disparar en un cruce por cero
+adquisidor.iniciar(fs)
+
 while True:
-    recibir_fs()
+    inicio_ciclo = time.ticks_ms()
+    atender_uart()
+
+    # Marcas de tiempo de las etapas (se envían a la PC con CMD_TRAZA activo)
+    t_muestreo = time.ticks_us()
+    if SINCRONISMO == SINC_CRUCE:
+        adquisidor.detener()
+        esperar_cruce_cero()
+        adquisidor.iniciar(fs)
     
     signal = muestrear()
     if signal is None:
         continue
         
-    armonicos, Vrms, THD, f1 = procesar(signal)
+    t_procesar = time.ticks_us()
+    armonicos, Vrms, THD, f1 = procesar(signal, fs, VENTANA)
+    centrada = signal - 1.65
+    onda = centrada
+    if SINCRONISMO == SINC_CICLOS and f1 > 0:
+        # Segunda pasada sobre ciclos enteros con la f1 ya interpolada
+        ciclos = procesar_ciclos(signal, fs, f1)
+        if ciclos is not None:
+            armonicos, Vrms, THD, f1, inicio = ciclos
+            onda = centrada[int(inicio):]     # La onda del OLED arranca en el cruce
+    t_fin_procesar = time.ticks_us()
     imprimir(armonicos, Vrms, THD, f1)
-    OLED(f1, Vrms, THD)
-    enviar_trama((signal-1.65), armonicos, Vrms, THD)
-    
-    time.sleep(2)
+    if oled_enabled:
+        if oled_grafico:
+            mini_grafico.dibujar(onda, fs, armonicos, f1, THD)
+        else:
+            OLED(f1, Vrms, THD)
+    if streaming:
+        t_envio = time.ticks_us()
+        enviar_trama(centrada, armonicos, Vrms, THD)
+        if traza:
+            uart.write(mensaje_tiempos(time.ticks_diff(t_procesar, t_muestreo),
+                                       time.ticks_diff(t_fin_procesar, t_procesar),
+                                       time.ticks_diff(time.ticks_us(), t_envio)))
+
+    # Espera sólo lo que falte para completar el intervalo entre tramas,
+    # sin dejar de atender los comandos
+    while time.ticks_diff(time.ticks_ms(), inicio_ciclo) < INTERVALO_MS:
+        atender_uart()
+        time.sleep_ms(1)
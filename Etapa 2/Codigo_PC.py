@@ -1,98 +1,40 @@
 import math
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import threading, queue, struct, binascii, serial, serial.tools.list_ports, csv
+from tkinter import ttk, filedialog, messagebox, simpledialog
+import time, serial, serial.tools.list_ports, csv
 import numpy as np
 import matplotlib
 matplotlib.use('TkAgg')
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from lector_serie import SerialReader
+from graficos import PlotRenderer
+from entrega import crear_entrega, POLITICAS
+from captura import CaptureRecorder, ReplaySource, CaptureIndex, EXTENSION
+from servidor import ClienteServidor, PUERTO_SERVIDOR
+from filtros import PromedioMovil
+from traza import RegistroTraza
+from formato_trama import (BAUDIOS, OPC_SIN_MUESTRAS,
+                           OPC_DIEZMADO, OPC_DELTA, CMD_FS, CMD_N,
+                           CMD_VENTANA, CMD_INTERVALO, CMD_STREAMING, CMD_OLED,
+                           CMD_SINCRONISMO, CMD_TRAZA, VENTANAS_CMD, MODOS_OLED, MODOS_SINCRONISMO,
+                           SINC_CICLOS, N_VALIDOS, EST_OK, EST_RANGO)
 
 fs = 1024          # Frecuencia de muestreo por defecto (Hz)
-HEADER = b'PICO'   # Cabecera del paquete binario recibido por UART
-
-
-# Clase encargada de la lectura asíncrona del puerto serie
-
-class SerialReader(threading.Thread):
-    def __init__(self, ser, data_queue):
-        super().__init__(daemon=True)
-        self.ser = ser
-        self.data_queue = data_queue
-        self.running = True
-        self.buffer = b''  # Buffer temporal para armar paquetes completos
-
-    def run(self):
-        #Hilo principal de lectura del puerto serie
-        while self.running:
-            try:
-                data = self.ser.read(self.ser.in_waiting or 1)
-                if data:
-                    self.buffer += data
-                    self._process_buffer()
-            except Exception:
-                break
-
-    def _process_buffer(self):
-        #Analiza el buffer, valida el CRC y extrae muestras + FFT + RMS + THD
-        while True:
-            header_index = self.buffer.find(HEADER)
-            if header_index == -1 or len(self.buffer) < header_index + 4:
-                return  # No hay encabezado completo
-            self.buffer = self.buffer[header_index:]
-
-            try:
-                # Verifica que haya suficientes bytes para los campos fijos
-                if len(self.buffer) < 4 + 4 + 2:
-                    return
-
-                # Decodificación del encabezado del paquete
-                fs = struct.unpack_from('<I', self.buffer, 4)[0]
-                n_samples = struct.unpack_from('<H', self.buffer, 8)[0]
-
-                # Calcula posiciones de cada sección del paquete
-                samples_start = 10
-                samples_end = samples_start + n_samples * 2
-                if len(self.buffer) < samples_end + 2:
-                    return
-
-                m_samples = struct.unpack_from('<H', self.buffer, samples_end)[0]
-                fft_start = samples_end + 2
-                fft_end = fft_start + m_samples * 8
-                rms_start = fft_end
-                thd_start = rms_start + 4
-                crc_start = thd_start + 4
-                expected_total_len = crc_start + 4
-
-                if len(self.buffer) < expected_total_len:
-                    return  # Paquete incompleto
-
-                # Extrae el paquete completo
-                payload = self.buffer[:expected_total_len]
-                self.buffer = self.buffer[expected_total_len:]
-
-                # --- Validación del CRC ---
-                crc_recv = struct.unpack_from('<I', payload, crc_start)[0]
-                crc_calc = binascii.crc32(payload[4:crc_start]) & 0xffffffff
-                if crc_recv != crc_calc:
-                    continue  # Se descarta si el CRC no coincide
-
-                # --- Decodificación de los datos binarios ---
-                samples = (np.frombuffer(payload[samples_start:samples_end], dtype=np.int16))/10
-                fft_data = payload[fft_start:fft_end]
-                fft_pairs = struct.iter_unpack('<ff', fft_data)
-                freqs, amps = zip(*fft_pairs) if m_samples > 0 else ([], [])
-                rms = struct.unpack_from('<f', payload, rms_start)[0]
-                thd = struct.unpack_from('<f', payload, thd_start)[0]
-
-                # Envía los datos procesados al hilo principal mediante la cola
-                self.data_queue.put((samples, np.array(freqs), np.array(amps), rms, thd, fs))
-            except Exception:
-                return
-
-    def stop(self):
-        """Detiene el hilo de lectura"""
-        self.running = False
+VELOCIDADES = {"x1": 1.0, "x10": 10.0, "Máx": None}   # Velocidades de reproducción de capturas
+PERIODO_REFRESCO_MS = 33   # Período de actualización de los gráficos (~30 fps)
+VENTANAS_PROM_MOV = ("No", "3", "5", "11", "21")   # Promedio móvil sobre la señal graficada
+# Formatos de trama ofrecidos al conectar: (versión, opciones, diezmado)
+MODOS_TRAMA = {
+    "v1 completas": (1, 0, 1),
+    "v2 delta": (2, OPC_DELTA, 1),
+    "v2 diezmadas x4": (2, OPC_DIEZMADO | OPC_DELTA, 4),
+    "v2 sin muestras": (2, OPC_SIN_MUESTRAS, 1),
+}
+NOMBRES_COMANDO = {CMD_FS: "fs", CMD_N: "N", CMD_VENTANA: "Ventana",
+                   CMD_INTERVALO: "Intervalo", CMD_STREAMING: "Streaming", CMD_OLED: "OLED",
+                   CMD_SINCRONISMO: "Sincronismo", CMD_TRAZA: "Traza"}
+PERIODO_HUD = 0.5          # Segundos entre actualizaciones de la superposición de tiempos
 
 
 # Clase principal de la aplicación (interfaz gráfica + lógica)
@@ -101,19 +43,23 @@ class PicoFFTApp:
     def __init__(self, root):
         self.root = root
         self.root.title("PES - Etapa 2 - Fortunati / Martinez")
-        self.data_queue = queue.Queue()    # Cola para recibir datos del hilo serie
+        self.data_queue = crear_entrega()    # Canal para recibir datos del hilo serie
         self.serial_thread = None
+        self.recorder = None
         self.ser = None
         self.connected = False
         self.paused = False
+        self.filtro = None
+        self.traza = RegistroTraza()     # Tiempos por trama para la superposición y la exportación
+        self._hud_previo = None          # (instante, bytes recibidos) de la última actualización
 
-        # Variables de datos
+        # Variables de datos (samples son las muestras recibidas; vista, las que se grafican)
         self.samples = np.array([])
+        self.vista = self.samples
         self.fft_freqs = np.array([])
         self.fft_amps = np.array([])
         self.rms = 0
         self.thd = 0
-        self.annotation = None
 
         # Construcción de la UI
         self._build_ui()
@@ -151,6 +97,84 @@ class PicoFFTApp:
         self.freq_entry.grid(row=0, column=8)
         ttk.Button(top_frame, text="Enviar Frecuencia", command=self.enviar_frecuencia).grid(row=0, column=9)
 
+        # Política de entrega de tramas hacia la GUI (se aplica al conectar)
+        ttk.Label(top_frame, text="Entrega:").grid(row=0, column=10)
+        self.policy_cb = ttk.Combobox(top_frame, width=10, state="readonly",
+                                      values=list(POLITICAS))
+        self.policy_cb.current(0)
+        self.policy_cb.grid(row=0, column=11)
+
+        # Grabación continua y reproducción de capturas
+        self.record_btn = ttk.Button(top_frame, text="Grabar", command=self.toggle_record)
+        self.record_btn.grid(row=0, column=12)
+        ttk.Button(top_frame, text="Reproducir", command=self.start_replay).grid(row=0, column=13)
+        self.speed_cb = ttk.Combobox(top_frame, width=5, state="readonly", values=list(VELOCIDADES))
+        self.speed_cb.current(0)
+        self.speed_cb.grid(row=0, column=14)
+        ttk.Button(top_frame, text="Abrir captura", command=self.open_capture).grid(row=0, column=15)
+
+        # Protocolo a negociar con el dispositivo (se aplica al conectar)
+        ttk.Label(top_frame, text="Baudios:").grid(row=0, column=16)
+        self.baud_cb = ttk.Combobox(top_frame, width=7, state="readonly", values=list(BAUDIOS))
+        self.baud_cb.current(0)
+        self.baud_cb.grid(row=0, column=17)
+        ttk.Label(top_frame, text="Muestras:").grid(row=0, column=18)
+        self.modo_cb = ttk.Combobox(top_frame, width=15, state="readonly", values=list(MODOS_TRAMA))
+        self.modo_cb.current(0)
+        self.modo_cb.grid(row=0, column=19)
+        ttk.Button(top_frame, text="Servidor...", command=self.conectar_servidor).grid(row=0, column=20)
+
+        # Filtro de la señal graficada (sólo visualización, no afecta al espectro)
+        ttk.Label(top_frame, text="Prom. móvil:").grid(row=0, column=21)
+        self.filtro_cb = ttk.Combobox(top_frame, width=4, state="readonly", values=VENTANAS_PROM_MOV)
+        self.filtro_cb.current(0)
+        self.filtro_cb.grid(row=0, column=22)
+        self.filtro_cb.bind("<<ComboboxSelected>>", lambda e: self._elegir_filtro())
+
+        # Superposición con los tiempos por etapa y exportación de la traza
+        self.hud_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Tiempos", variable=self.hud_var,
+                        command=self.toggle_hud).grid(row=0, column=23)
+        ttk.Button(top_frame, text="Exportar traza", command=self.export_trace).grid(row=0, column=24)
+
+        # --- Comandos al dispositivo (se aplican en la trama siguiente) ---
+        cmd_frame = ttk.Frame(top_frame)
+        cmd_frame.grid(row=1, column=0, columnspan=20, sticky="w")
+        ttk.Label(cmd_frame, text="N:").grid(row=0, column=0)
+        self.n_cb = ttk.Combobox(cmd_frame, width=6, state="readonly", values=list(N_VALIDOS))
+        self.n_cb.set(1024)
+        self.n_cb.grid(row=0, column=1)
+        self.n_cb.bind("<<ComboboxSelected>>",
+                       lambda e: self._enviar_comando(CMD_N, int(self.n_cb.get())))
+        ttk.Label(cmd_frame, text="Ventana:").grid(row=0, column=2)
+        self.ventana_cb = ttk.Combobox(cmd_frame, width=9, state="readonly", values=VENTANAS_CMD)
+        self.ventana_cb.current(0)
+        self.ventana_cb.grid(row=0, column=3)
+        self.ventana_cb.bind("<<ComboboxSelected>>",
+                             lambda e: self._enviar_comando(CMD_VENTANA, self.ventana_cb.current()))
+        ttk.Label(cmd_frame, text="Intervalo (ms):").grid(row=0, column=4)
+        self.intervalo_entry = ttk.Entry(cmd_frame, width=7)
+        self.intervalo_entry.insert(0, "0")
+        self.intervalo_entry.grid(row=0, column=5)
+        ttk.Button(cmd_frame, text="Enviar", command=self.enviar_intervalo).grid(row=0, column=6)
+        self.streaming_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(cmd_frame, text="Streaming", variable=self.streaming_var,
+                        command=lambda: self._enviar_comando(
+                            CMD_STREAMING, int(self.streaming_var.get()))).grid(row=0, column=7)
+        self.oled_cb = ttk.Combobox(cmd_frame, width=8, state="readonly", values=MODOS_OLED)
+        self.oled_cb.current(1)
+        self.oled_cb.grid(row=0, column=8)
+        self.oled_cb.bind("<<ComboboxSelected>>",
+                          lambda e: self._enviar_comando(CMD_OLED, self.oled_cb.current()))
+        ttk.Label(cmd_frame, text="Sincronismo:").grid(row=0, column=9)
+        self.sinc_cb = ttk.Combobox(cmd_frame, width=7, state="readonly", values=MODOS_SINCRONISMO)
+        self.sinc_cb.current(SINC_CICLOS)
+        self.sinc_cb.grid(row=0, column=10)
+        self.sinc_cb.bind("<<ComboboxSelected>>",
+                          lambda e: self._enviar_comando(CMD_SINCRONISMO, self.sinc_cb.current()))
+        self.cmd_lbl = ttk.Label(cmd_frame, text="")
+        self.cmd_lbl.grid(row=0, column=11, padx=10)
+
         # --- Frame para gráficos (señal y FFT) ---
         plot_frame = ttk.Frame(self.root)
         plot_frame.grid(row=1, column=0, sticky="nsew")
@@ -171,6 +195,7 @@ class PicoFFTApp:
         # Inserta la figura en el GUI
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        self.renderer = PlotRenderer(self.fig, self.ax_time, self.ax_fft, self.canvas)
 
         # Barra de herramientas de Matplotlib
         toolbar_frame = ttk.Frame(self.root)
@@ -178,6 +203,10 @@ class PicoFFTApp:
         self.toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame)
         self.toolbar.update()
 
+        # Barra de estado con los contadores de tramas
+        self.stats_lbl = ttk.Label(self.root, text="", anchor="w")
+        self.stats_lbl.grid(row=3, column=0, sticky="ew")
+
         # Evento del mouse para mostrar info en el espectro
         self.canvas.mpl_connect("motion_notify_event", self._on_mouse_move)
 
@@ -198,8 +227,12 @@ class PicoFFTApp:
         if not self.connected:
             try:
                 # Apertura del puerto serie
-                self.ser = serial.Serial(self.port_cb.get(), 115200, timeout=1)
-                self.serial_thread = SerialReader(self.ser, self.data_queue)
+                # Timeout corto: el hilo lector también escribe los comandos entre lecturas
+                self.ser = serial.Serial(self.port_cb.get(), 115200, timeout=0.05)
+                self.data_queue = crear_entrega(self.policy_cb.get())
+                self.serial_thread = SerialReader(self.ser, self.data_queue,
+                                                  MODOS_TRAMA[self.modo_cb.get()],
+                                                  int(self.baud_cb.get()), self.traza)
                 self.serial_thread.start()
                 self.connected = True
                 self.status_lbl.config(text="Conectado", foreground="green")
@@ -208,19 +241,127 @@ class PicoFFTApp:
                 messagebox.showerror("Error", str(e))
         else:
             # Cierre ordenado de la conexión
+            if self.recorder:
+                self.toggle_record()
             if self.serial_thread:
                 self.serial_thread.stop()
+            if isinstance(self.serial_thread, SerialReader):
+                try:
+                    self.serial_thread.restablecer()
+                except Exception:
+                    pass
             if self.ser:
                 self.ser.close()
+                self.ser = None
             self.connected = False
             self.status_lbl.config(text="Desconectado", foreground="red")
             self.connect_btn.config(text="Conectar")
 
-    def enviar_frecuencia(self):
-        #Envía una frecuencia al microcontrolador vía UART (ajustada a potencia de 2)
-        if not self.connected or not self.ser:
+    def start_replay(self, file_path=None, inicio=0):
+        #Reproduce una captura grabada alimentando la misma cola que el puerto serie
+        if self.connected:
+            messagebox.showwarning("Aviso", "Debe desconectar primero el dispositivo.")
+            return
+        file_path = file_path or filedialog.askopenfilename(
+            filetypes=[("Capturas PICO", "*" + EXTENSION)])
+        if not file_path:
+            return
+        self.data_queue = crear_entrega(self.policy_cb.get())
+        self.serial_thread = ReplaySource(file_path, self.data_queue,
+                                          velocidad=VELOCIDADES[self.speed_cb.get()],
+                                          inicio=inicio)
+        self.serial_thread.start()
+        self.connected = True
+        self.status_lbl.config(text="Reproduciendo", foreground="blue")
+        self.connect_btn.config(text="Detener")
+
+    def conectar_servidor(self):
+        #Se suscribe a un dispositivo del servidor de adquisición (servidor.py)
+        if self.connected:
+            messagebox.showwarning("Aviso", "Debe desconectar primero el dispositivo.")
+            return
+        destino = simpledialog.askstring("Servidor", "host:puerto/dispositivo",
+                                         initialvalue=f"127.0.0.1:{PUERTO_SERVIDOR}/0")
+        if not destino:
+            return
+        try:
+            direccion, _, dispositivo = destino.partition('/')
+            host, _, puerto = direccion.partition(':')
+            self.data_queue = crear_entrega(self.policy_cb.get())
+            self.serial_thread = ClienteServidor(self.data_queue, int(dispositivo or 0), host,
+                                                 int(puerto or PUERTO_SERVIDOR))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.serial_thread.start()
+        self.connected = True
+        nombre = self.serial_thread.dispositivos[self.serial_thread.dispositivo]
+        self.status_lbl.config(text=f"Servidor: {nombre}", foreground="blue")
+        self.connect_btn.config(text="Detener")
+
+    def _servidor_perdido(self):
+        #El hilo del cliente terminó sin que lo pidiera la GUI: se cierra la suscripción
+        motivo = self.serial_thread.error
+        self.toggle_connection()
+        self.status_lbl.config(text="Servidor desconectado", foreground="red")
+        if motivo:
+            messagebox.showwarning("Servidor", motivo)
+
+    def open_capture(self):
+        #Abre una captura para navegarla con su índice (tendencias + búsqueda)
+        file_path = filedialog.askopenfilename(filetypes=[("Capturas PICO", "*" + EXTENSION)])
+        if file_path:
+            CaptureBrowser(self, file_path)
+
+    def toggle_record(self):
+        #Inicia o detiene la grabación continua de las tramas recibidas
+        if self.recorder:
+            if isinstance(self.serial_thread, SerialReader):
+                self.serial_thread.parser.on_trama = None
+            self.recorder.stop()
+            self.recorder = None
+            self.record_btn.config(text="Grabar")
+            return
+        if not self.connected or not isinstance(self.serial_thread, SerialReader):
+            messagebox.showwarning("Aviso", "Debe conectar primero el dispositivo.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=EXTENSION)
+        if file_path:
+            self.recorder = CaptureRecorder(file_path)
+            self.recorder.start()
+            self.serial_thread.parser.on_trama = self.recorder.escribir
+            self.record_btn.config(text="Detener grabación")
+
+    def _enviar_comando(self, comando, valor):
+        #Encola un comando para el dispositivo; la respuesta se muestra al llegar
+        if not self.connected or not isinstance(self.serial_thread, SerialReader):
             messagebox.showwarning("Aviso", "Debe conectar primero el dispositivo.")
             return
+        self.serial_thread.enviar_comando(comando, valor)
+        self.cmd_lbl.config(text=f"{NOMBRES_COMANDO[comando]} = {valor}: enviando...",
+                            foreground="black")
+
+    def _mostrar_respuesta(self, comando, estado, valor):
+        #Muestra el resultado de un comando (llamado desde el bucle de la GUI)
+        nombre = NOMBRES_COMANDO.get(comando, str(comando))
+        if comando == CMD_VENTANA and valor < len(VENTANAS_CMD):
+            valor = VENTANAS_CMD[valor]
+        elif comando == CMD_OLED and valor < len(MODOS_OLED):
+            valor = MODOS_OLED[valor]
+        elif comando == CMD_SINCRONISMO and valor < len(MODOS_SINCRONISMO):
+            valor = MODOS_SINCRONISMO[valor]
+        if estado is None:
+            texto, color = f"{nombre} = {valor}: sin respuesta del dispositivo", "red"
+        elif estado == EST_OK:
+            texto, color = f"{nombre} = {valor}: aplicado", "green"
+        elif estado == EST_RANGO:
+            texto, color = f"{nombre}: fuera de rango (vigente: {valor})", "orange"
+        else:
+            texto, color = f"{nombre}: comando no soportado", "red"
+        self.cmd_lbl.config(text=texto, foreground=color)
+
+    def enviar_frecuencia(self):
+        #Envía una frecuencia al microcontrolador (ajustada a potencia de 2)
         try:
             frecuencia = int(self.freq_entry.get())
             if frecuencia <= 0:
@@ -230,14 +371,22 @@ class PicoFFTApp:
             # Ajuste a la potencia de 2 más cercana
             potencia = round(math.log2(frecuencia))
             frecuencia_corregida = 2 ** potencia
+            if frecuencia_corregida > 0xFFFF:
+                messagebox.showerror("Error", "Frecuencia fuera de rango.")
+                return
 
-            # Envío binario (4 bytes, formato little-endian)
-            data = struct.pack('<I', frecuencia_corregida)
-            self.ser.write(data)
+            self._enviar_comando(CMD_FS, frecuencia_corregida)
+        except ValueError:
+            messagebox.showerror("Error", "Ingrese un valor numérico válido.")
 
-            messagebox.showinfo("Éxito",
-                                f"Frecuencia corregida enviada: {frecuencia_corregida} Hz "
-                                f"(original: {frecuencia} Hz)")
+    def enviar_intervalo(self):
+        #Envía el período mínimo entre tramas en ms
+        try:
+            intervalo = int(self.intervalo_entry.get())
+            if not 0 <= intervalo <= 0xFFFF:
+                messagebox.showerror("Error", "El intervalo debe estar entre 0 y 65535 ms.")
+                return
+            self._enviar_comando(CMD_INTERVALO, intervalo)
         except ValueError:
             messagebox.showerror("Error", "Ingrese un valor numérico válido.")
 
@@ -268,52 +417,97 @@ class PicoFFTApp:
     def clear_graphs(self):
         #Limpia los gráficos y reinicia las variables
         self.samples = np.array([])
+        self.vista = self.samples
         self.fft_freqs = np.array([])
         self.fft_amps = np.array([])
         self.rms = 0
         self.thd = 0
-        self.ax_time.cla()
-        self.ax_fft.cla()
-        self.ax_time.set_title("Señal en el tiempo")
-        self.ax_fft.set_title("FFT")
-        self.canvas.draw()
+        self.renderer.limpiar()
 
     def update_plot_loop(self):
         #Bucle periódico que actualiza los gráficos con los datos recibidos
         if not self.paused and not self.data_queue.empty():
-            self.samples, self.fft_freqs, self.fft_amps, self.rms, self.thd, self.fs = self.data_queue.get()
-            self._redraw_plots()
-        self.root.after(200, self.update_plot_loop)
+            trama = self.data_queue.get()
+            self.traza.retirada(trama)
+            self.mostrar_trama(trama)
+        if self.hud_var.get():
+            self._update_hud()
+        if isinstance(self.serial_thread, SerialReader):
+            while not self.serial_thread.respuestas.empty():
+                self._mostrar_respuesta(*self.serial_thread.respuestas.get_nowait())
+        elif (isinstance(self.serial_thread, ClienteServidor) and self.connected
+              and not self.serial_thread.is_alive()):
+            self._servidor_perdido()
+        self._update_stats()
+        self.root.after(PERIODO_REFRESCO_MS, self.update_plot_loop)
+
+    def _elegir_filtro(self):
+        valor = self.filtro_cb.get()
+        self.filtro = None if valor == VENTANAS_PROM_MOV[0] else PromedioMovil(int(valor))
+
+    def mostrar_trama(self, trama):
+        #Carga una trama decodificada y actualiza los gráficos
+        self.samples, self.fft_freqs, self.fft_amps, self.rms, self.thd, self.fs = trama
+        self.vista = self.samples
+        if self.filtro is not None and self.samples.size:
+            # Las tramas no son contiguas en el tiempo: cada una se filtra por separado.
+            # El filtro sólo afecta al gráfico; samples (y el CSV) quedan como llegaron
+            self.vista = self.filtro.filtrar(self.samples)
+        self._redraw_plots()
+
+    def _update_stats(self):
+        #Muestra los contadores de tramas en la barra de estado
+        entregadas, descartadas, pendientes = self.data_queue.stats()
+        texto = (f"Tramas entregadas: {entregadas}   "
+                 f"Descartadas: {descartadas}   En cola: {pendientes}")
+        if self.connected and isinstance(self.serial_thread, SerialReader):
+            texto += f"   Protocolo: {self.serial_thread.protocolo}"
+        self.stats_lbl.config(text=texto)
 
     def _redraw_plots(self):
-        #Actualiza los gráficos de tiempo y FFT con los nuevos datos
-        if hasattr(self, 'fs') and self.fs > 0:
-            t = (np.arange(len(self.samples)) / self.fs) * 1000
-        else:
-            t = np.arange(len(self.samples))
-
-        self.ax_time.cla()
-        self.ax_fft.cla()
-
-        # Gráfico de la señal
-        self.ax_time.plot(t, self.samples, color='blue')
-        self.ax_time.set_xlim(0, 100)
-        #self.ax_time.set_xlim(t[0], t[-1])
-        self.ax_time.set_ylim(min(self.samples) * 1.1,
-                              max(self.samples) * 1.1 if max(self.samples) > 0 else 1)
-        self.ax_time.set_title(f"Señal - RMS: {self.rms:.2f}")
-        self.ax_time.set_xlabel("Tiempo [ms]")
-        self.ax_time.set_ylabel("Amplitud")
-
-        # Gráfico del espectro FFT
-        self.fft_bar = self.ax_fft.bar(self.fft_freqs, self.fft_amps, color='orange')
-        self.ax_fft.set_xlim(0, max(self.fft_freqs) * 1.05 if self.fft_freqs.size > 0 else 1)
-        self.ax_fft.set_ylim(0, max(self.fft_amps) * 1.2 if self.fft_amps.size > 0 else 1)
-        self.ax_fft.set_title(f"FFT - THD: {self.thd :.2f}%")
-        self.ax_fft.set_xlabel("Frecuencia [Hz]")
-        self.ax_fft.set_ylabel("Amplitud")
-
-        self.canvas.draw()
+        #Actualiza los gráficos de tiempo y FFT con los nuevos datos (sólo datos de los artistas)
+        t0 = time.perf_counter()
+        self.renderer.actualizar(self.vista, getattr(self, 'fs', 0), self.fft_freqs,
+                                 self.fft_amps, self.rms, self.thd)
+        self.traza.dibujada(t0, time.perf_counter())
+
+    # Superposición de tiempos y traza
+
+    def toggle_hud(self):
+        #Muestra u oculta los tiempos; el dispositivo sólo los envía mientras están visibles
+        activo = self.hud_var.get()
+        if self.connected and isinstance(self.serial_thread, SerialReader):
+            self._enviar_comando(CMD_TRAZA, int(activo))
+        self._hud_previo = None
+        if not activo:
+            self.renderer.mostrar_hud(None)
+
+    def _update_hud(self):
+        #Recalcula la superposición cada PERIODO_HUD segundos
+        ahora = time.perf_counter()
+        if self._hud_previo is not None and ahora - self._hud_previo[0] < PERIODO_HUD:
+            return
+        leidos = getattr(self.serial_thread, 'bytes_recibidos', 0)
+        lineas = []
+        r = self.traza.resumen()
+        for nombre, (p50, p99) in r['etapas'].items():
+            lineas.append(f"{nombre:<10} {p50:7.2f} {p99:7.2f} ms")
+        lineas.append(f"{'fps':<10} {r['fps']:7.1f}  ({r['recibidas_s']:.1f} tramas/s)")
+        if self._hud_previo is not None and isinstance(self.serial_thread, SerialReader):
+            t_prev, leidos_prev = self._hud_previo
+            # 10 bits por byte en la UART (8N1)
+            uso = (leidos - leidos_prev) * 10 / (ahora - t_prev) / self.ser.baudrate
+            lineas.append(f"{'enlace':<10} {uso * 100:7.1f} %")
+        self._hud_previo = (ahora, leidos)
+        self.renderer.mostrar_hud(f"{'etapa':<10} {'p50':>7} {'p99':>7}\n" + "\n".join(lineas))
+
+    def export_trace(self):
+        #Guarda la traza de las últimas tramas (JSON para chrome://tracing o CSV)
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Trace Event JSON", "*.json"), ("CSV", "*.csv")])
+        if file_path:
+            self.traza.exportar(file_path)
 
     # Eventos de interfaz y visualización
     
@@ -338,19 +532,101 @@ class PicoFFTApp:
             freq = self.fft_freqs[idx]
             amp = self.fft_amps[idx]
 
-            # Quita la anotación anterior
-            if self.annotation:
-                self.annotation.set_visible(False)
-
-            # Crea una nueva anotación cerca del punto
-            self.annotation = self.ax_fft.annotate(
-                f"Freq: {freq:.2f} Hz\nAmp: {amp:.4f}",
-                xy=(freq, amp),
-                xytext=(freq, amp + max(self.fft_amps) * 0.1),
-                arrowprops=dict(facecolor='black', shrink=0.05),
-                bbox=dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.7)
-            )
-            self.canvas.draw()
+            # Mueve la anotación cerca del punto
+            self.renderer.anotar(freq, amp, max(self.fft_amps))
+
+
+# Ventana de navegación de capturas: tendencias de RMS/THD sobre toda la
+# captura (leídas del índice mapeado en memoria) y búsqueda de tramas por
+# número o por tiempo. Sólo se decodifica la trama seleccionada.
+
+class CaptureBrowser:
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.captura = CaptureIndex(path)
+        if len(self.captura) == 0:
+            messagebox.showwarning("Aviso", "La captura no contiene tramas")
+            return
+
+        self.win = tk.Toplevel(app.root)
+        self.win.title(f"Captura - {path}")
+        self.win.rowconfigure(0, weight=1)
+        self.win.columnconfigure(0, weight=1)
+
+        # Gráfico de tendencias
+        self.fig = Figure(figsize=(7, 3), constrained_layout=True)
+        self.ax_rms = self.fig.add_subplot(111)
+        self.ax_thd = self.ax_rms.twinx()
+        self.ax_rms.set_xlabel("Tiempo [s]")
+        self.ax_rms.set_ylabel("RMS", color='blue')
+        self.ax_thd.set_ylabel("THD [%]", color='orange')
+        (self.linea_rms,) = self.ax_rms.plot([], [], color='blue')
+        (self.linea_thd,) = self.ax_thd.plot([], [], color='orange')
+        self.cursor = self.ax_rms.axvline(0, color='red')
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.win)
+        self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        toolbar_frame = ttk.Frame(self.win)
+        toolbar_frame.grid(row=1, column=0, sticky="ew")
+        self.toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame)
+        self.toolbar.update()
+
+        # Controles de búsqueda
+        ctrl = ttk.Frame(self.win)
+        ctrl.grid(row=2, column=0, sticky="ew")
+        ctrl.columnconfigure(0, weight=1)
+        self.scale = ttk.Scale(ctrl, from_=0, to=len(self.captura) - 1,
+                               command=lambda v: self.ir_a(int(float(v))))
+        self.scale.grid(row=0, column=0, sticky="ew")
+        self.info_lbl = ttk.Label(ctrl, width=28)
+        self.info_lbl.grid(row=0, column=1)
+        ttk.Label(ctrl, text="t (s):").grid(row=0, column=2)
+        self.t_entry = ttk.Entry(ctrl, width=8)
+        self.t_entry.grid(row=0, column=3)
+        ttk.Button(ctrl, text="Ir", command=self._ir_a_tiempo).grid(row=0, column=4)
+        ttk.Button(ctrl, text="Reproducir desde aquí",
+                   command=lambda: app.start_replay(path, self.actual)).grid(row=0, column=5)
+
+        self.actual = 0
+        self.ax_rms.set_xlim(0, max(self.captura.duracion, 1e-3))
+        self._actualizar_tendencia()
+        self.ax_rms.callbacks.connect('xlim_changed', lambda ax: self._actualizar_tendencia())
+        self.canvas.mpl_connect("button_press_event", self._on_click)
+        self.ir_a(0)
+
+    def _actualizar_tendencia(self):
+        #Relee del índice sólo el rango visible, diezmado al ancho del gráfico
+        t_ini, t_fin = self.ax_rms.get_xlim()
+        i0 = self.captura.buscar_tiempo(max(t_ini, 0))
+        i1 = self.captura.buscar_tiempo(max(t_fin, 0)) + 1
+        t, rms = self.captura.tendencia('rms', i0, i1)
+        _, thd = self.captura.tendencia('thd', i0, i1)
+        self.linea_rms.set_data(t, rms)
+        self.linea_thd.set_data(t, thd)
+        for ax, v in ((self.ax_rms, rms), (self.ax_thd, thd)):
+            if v.size:
+                ax.set_ylim(0, float(np.max(v)) * 1.1 or 1)
+        self.canvas.draw_idle()
+
+    def ir_a(self, i):
+        #Muestra la trama i en la ventana principal
+        self.actual = i
+        t = float(self.captura.indice['t'][i]) - self.captura.t0
+        self.cursor.set_xdata([t, t])
+        self.info_lbl.config(text=f"Trama {i + 1}/{len(self.captura)}  t={t:.2f} s")
+        self.app.mostrar_trama(self.captura.trama(i))
+        self.canvas.draw_idle()
+
+    def _ir_a_tiempo(self):
+        try:
+            self.scale.set(self.captura.buscar_tiempo(float(self.t_entry.get())))
+        except ValueError:
+            messagebox.showerror("Error", "Ingrese un valor numérico válido.")
+
+    def _on_click(self, event):
+        #Click sobre la tendencia: salta a la trama de ese instante
+        if event.inaxes in (self.ax_rms, self.ax_thd) and not self.toolbar.mode:
+            self.scale.set(self.captura.buscar_tiempo(event.xdata))
 
 # Punto de entrada del programa
 
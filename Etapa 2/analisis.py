@@ -0,0 +1,113 @@
+from collections import namedtuple
+import numpy as np
+from functools import lru_cache
+from formato_trama import ESCALA_MUESTRAS
+from procesamiento import ventana, tabla_interpolacion
+
+# Análisis por lotes del lado de la PC: reimplementa `procesar` de
+# procesamiento.py (módulo del dispositivo) sobre una matriz de tramas (una
+# trama por fila), sin bucles de Python por muestra, por pico ni por trama.
+
+N_ARMONICOS = 10        # Armónicos considerados (igual que en el dispositivo)
+TOLERANCIA = 0.10       # Tolerancia relativa para asociar un pico a n*f1
+UMBRAL_REL = 0.01       # Umbral de detección de picos relativo al máximo
+
+# Conversión de las muestras int16 de la trama (ya divididas por ESCALA_MUESTRAS) a volts
+ESCALA_VOLTS = 3.3 / 32767 * ESCALA_MUESTRAS
+
+ResultadoLote = namedtuple('ResultadoLote', 'f1 a1 vrms thd arm_f arm_a n_arm')
+
+
+def muestras_a_volts(samples):
+    #Convierte las muestras decodificadas de la trama a volts
+    return np.asarray(samples, dtype=np.float64) * ESCALA_VOLTS
+
+
+@lru_cache(maxsize=16)
+def _parametros(fs, N, nombre_ventana):
+    #Ventana (la misma del dispositivo), eje de frecuencias y escala de amplitud
+    window = ventana(nombre_ventana, N)
+    # Eje de frecuencias igual al del dispositivo: bins k * fs / N
+    return window, np.arange(N // 2) * (fs / N), (N / np.sum(window)) * (2 / N)
+
+
+@lru_cache(maxsize=8)
+def _tabla(nombre_ventana):
+    return tuple(np.array(v) for v in tabla_interpolacion(nombre_ventana))
+
+
+def interpolar_picos(amps, bins, nombre_ventana='hann'):
+    #Versión vectorizada de procesamiento.interpolar_pico: amps (B, K), bins (B, M)
+    #de picos interiores; devuelve (posición en bins, amplitud corregida)
+    razones, desp, gan = _tabla(nombre_ventana)
+    a = np.take_along_axis(amps, bins, axis=1)
+    izq = np.take_along_axis(amps, bins - 1, axis=1)
+    der = np.take_along_axis(amps, bins + 1, axis=1)
+    signo = np.where(der > izq, 1, -1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = np.interp(np.maximum(der, izq) / a, razones, desp)
+    return bins + signo * d, a / np.interp(d, desp, gan)
+
+
+def espectro_lote(frames, fs, nombre_ventana='hann'):
+    #Espectro de amplitud (mitad positiva) de cada fila, con la misma escala que procesar
+    frames = np.atleast_2d(np.asarray(frames, dtype=np.float64))
+    N = frames.shape[1]
+    centradas = frames - frames.mean(axis=1, keepdims=True)
+    window, freqs_pos, escala = _parametros(fs, N, nombre_ventana)
+    amplitudes = escala * np.abs(np.fft.rfft(centradas * window, axis=1))
+    return centradas, freqs_pos, amplitudes[:, :N // 2]
+
+
+def analizar_lote(frames, fs, n_armonicos=N_ARMONICOS, tolerancia=TOLERANCIA,
+                  umbral_rel=UMBRAL_REL, nombre_ventana='hann'):
+    #Analiza un lote (B, N) de tramas y devuelve f1, a1, Vrms, THD y armónicos de cada una
+    centradas, freqs_pos, amps = espectro_lote(frames, fs, nombre_ventana)
+
+    # --- Detección de picos: máscaras contra los vecinos desplazados ---
+    centro = amps[:, 1:-1]
+    umbral = umbral_rel * amps.max(axis=1, keepdims=True)
+    es_pico = (centro > amps[:, :-2]) & (centro > amps[:, 2:]) & (centro > umbral)
+    a_pico = np.where(es_pico, centro, -np.inf)
+    f_pico = freqs_pos[1:-1]
+
+    # Fundamental: el pico de mayor amplitud
+    hay_pico = es_pico.any(axis=1)
+    i_f1 = np.argmax(a_pico, axis=1)
+    f1_bin = np.where(hay_pico, f_pico[i_f1], 0.0)
+
+    # TRMS
+    vrms = np.sqrt(np.mean(centradas ** 2, axis=1))
+
+    # --- Asociación de cada pico con su orden armónico n = round(f / f1) ---
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = np.rint(f_pico[None, :] / f1_bin[:, None])
+    valido = (es_pico & (f1_bin[:, None] > 0) & (n >= 1) & (n <= n_armonicos)
+              & (np.abs(f_pico[None, :] - n * f1_bin[:, None]) <= f1_bin[:, None] * tolerancia))
+
+    # Orden por n y, dentro de un mismo n, por amplitud decreciente; como en procesar
+    # se conserva sólo el mayor pico de cada armónico
+    clave_n = np.where(valido, n, np.inf)
+    orden = np.lexsort((-a_pico, clave_n), axis=1)
+    n_ord = np.take_along_axis(clave_n, orden, axis=1)
+    primero = np.take_along_axis(valido, orden, axis=1)
+    primero[:, 1:] &= n_ord[:, 1:] != n_ord[:, :-1]
+    compacto = np.argsort(~primero, axis=1, kind='stable')[:, :n_armonicos]
+    orden = np.take_along_axis(orden, compacto, axis=1)
+    sel_valido = np.take_along_axis(primero, compacto, axis=1)
+    n_arm = sel_valido.sum(axis=1)
+
+    # Interpolación entre bins de los picos elegidos (como en procesar)
+    df = fs / centradas.shape[1]
+    pos, a_int = interpolar_picos(amps, orden + 1, nombre_ventana)
+    arm_f = np.where(sel_valido, pos * df, np.nan)
+    arm_a = np.where(sel_valido, a_int, np.nan)
+    pos1, a1_int = interpolar_picos(amps, (i_f1 + 1)[:, None], nombre_ventana)
+    f1 = np.where(hay_pico, pos1[:, 0] * df, 0.0)
+    a1 = np.where(hay_pico, a1_int[:, 0], 0.0)
+
+    # THD con los armónicos seleccionados, excluyendo el primero
+    suma = np.nansum(arm_a[:, 1:] ** 2, axis=1)
+    thd = (np.sqrt(suma) / (a1 + 1e-12)) * 100
+
+    return ResultadoLote(f1, a1, vrms, thd, arm_f, arm_a, n_arm)
@@ -0,0 +1,335 @@
+import argparse, binascii, csv, io, json, os, platform, queue, resource, sys, tempfile, threading, time, tty
+import numpy as np
+from parser_trama import FrameParser
+from formato_trama import codificar_trama
+from entrega import crear_entrega, POLITICAS
+from captura import CaptureRecorder
+from trama_pico import SerializadorTrama, OPC_DELTA
+from procesamiento import procesar, procesar_ciclos
+from lector_serie import SerialReader
+from graficos import PlotRenderer
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Banco de pruebas de rendimiento de toda la cadena de adquisición, sin
+# hardware ni pantalla. Cada etapa se mide por separado con tramas PICO
+# sintéticas y se reporta: tramas/s, latencia p50/p99 por trama, tramas
+# perdidas y pico de memoria (RSS) del proceso al terminar la etapa.
+#
+#   procesar       procesar() del dispositivo corriendo sobre NumPy
+#   ciclos         procesar() + procesar_ciclos(), el camino de SINC_CICLOS
+#   armar_v1/v2    SerializadorTrama (lo que hace enviar_trama en la Pico)
+#   parser         FrameParser con tramas corruptas (CRC), basura entre
+#                  tramas y lecturas cortadas en lugares arbitrarios
+#   serial_reader  SerialReader leyendo un pseudo-terminal real; la latencia
+#                  va desde que se escribe la trama hasta que sale de la cola
+#   gui            PlotRenderer sobre un canvas Agg (datos + blit)
+#   grabacion      CaptureRecorder.escribir y el volcado a disco
+#   csv            Una fila CSV por trama, como "Guardar CSV"
+#
+# Los resultados se guardan en JSON; con --comparar se contrastan con una
+# corrida anterior y el programa termina con error si alguna etapa empeoró
+# más que la tolerancia.
+
+ETAPAS = ('procesar', 'ciclos', 'armar_v1', 'armar_v2', 'parser', 'serial_reader', 'gui', 'grabacion', 'csv')
+ESPERA_CONSUMIDOR = 0.0002     # Sondeo de la cola en serial_reader (la GUI usa PERIODO_REFRESCO_MS)
+
+
+def rss_max_kb():
+    #Pico de memoria residente del proceso (ru_maxrss está en kB en Linux y en bytes en macOS)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def resumen(latencias, duracion, **extra):
+    #Estadísticas de una etapa a partir de las latencias por trama en segundos
+    lat = np.asarray(latencias) * 1e6
+    r = {'tramas': len(lat), 'tramas_s': len(lat) / duracion if duracion > 0 else 0.0,
+         'p50_us': float(np.percentile(lat, 50)) if len(lat) else None,
+         'p99_us': float(np.percentile(lat, 99)) if len(lat) else None,
+         'max_us': float(np.max(lat)) if len(lat) else None}
+    r.update(extra)
+    r['rss_max_kb'] = rss_max_kb()
+    return r
+
+
+def senal_prueba(N, fs, rng):
+    #Fundamental de 50 Hz con armónicos impares y ruido, centrada, en volts
+    t = np.arange(N) / fs
+    x = sum(0.8 / h * np.sin(2 * np.pi * 50 * h * t) for h in (1, 3, 5, 7))
+    return x + 0.005 * rng.standard_normal(N)
+
+
+def tramas_prueba(N, M, cantidad, rng, corruptas=0.0):
+    #Lista de (bytes, válida); la secuencia de cada trama va en el campo fs
+    x = senal_prueba(N, 4096, rng)
+    samples = np.clip(x / 3.3 * 32767, -32767, 32767).astype('<i2')
+    freqs = 50.0 * np.arange(1, M + 1)
+    amps = 0.8 / np.arange(1, M + 1)
+    tramas = []
+    for i in range(cantidad):
+        trama = bytearray(codificar_trama(samples, i, freqs, amps, 0.6, 40.0))
+        valida = rng.random() >= corruptas
+        if not valida:
+            trama[10 + rng.integers(2 * N)] ^= 0xFF    # Un byte de muestras alterado: CRC inválido
+        tramas.append((bytes(trama), valida))
+    return tramas
+
+
+def flujo(tramas, rng, basura=0.0):
+    #Concatena las tramas intercalando basura (incluye cabeceras falsas) con probabilidad `basura`
+    partes = []
+    for trama, _ in tramas:
+        if rng.random() < basura:
+            partes.append(b'PI' + rng.bytes(int(rng.integers(1, 64))) + b'PIC')
+        partes.append(trama)
+    return b''.join(partes)
+
+
+def cortar(datos, rng, maximo=4096):
+    #Divide el flujo en lecturas de largo aleatorio (cabeceras y tramas partidas)
+    cortes = np.cumsum(rng.integers(1, maximo, size=len(datos) // (maximo // 2) + 2))
+    cortes = cortes[cortes < len(datos)]
+    return [datos[a:b] for a, b in zip(np.concatenate([[0], cortes]), np.concatenate([cortes, [len(datos)]]))]
+
+
+# =====================================================
+#                       ETAPAS
+# =====================================================
+
+def medir(funcion, argumentos):
+    #Llama a funcion(*a) para cada a y devuelve (latencias, duración total)
+    latencias = []
+    t_ini = time.perf_counter()
+    for a in argumentos:
+        t0 = time.perf_counter()
+        funcion(*a)
+        latencias.append(time.perf_counter() - t0)
+    return latencias, time.perf_counter() - t_ini
+
+
+def etapa_procesar(cfg, rng):
+    fs = 4096
+    senales = [senal_prueba(cfg.N, fs, rng) + 1.65 for _ in range(8)]
+    lat, dt = medir(procesar, [(senales[i % 8], fs) for i in range(cfg.tramas)])
+    return resumen(lat, dt)
+
+
+def etapa_ciclos(cfg, rng):
+    fs = 4096
+    senales = [senal_prueba(cfg.N, fs, rng) + 1.65 for _ in range(8)]
+
+    def sincronizado(signal, fs):
+        f1 = procesar(signal, fs)[3]
+        return procesar_ciclos(signal, fs, f1) if f1 > 0 else None
+    lat, dt = medir(sincronizado, [(senales[i % 8], fs) for i in range(cfg.tramas)])
+    return resumen(lat, dt)
+
+
+def etapa_armar(cfg, rng, v2):
+    fs = 4096
+    s = SerializadorTrama(cfg.N)
+    x = senal_prueba(cfg.N, fs, rng)
+    armonicos = [(50.0 * h, 0.8 / h) for h in range(1, cfg.M + 1)]
+    if v2:
+        lat, dt = medir(s.armar_v2, [(x, fs, armonicos, 0.6, 40.0, OPC_DELTA)] * cfg.tramas)
+    else:
+        lat, dt = medir(s.armar, [(x, fs, armonicos, 0.6, 40.0)] * cfg.tramas)
+    return resumen(lat, dt)
+
+
+def etapa_parser(cfg, rng):
+    tramas = tramas_prueba(cfg.N, cfg.M, cfg.tramas, rng, cfg.corruptas)
+    datos = flujo(tramas, rng, cfg.basura)
+    lecturas = cortar(datos, rng)
+    parser = FrameParser()
+    latencias = []
+    recibidas = set()
+    t_ini = time.perf_counter()
+    for lectura in lecturas:
+        t0 = time.perf_counter()
+        parser.alimentar(lectura)
+        for trama in parser.tramas():
+            latencias.append(time.perf_counter() - t0)
+            recibidas.add(trama[5])
+    dt = time.perf_counter() - t_ini
+    validas = {i for i, (_, v) in enumerate(tramas) if v}
+    return resumen(latencias, dt, mb_s=len(datos) / dt / 1e6,
+                   perdidas=len(validas - recibidas), falsas=len(recibidas - validas),
+                   errores_crc=parser.errores_crc, bytes_descartados=parser.bytes_descartados)
+
+
+def etapa_serial_reader(cfg, rng):
+    import serial
+    tramas = tramas_prueba(cfg.N, cfg.M, cfg.tramas, rng, cfg.corruptas)
+    maestro, esclavo = os.openpty()
+    tty.setraw(esclavo)
+    ser = serial.Serial(os.ttyname(esclavo), 115200, timeout=0.05)
+    cola = crear_entrega(cfg.politica)
+    lector = SerialReader(ser, cola)
+    lector.start()
+
+    enviados = {}
+    llegadas = {}
+    fin_envio = threading.Event()
+
+    def consumir():
+        while not (fin_envio.is_set() and cola.empty()):
+            try:
+                trama = cola.get()
+            except queue.Empty:
+                time.sleep(ESPERA_CONSUMIDOR)
+                continue
+            llegadas[trama[5]] = time.perf_counter()
+
+    consumidor = threading.Thread(target=consumir, daemon=True)
+    consumidor.start()
+
+    periodo = 1.0 / cfg.tasa if cfg.tasa > 0 else 0.0
+    t_ini = time.perf_counter()
+    proximo = t_ini
+    i = 0
+    while i < len(tramas) or (cfg.duracion and time.perf_counter() - t_ini < cfg.duracion):
+        # En modo soak (--duracion) las tramas se repiten; la secuencia sigue en el campo fs
+        trama, valida = tramas[i % len(tramas)]
+        if i >= len(tramas):
+            trama = trama[:4] + i.to_bytes(4, 'little') + trama[8:]
+            if valida:
+                trama = trama[:-4] + (binascii.crc32(trama[4:-4]) & 0xFFFFFFFF).to_bytes(4, 'little')
+        if periodo:
+            espera = proximo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            proximo += periodo
+        if valida:
+            enviados[i] = time.perf_counter()
+        os.write(maestro, trama)
+        i += 1
+    # Espera a que el lector vacíe el pseudo-terminal
+    limite = time.perf_counter() + 5.0
+    while len(llegadas) < len(enviados) and time.perf_counter() < limite:
+        time.sleep(0.01)
+    dt = time.perf_counter() - t_ini
+    fin_envio.set()
+    consumidor.join(1.0)
+    lector.stop()
+    lector.join(1.0)
+    ser.close()
+    os.close(maestro)
+    os.close(esclavo)
+
+    latencias = [llegadas[k] - enviados[k] for k in enviados if k in llegadas]
+    entregadas, descartadas, _ = cola.stats()
+    return resumen(latencias, dt, enviadas=i, perdidas=len(enviados) - len(latencias),
+                   descartadas_cola=descartadas, errores_crc=lector.parser.errores_crc,
+                   politica=cfg.politica)
+
+
+def etapa_gui(cfg, rng):
+    fig = Figure(figsize=(8, 5), constrained_layout=True)
+    canvas = FigureCanvasAgg(fig)
+    ax_time, ax_fft = fig.add_subplot(211), fig.add_subplot(212)
+    renderer = PlotRenderer(fig, ax_time, ax_fft, canvas)
+    fs = 4096
+    x = [senal_prueba(cfg.N, fs, rng) for _ in range(8)]
+    freqs = 50.0 * np.arange(1, cfg.M + 1)
+    amps = [0.8 / np.arange(1, cfg.M + 1) * (1 + 0.01 * k) for k in range(8)]
+    n = min(cfg.tramas, 500)     # El dibujo es la etapa más lenta
+    lat, dt = medir(renderer.actualizar, [(x[i % 8], fs, freqs, amps[i % 8], 0.6, 40.0)
+                                          for i in range(n)])
+    return resumen(lat, dt)
+
+
+def etapa_grabacion(cfg, rng):
+    tramas = [t for t, _ in tramas_prueba(cfg.N, cfg.M, min(cfg.tramas, 64), rng)]
+    with tempfile.TemporaryDirectory() as tmp:
+        grabador = CaptureRecorder(os.path.join(tmp, 'benchmark.pico'))
+        grabador.start()
+        lat, dt = medir(grabador.escribir, [(tramas[i % len(tramas)],) for i in range(cfg.tramas)])
+        t0 = time.perf_counter()
+        grabador.stop()
+        grabador.join()
+        dt_total = dt + time.perf_counter() - t0
+        return resumen(lat, dt_total, mb_s=grabador.bytes / dt_total / 1e6,
+                       grabadas=grabador.tramas, perdidas=cfg.tramas - grabador.tramas)
+
+
+def etapa_csv(cfg, rng):
+    x = np.clip(senal_prueba(cfg.N, 4096, rng) / 3.3 * 32767, -32767, 32767).astype(np.int16) / 10
+    salida = io.StringIO()
+    writer = csv.writer(salida)
+    lat, dt = medir(lambda: writer.writerow(x.tolist()), [()] * cfg.tramas)
+    return resumen(lat, dt, mb_s=salida.tell() / dt / 1e6)
+
+
+def correr(cfg):
+    #Corre las etapas elegidas para cada N y devuelve el diccionario de resultados
+    resultados = {}
+    for N in cfg.N_lista:
+        cfg.N = N
+        for nombre in cfg.etapas:
+            rng = np.random.default_rng(cfg.semilla)
+            if nombre in ('armar_v1', 'armar_v2'):
+                r = etapa_armar(cfg, rng, nombre == 'armar_v2')
+            else:
+                r = globals()['etapa_' + nombre](cfg, rng)
+            clave = f"{nombre}/N={N}"
+            resultados[clave] = r
+            p50 = f"{r['p50_us']:.0f}" if r['p50_us'] is not None else "-"
+            p99 = f"{r['p99_us']:.0f}" if r['p99_us'] is not None else "-"
+            perdidas = r.get('perdidas', 0)
+            print(f"{clave:<26} {r['tramas_s']:>10.0f} tramas/s   p50 {p50:>7} us"
+                  f"   p99 {p99:>7} us   perdidas {perdidas:>5}   RSS {r['rss_max_kb'] / 1024:.0f} MB")
+    return resultados
+
+
+def comparar(actual, base, tolerancia):
+    #Lista de regresiones: menos tramas/s o más p99 que la base, más allá de la tolerancia
+    regresiones = []
+    for clave, r in actual.items():
+        b = base.get(clave)
+        if b is None:
+            continue
+        if b['tramas_s'] and r['tramas_s'] < b['tramas_s'] * (1 - tolerancia):
+            regresiones.append(f"{clave}: {r['tramas_s']:.0f} tramas/s (base {b['tramas_s']:.0f})")
+        if b.get('p99_us') and r.get('p99_us') and r['p99_us'] > b['p99_us'] * (1 + tolerancia):
+            regresiones.append(f"{clave}: p99 {r['p99_us']:.0f} us (base {b['p99_us']:.0f})")
+        if r.get('perdidas', 0) > b.get('perdidas', 0):
+            regresiones.append(f"{clave}: {r['perdidas']} tramas perdidas (base {b.get('perdidas', 0)})")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la cadena de adquisición PICO")
+    parser.add_argument("-N", dest="N_lista", type=int, nargs='+', default=[1024, 4096])
+    parser.add_argument("-M", type=int, default=10, help="Armónicos por trama")
+    parser.add_argument("-n", "--tramas", type=int, default=2000, help="Tramas por etapa")
+    parser.add_argument("-e", "--etapas", nargs='+', choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument("--tasa", type=float, default=0, help="Tramas/s en serial_reader (0: máximo)")
+    parser.add_argument("--duracion", type=float, default=0, help="Soak: segundos mínimos de serial_reader")
+    parser.add_argument("--corruptas", type=float, default=0.01, help="Fracción de tramas con CRC inválido")
+    parser.add_argument("--basura", type=float, default=0.01, help="Probabilidad de basura entre tramas")
+    parser.add_argument("--politica", choices=list(POLITICAS), default='Sin pérdida')
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("-o", "--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    cfg = parser.parse_args()
+
+    resultados = correr(cfg)
+    informe = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(), 'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'config': {k: v for k, v in vars(cfg).items() if k not in ('salida', 'comparar', 'N')},
+        'etapas': resultados,
+    }
+    if cfg.salida:
+        with open(cfg.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+    if cfg.comparar:
+        with open(cfg.comparar, encoding='utf-8') as f:
+            regresiones = comparar(resultados, json.load(f)['etapas'], cfg.tolerancia)
+        for r in regresiones:
+            print("REGRESIÓN", r)
+        sys.exit(1 if regresiones else 0)
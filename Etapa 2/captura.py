@@ -0,0 +1,182 @@
+import os, threading, time
+import numpy as np
+from formato_trama import largo_en, dims_en, resumen_en, decodificar_en
+
+# Formato de una captura:
+#   <nombre>.pico      tramas PICO (v1 o v2) validadas, concatenadas tal como llegaron (append-only)
+#   <nombre>.pico.idx  un registro DT_INDICE por trama: offset, largo, instante de
+#                      recepción y resumen (RMS, THD, f1)
+#
+# El archivo .pico puede volver a leerse con FrameParser; el índice se abre con
+# np.memmap y permite ubicar cualquier trama o graficar tendencias sin cargar
+# las muestras en memoria.
+
+EXTENSION = '.pico'
+DT_INDICE = np.dtype([('offset', '<u8'), ('largo', '<u4'), ('t', '<f8'),
+                      ('rms', '<f4'), ('thd', '<f4'), ('f1', '<f4')])
+
+
+def ruta_indice(path):
+    return path + '.idx'
+
+
+# Grabador continuo de tramas en segundo plano.
+# escribir() se llama desde el hilo lector con la trama cruda ya validada y sólo
+# copia los bytes a un lote en memoria; el hilo del grabador vuelca los lotes
+# al disco cada `periodo` segundos (o antes, si el lote supera `max_lote` bytes).
+
+class CaptureRecorder(threading.Thread):
+    def __init__(self, path, periodo=0.5, max_lote=4 << 20):
+        super().__init__(daemon=True)
+        self.path = path
+        self.periodo = periodo
+        self.max_lote = max_lote
+        self.running = True
+        self.tramas = 0
+        self.bytes = 0
+
+        self._cond = threading.Condition()
+        self._lote = bytearray()
+        self._indice = []
+        self._f = open(path, 'ab')
+        self._fidx = open(ruta_indice(path), 'ab')
+        self._offset = self._f.tell()
+
+    def escribir(self, trama):
+        #Agrega una trama cruda (bytes o memoryview) al lote pendiente
+        with self._cond:
+            self._indice.append((self._offset, len(trama), time.time())
+                                + resumen_en(trama, 0, len(trama)))
+            self._lote += trama
+            self._offset += len(trama)
+            if len(self._lote) >= self.max_lote:
+                self._cond.notify()
+
+    def run(self):
+        #Hilo de escritura: vuelca los lotes acumulados
+        while self.running:
+            with self._cond:
+                self._cond.wait(self.periodo)
+            self._volcar()
+        self._volcar()
+        self._f.close()
+        self._fidx.close()
+
+    def _volcar(self):
+        with self._cond:
+            if not self._indice:
+                return
+            lote, self._lote = self._lote, bytearray()
+            indice, self._indice = self._indice, []
+        self._f.write(lote)
+        self._fidx.write(np.array(indice, dtype=DT_INDICE).tobytes())
+        self._f.flush()
+        self._fidx.flush()
+        self.tramas += len(indice)
+        self.bytes += len(lote)
+
+    def stop(self):
+        """Detiene la grabación y vuelca los datos pendientes"""
+        self.running = False
+        with self._cond:
+            self._cond.notify()
+
+
+def reconstruir_indice(path):
+    #Regenera el índice recorriendo el archivo de tramas (instantes nominales N/fs)
+    datos = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) else b''
+    registros = []
+    offset, t = 0, 0.0
+    while offset < len(datos):
+        disponible = len(datos) - offset
+        largo, _ = largo_en(datos, offset, disponible)
+        if disponible < largo:
+            break
+        fs, n = dims_en(datos, offset)
+        registros.append((offset, largo, t) + resumen_en(datos, offset, largo))
+        t += n / fs if fs else 0.0
+        offset += largo
+    indice = np.array(registros, dtype=DT_INDICE)
+    indice.tofile(ruta_indice(path))
+    return indice
+
+
+# Índice de una captura mapeado en memoria.
+# Sólo se leen del disco las páginas que efectivamente se consultan: los
+# resúmenes del rango graficado y las muestras de la trama seleccionada.
+
+class CaptureIndex:
+    def __init__(self, path):
+        self.path = path
+        idx = ruta_indice(path)
+        if not os.path.exists(idx) or os.path.getsize(idx) % DT_INDICE.itemsize:
+            reconstruir_indice(path)    # Índice ausente o de otro formato
+        vacio = os.path.getsize(ruta_indice(path)) == 0
+        self.indice = (np.zeros(0, dtype=DT_INDICE) if vacio else
+                       np.memmap(ruta_indice(path), dtype=DT_INDICE, mode='r'))
+        self.datos = (np.zeros(0, dtype=np.uint8) if vacio else
+                      np.memmap(path, dtype=np.uint8, mode='r'))
+
+    def __len__(self):
+        return len(self.indice)
+
+    @property
+    def t0(self):
+        return float(self.indice['t'][0]) if len(self) else 0.0
+
+    @property
+    def duracion(self):
+        return float(self.indice['t'][-1]) - self.t0 if len(self) else 0.0
+
+    def buscar_tiempo(self, t):
+        #Índice de la primera trama con instante >= t (relativo al inicio)
+        return min(int(np.searchsorted(self.indice['t'], self.t0 + t)), max(len(self) - 1, 0))
+
+    def trama(self, i):
+        #Decodifica la trama i (samples, freqs, amps, rms, thd, fs)
+        return decodificar_en(self.datos, int(self.indice['offset'][i]))
+
+    def tendencia(self, campo, i0=0, i1=None, max_puntos=2000):
+        #Devuelve (t, valores) del campo entre las tramas i0 e i1, diezmado a max_puntos
+        i1 = len(self) if i1 is None else min(i1, len(self))
+        i0 = max(0, min(i0, i1))
+        paso = max(1, (i1 - i0) // max_puntos)
+        registros = self.indice[i0:i1:paso]
+        return registros['t'] - self.t0, np.asarray(registros[campo], dtype=np.float64)
+
+
+# Fuente de reproducción: lee una captura y alimenta el mismo canal de datos
+# que SerialReader, respetando los tiempos originales (velocidad=1.0), un
+# factor de aceleración, o a máxima velocidad (velocidad=None).
+
+class ReplaySource(threading.Thread):
+    def __init__(self, path, data_queue, velocidad=1.0, inicio=0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.data_queue = data_queue
+        self.velocidad = velocidad
+        self.inicio = inicio
+        self.running = True
+        self.tramas = 0
+
+    def run(self):
+        captura = CaptureIndex(self.path)
+        t_ref = None
+        for i in range(self.inicio, len(captura)):
+            t = float(captura.indice['t'][i])
+            if not self.running:
+                break
+            if self.velocidad:
+                if t_ref is None:
+                    t_ref = (time.monotonic(), t)
+                espera = t_ref[0] + (t - t_ref[1]) / self.velocidad - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+            trama = captura.trama(i)
+            while self.running and not self.data_queue.put(trama, timeout=0.1):
+                pass
+            self.tramas += 1
+
+    def stop(self):
+        """Detiene la reproducción"""
+        self.running = False
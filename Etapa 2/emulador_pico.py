@@ -0,0 +1,198 @@
+import argparse, os, select, sys, time, tty
+from trama_pico import (SerializadorTrama, HEADER_CMD, leer_comando, mensaje_respuesta,
+                        mensaje_tiempos, CMD_FS, CMD_N, CMD_VENTANA, CMD_INTERVALO,
+                        CMD_STREAMING, CMD_TRAZA,
+                        VENTANAS_CMD, EST_OK, EST_RANGO, EST_DESCONOCIDO)
+from procesamiento import procesar
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Etapa 1'))
+from sintesis import Sintetizador, CacheLRU   # Etapa 1/sintesis.py
+
+# Emulador de la Pico para probar Codigo_PC.py (o servidor.py) sin hardware.
+# Sintetiza la señal con el generador de la Etapa 1 y la envía como tramas
+# PICO v1 por un puerto serie virtual (POSIX): un pseudo-terminal propio (se
+# conecta la GUI al /dev/pts/N que se imprime al arrancar) o un puerto
+# existente, como un extremo de `socat -d -d pty,raw,echo=0 pty,raw,echo=0`.
+#
+# Cada trama toma N muestras consecutivas de la señal sintetizada (periódica
+# en su duración), se analiza con el mismo procesar() del dispositivo y se
+# serializa con SerializadorTrama. Las tramas ya armadas se guardan en un
+# caché LRU por posición: en régimen el emulador sólo escribe bytes, así que
+# sirve para probar la PC a tasas mucho mayores que las de la Pico real.
+#
+# Responde a los comandos de fs, N, ventana, intervalo, streaming y traza (con
+# la traza activa cada trama va seguida de un 'PTIM' con los tiempos reales de
+# armado en el emulador y muestreo y envío en 0); la
+# negociación no se contesta, así que la PC sigue en v1 a la velocidad del puerto.
+
+V_MEDIO = 1.65           # Offset de la señal como la ve el ADC
+CAPACIDAD_TRAMAS = 256
+
+
+def leer_componentes(texto):
+    #"A:f[:tipo[:duty]],..." -> [(A, f, tipo, duty), ...]
+    componentes = []
+    for parte in texto.split(','):
+        campos = parte.split(':')
+        A, f = float(campos[0]), float(campos[1])
+        tipo = campos[2] if len(campos) > 2 else "Senoidal"
+        duty = float(campos[3]) if len(campos) > 3 else 50
+        componentes.append((A, f, tipo, duty))
+    return componentes
+
+
+class EmuladorPico:
+    def __init__(self, componentes, fs=2048, N=1024, duracion=1.0, ventana='hann'):
+        self.componentes = componentes
+        self.duracion = duracion
+        self.ventana = ventana
+        self.intervalo_ms = 0
+        self.streaming = True
+        self.traza = False
+        self.rx = bytearray()
+        self.configurar(fs, N)
+
+    def configurar(self, fs, N):
+        #Rearma la síntesis y vacía el caché de tramas para una nueva fs o N
+        self.fs = fs
+        self.N = N
+        self.sintetizador = Sintetizador(fs, self.duracion)
+        self.sintetizador.actualizar(self.componentes)
+        self.serializador = SerializadorTrama(N)
+        self.tramas = CacheLRU(CAPACIDAD_TRAMAS)
+        self.largo = len(self.sintetizador.signal)
+        self.posicion = 0
+
+    def _armar(self, inicio):
+        centrada = self.sintetizador.tramo(inicio, self.N)
+        armonicos, Vrms, THD, _ = procesar(centrada + V_MEDIO, self.fs, self.ventana)
+        return bytes(self.serializador.armar(centrada, self.fs, armonicos, Vrms, THD))
+
+    def siguiente(self):
+        #Bytes de la próxima trama (del caché si esa posición ya se armó)
+        inicio = self.posicion
+        self.posicion = (self.posicion + self.N) % self.largo
+        t0 = time.perf_counter()
+        trama = self.tramas.obtener((inicio, self.ventana), lambda: self._armar(inicio))
+        if self.traza:
+            trama += mensaje_tiempos(0, int((time.perf_counter() - t0) * 1e6), 0)
+        return trama
+
+    def atender(self, data):
+        #Procesa bytes recibidos de la PC; devuelve las respuestas a escribir
+        self.rx += data
+        respuestas = b''
+        while True:
+            i = self.rx.find(HEADER_CMD)
+            if i < 0:
+                del self.rx[:max(0, len(self.rx) - 3)]
+                return respuestas
+            if len(self.rx) < i + 16:
+                del self.rx[:i]
+                return respuestas
+            cmd = leer_comando(bytes(self.rx[i:i + 16]))
+            del self.rx[:i + 16]
+            if cmd is not None:
+                respuestas += self._ejecutar(*cmd)
+
+    def _ejecutar(self, comando, secuencia, valor):
+        estado = EST_OK
+        if comando == CMD_FS:
+            if 0 < valor <= 0xFFFF:
+                self.configurar(valor, self.N)
+            valor = self.fs
+        elif comando == CMD_N:
+            if valor in (256, 512, 1024, 2048):
+                self.configurar(self.fs, valor)
+            else:
+                estado = EST_RANGO
+            valor = self.N
+        elif comando == CMD_VENTANA:
+            if valor < len(VENTANAS_CMD):
+                self.ventana = VENTANAS_CMD[valor]
+            else:
+                estado = EST_RANGO
+            valor = VENTANAS_CMD.index(self.ventana)
+        elif comando == CMD_INTERVALO:
+            self.intervalo_ms = valor
+        elif comando == CMD_STREAMING:
+            self.streaming = bool(valor)
+            valor = int(self.streaming)
+        elif comando == CMD_TRAZA:
+            if valor in (0, 1):
+                self.traza = bool(valor)
+            else:
+                estado = EST_RANGO
+            valor = int(self.traza)
+        else:
+            estado = EST_DESCONOCIDO
+        return mensaje_respuesta(comando, secuencia, estado, valor)
+
+
+def abrir_puerto(nombre, baud):
+    #Devuelve (descriptor para leer/escribir, nombre a informar, objeto a mantener abierto)
+    if nombre is None:
+        maestro, esclavo = os.openpty()
+        tty.setraw(esclavo)
+        return maestro, os.ttyname(esclavo), esclavo
+    import serial
+    ser = serial.Serial(nombre, baud, timeout=0)
+    return ser.fileno(), nombre, ser
+
+
+def correr(emulador, fd, tasa, duracion=None):
+    #Envía tramas a `tasa` tramas/s (0: tan rápido como lo acepte el puerto)
+    periodo = 1.0 / tasa if tasa > 0 else 0.0
+    t0 = time.perf_counter()
+    siguiente_envio = t0
+    enviadas = 0
+    bytes_enviados = 0
+    ultimo_reporte = t0
+    while duracion is None or time.perf_counter() - t0 < duracion:
+        ahora = time.perf_counter()
+        espera = max(0.0, siguiente_envio - ahora)
+        legibles, _, _ = select.select([fd], [], [], espera)
+        if legibles:
+            try:
+                respuestas = emulador.atender(os.read(fd, 4096))
+            except OSError:
+                respuestas = b''    # Pseudo-terminal sin nadie del otro lado
+            if respuestas:
+                os.write(fd, respuestas)
+        if time.perf_counter() < siguiente_envio:
+            continue
+        intervalo = max(periodo, emulador.intervalo_ms / 1000)
+        siguiente_envio = max(siguiente_envio + intervalo, time.perf_counter() - 1.0)
+        if not emulador.streaming:
+            continue
+        trama = emulador.siguiente()
+        os.write(fd, trama)
+        enviadas += 1
+        bytes_enviados += len(trama)
+        if ahora - ultimo_reporte >= 5.0:
+            dt = ahora - t0
+            print(f"{enviadas} tramas ({enviadas / dt:.0f}/s, {bytes_enviados / dt / 1e3:.0f} kB/s),"
+                  f" caché {emulador.tramas.aciertos}/{emulador.tramas.aciertos + emulador.tramas.fallos}")
+            ultimo_reporte = ahora
+    return enviadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulador de la Pico: tramas PICO sintetizadas")
+    parser.add_argument("-c", "--componentes", default="1:50,0.3:150:Cuadrada:30,0.1:250:Triangular",
+                        help="Componentes A:f[:tipo[:duty]] separadas por comas")
+    parser.add_argument("--fs", type=int, default=2048)
+    parser.add_argument("-N", type=int, default=1024)
+    parser.add_argument("-t", "--tasa", type=float, default=10, help="Tramas por segundo (0: máximo)")
+    parser.add_argument("-p", "--puerto", help="Puerto serie existente (por defecto crea un pseudo-terminal)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("-d", "--duracion", type=float, help="Segundos de emulación")
+    args = parser.parse_args()
+
+    emulador = EmuladorPico(leer_componentes(args.componentes), args.fs, args.N)
+    fd, nombre, recurso = abrir_puerto(args.puerto, args.baud)
+    print(f"Emulando la Pico en {nombre} (fs={args.fs}, N={args.N}, {args.tasa:g} tramas/s)")
+    try:
+        correr(emulador, fd, args.tasa, args.duracion)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,110 @@
+import threading, queue
+from collections import deque
+
+
+# Políticas de entrega de tramas entre el hilo lector (SerialReader) y la GUI.
+# Todas exponen la misma interfaz que usa la aplicación: put / get / empty,
+# más los contadores de tramas entregadas y descartadas.
+#
+#   - LatestMailbox:  buzón de un solo lugar; cada trama nueva pisa a la anterior.
+#   - DropOldestRing: anillo acotado; si está lleno se descarta la trama más vieja.
+#   - LosslessQueue:  cola acotada sin pérdidas; si está llena el productor espera
+#                     (contrapresión sobre el hilo lector).
+
+class _Entrega:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.entregadas = 0
+        self.descartadas = 0
+
+    def stats(self):
+        #Devuelve (entregadas, descartadas, pendientes)
+        with self._cond:
+            return self.entregadas, self.descartadas, len(self)
+
+    def empty(self):
+        return len(self) == 0
+
+    def get(self):
+        #Retira la próxima trama; lanza queue.Empty si no hay ninguna
+        with self._cond:
+            if len(self) == 0:
+                raise queue.Empty
+            item = self._retirar()
+            self.entregadas += 1
+            self._cond.notify_all()
+            return item
+
+
+class LatestMailbox(_Entrega):
+    def __init__(self, capacidad=1):
+        super().__init__()
+        self._item = None
+        self._lleno = False
+
+    def __len__(self):
+        return int(self._lleno)
+
+    def put(self, item, timeout=None):
+        with self._cond:
+            if self._lleno:
+                self.descartadas += 1
+            self._item, self._lleno = item, True
+        return True
+
+    def _retirar(self):
+        item, self._item, self._lleno = self._item, None, False
+        return item
+
+
+class DropOldestRing(_Entrega):
+    def __init__(self, capacidad=32):
+        super().__init__()
+        self._anillo = deque(maxlen=capacidad)
+
+    def __len__(self):
+        return len(self._anillo)
+
+    def put(self, item, timeout=None):
+        with self._cond:
+            if len(self._anillo) == self._anillo.maxlen:
+                self.descartadas += 1
+            self._anillo.append(item)
+        return True
+
+    def _retirar(self):
+        return self._anillo.popleft()
+
+
+class LosslessQueue(_Entrega):
+    def __init__(self, capacidad=256):
+        super().__init__()
+        self._cola = deque()
+        self.capacidad = capacidad
+
+    def __len__(self):
+        return len(self._cola)
+
+    def put(self, item, timeout=None):
+        #Bloquea mientras la cola esté llena; devuelve False si vence el timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._cola) < self.capacidad, timeout):
+                return False
+            self._cola.append(item)
+        return True
+
+    def _retirar(self):
+        return self._cola.popleft()
+
+
+POLITICAS = {
+    'Última': LatestMailbox,
+    'Anillo': DropOldestRing,
+    'Sin pérdida': LosslessQueue,
+}
+
+
+def crear_entrega(politica='Última', capacidad=None):
+    #Crea el canal de entrega según el nombre de la política
+    clase = POLITICAS[politica]
+    return clase(capacidad) if capacidad else clase()
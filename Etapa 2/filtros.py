@@ -0,0 +1,212 @@
+import argparse, time
+import numpy as np
+
+# Filtros de la PC para señales largas y para flujos de tramas.
+# Reemplaza las versiones por muestra del TP1 (prom_mov, convolucion_float):
+#   - prom_mov: promedio móvil centrado con suma acumulada, O(1) por muestra y
+#     con los mismos bordes que el TP1 (la ventana se achica en los extremos y
+#     se promedia sólo lo que cae dentro de la señal).
+#   - convolucion: igual a np.convolve; con núcleos largos usa FFT por bloques
+#     (overlap-add).
+#   - PromedioMovil / FiltroFIR / Cadena: versiones con estado para procesar
+#     una señal por partes con process(chunk) sin tenerla entera en memoria.
+#     Concatenar las salidas de process() y la de flush() da exactamente el
+#     resultado de la función sobre la señal completa.
+
+DIRECTO_MAX = 64         # Largo de núcleo hasta el que conviene np.convolve directo
+BLOQUE = 4096            # Muestras por bloque del overlap-add
+
+
+def prom_mov(sig, vent):
+    #Promedio móvil centrado de vent//2 muestras a cada lado, con bordes como en el TP1
+    x = np.asarray(sig, dtype=np.float64)
+    N = len(x)
+    M = vent // 2
+    acumulada = np.concatenate(([0.0], np.cumsum(x)))
+    i = np.arange(N)
+    lo = np.maximum(i - M, 0)
+    hi = np.minimum(i + M + 1, N)
+    return (acumulada[hi] - acumulada[lo]) / (hi - lo)
+
+
+def convolucion(x, h, bloque=BLOQUE):
+    #Convolución completa (largo len(x) + len(h) - 1), como np.convolve
+    return FiltroFIR(h, bloque).filtrar(x)
+
+
+# =====================================================
+#              FILTROS CON ESTADO
+# =====================================================
+
+# Cada filtro tiene process(chunk) (devuelve las salidas ya completas), flush()
+# (devuelve las pendientes y reinicia el estado) y reset(). _Filtro sólo agrega
+# filtrar, que se arma con esos tres.
+
+class _Filtro:
+    def filtrar(self, x):
+        #Filtra una señal completa e independiente (p. ej. una trama)
+        self.reset()
+        return np.concatenate((self.process(x), self.flush()))
+
+
+class PromedioMovil(_Filtro):
+    # La ventana centrada necesita vent//2 muestras futuras: cada salida se
+    # entrega cuando llegaron sus vecinas, así que la salida va M muestras
+    # detrás de la entrada. Sólo se guardan las 2*M muestras de la ventana.
+    def __init__(self, vent):
+        self.M = vent // 2
+        self.reset()
+
+    def reset(self):
+        self.pendiente = np.zeros(0)    # Entrada desde la muestra emitidas - M
+        self.recibidas = 0
+        self.emitidas = 0
+
+    def _salidas(self, hasta, total):
+        #Promedios de las salidas [emitidas, hasta) con la señal conocida hasta total
+        base = max(self.emitidas - self.M, 0)
+        acumulada = np.concatenate(([0.0], np.cumsum(self.pendiente)))
+        i = np.arange(self.emitidas, hasta)
+        lo = np.maximum(i - self.M, 0)
+        hi = np.minimum(i + self.M + 1, total)
+        y = (acumulada[hi - base] - acumulada[lo - base]) / (hi - lo)
+        self.emitidas = hasta
+        self.pendiente = self.pendiente[max(hasta - self.M, 0) - base:]
+        return y
+
+    def process(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        self.pendiente = np.concatenate((self.pendiente, chunk))
+        self.recibidas += len(chunk)
+        return self._salidas(max(self.recibidas - self.M, self.emitidas), self.recibidas)
+
+    def flush(self):
+        y = self._salidas(self.recibidas, self.recibidas)
+        self.reset()
+        return y
+
+
+class FiltroFIR(_Filtro):
+    # Overlap-add: cada tramo se convoluciona por separado y los len(h) - 1
+    # valores que exceden el tramo se suman al comienzo del siguiente, así que
+    # no hay retardo agregado. Los tramos largos se parten en bloques que se
+    # transforman todos juntos con una sola rfft por eje.
+    def __init__(self, h, bloque=BLOQUE):
+        self.h = np.asarray(h, dtype=np.float64)
+        M = len(self.h)
+        self.directo = M <= DIRECTO_MAX
+        self.bloque = max(bloque, M - 1)
+        self._H = {}                    # rfft del núcleo por tamaño de FFT
+        self.reset()
+
+    def reset(self):
+        self.cola = np.zeros(len(self.h) - 1)
+
+    def _convolucionar(self, x):
+        #Convolución completa de un tramo, sin estado
+        if self.directo:
+            return np.convolve(x, self.h)
+        # Los tramos cortos usan un único bloque de su tamaño (la FFT se ajusta al tramo)
+        M = len(self.h)
+        L = max(min(self.bloque, len(x)), M - 1)
+        nfft = 1 << (L + M - 2).bit_length()
+        H = self._H.get(nfft)
+        if H is None:
+            H = self._H[nfft] = np.fft.rfft(self.h, nfft)
+        nb = -(-len(x) // L)
+        bloques = np.zeros((nb, L))
+        bloques.ravel()[:len(x)] = x
+        Y = np.fft.irfft(np.fft.rfft(bloques, nfft, axis=1) * H, nfft, axis=1)
+        y = np.zeros((nb + 1) * L)
+        y[:nb * L] = Y[:, :L].ravel()
+        y[L:].reshape(nb, L)[:, :M - 1] += Y[:, L:L + M - 1]
+        return y[:len(x) + M - 1]
+
+    def process(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return chunk
+        y = self._convolucionar(chunk)
+        y[:len(self.cola)] += self.cola
+        self.cola = y[len(chunk):]
+        return y[:len(chunk)]
+
+    def flush(self):
+        y = self.cola
+        self.reset()
+        return y
+
+
+class Cadena(_Filtro):
+    # Varios filtros en serie; flush vacía cada etapa a través de las siguientes
+    def __init__(self, *etapas):
+        self.etapas = etapas
+
+    def reset(self):
+        for etapa in self.etapas:
+            etapa.reset()
+
+    def process(self, chunk):
+        for etapa in self.etapas:
+            chunk = etapa.process(chunk)
+        return chunk
+
+    def flush(self):
+        salida = np.zeros(0)
+        for etapa in self.etapas:
+            salida = np.concatenate((etapa.process(salida), etapa.flush()))
+        return salida
+
+
+# Comparación con las versiones por muestra del TP1 sobre las señales de prueba
+# del notebook (cuadrada de 2 kHz muestreada a 50 kHz durante 1 s)
+
+def _prom_mov_tp1(sig, vent):
+    M = vent // 2
+    N = M + 1
+    sal = []
+    for i in range(len(sig)):
+        suma = 0
+        val = 0
+        for k in range(-M, N):
+            idr = i + k
+            if 0 <= idr < len(sig):
+                suma += sig[idr]
+                val += 1
+        sal.append(suma / val)
+    return sal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara los filtros con las versiones del TP1")
+    parser.add_argument("--fs", type=int, default=50000)
+    parser.add_argument("--vent", type=int, default=10)
+    parser.add_argument("--chunk", type=int, default=1000, help="Muestras por process()")
+    args = parser.parse_args()
+
+    t = np.arange(0, 1, 1 / args.fs)
+    cuad = np.sign(np.sin(2 * np.pi * 2000 * t))
+
+    t0 = time.perf_counter()
+    ref = np.array(_prom_mov_tp1(cuad, args.vent))
+    t_tp1 = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    y = prom_mov(cuad, args.vent)
+    t_vec = time.perf_counter() - t0
+    filtro = PromedioMovil(args.vent)
+    partes = [filtro.process(cuad[i:i + args.chunk]) for i in range(0, len(cuad), args.chunk)]
+    y_stream = np.concatenate(partes + [filtro.flush()])
+    print(f"prom_mov: TP1 {t_tp1 * 1e3:.1f} ms, vectorizado {t_vec * 1e3:.2f} ms,"
+          f" error {np.max(np.abs(y - ref)):.1e} / por partes {np.max(np.abs(y_stream - ref)):.1e}")
+
+    h = np.ones(1000) / 1000
+    t0 = time.perf_counter()
+    ref = np.convolve(cuad, h)
+    t_np = time.perf_counter() - t0
+    fir = FiltroFIR(h)
+    t0 = time.perf_counter()
+    partes = [fir.process(cuad[i:i + args.chunk]) for i in range(0, len(cuad), args.chunk)]
+    y = np.concatenate(partes + [fir.flush()])
+    t_ola = time.perf_counter() - t0
+    print(f"convolución 1000 coef.: np.convolve {t_np * 1e3:.1f} ms,"
+          f" overlap-add {t_ola * 1e3:.1f} ms, error {np.max(np.abs(y - ref)):.1e}")
@@ -0,0 +1,330 @@
+import binascii, struct
+from functools import lru_cache
+import numpy as np
+
+# Formato de la trama PICO (little-endian, sin padding):
+#
+#   'PICO' | fs u32 | N u16 | N x int16 | M u16 | M x (f f32, a f32) | rms f32 | thd f32 | crc u32
+#
+# El CRC32 se calcula desde fs hasta thd inclusive (todo menos la cabecera y el propio CRC).
+#
+# Protocolo v2 (se negocia al conectar, ver mensaje_negociacion):
+#
+#   'PIC2' | flags u8 | diezmado u8 | fs u32 | N u16 | n_muestras u16 | largo_muestras u16
+#          | bloque de muestras | M u16 | M x (f f32, a f32) | rms f32 | thd f32 | crc u32
+#
+# flags indica qué se envía en el bloque de muestras: nada (OPC_SIN_MUESTRAS),
+# una de cada `diezmado` muestras (OPC_DIEZMADO) y/o diferencias sucesivas
+# codificadas zigzag + varint (OPC_DELTA) en lugar de int16 crudos.
+
+HEADER = b'PICO'   # Cabecera del paquete binario recibido por UART
+ESCALA_MUESTRAS = 10   # Divisor aplicado a las muestras int16 al decodificarlas
+
+DT_CABECERA = np.dtype([('header', 'S4'), ('fs', '<u4'), ('n', '<u2')])
+DT_ARMONICO = np.dtype([('freq', '<f4'), ('amp', '<f4')])
+DT_COLA = np.dtype([('rms', '<f4'), ('thd', '<f4'), ('crc', '<u4')])
+
+LEN_CABECERA = DT_CABECERA.itemsize    # 10 bytes
+LEN_COLA = DT_COLA.itemsize            # 12 bytes
+
+
+@lru_cache(maxsize=64)
+def dtype_trama(n, m):
+    #dtype estructurado de una trama completa con N muestras y M armónicos
+    return np.dtype([
+        ('header', 'S4'), ('fs', '<u4'), ('n', '<u2'),
+        ('samples', '<i2', (n,)),
+        ('m', '<u2'),
+        ('armonicos', DT_ARMONICO, (m,)),
+        ('rms', '<f4'), ('thd', '<f4'), ('crc', '<u4'),
+    ])
+
+
+def largo_trama(n, m):
+    #Largo total en bytes de una trama con N muestras y M armónicos
+    return LEN_CABECERA + 2 * n + 2 + DT_ARMONICO.itemsize * m + LEN_COLA
+
+
+def decodificar(buf, offset, n, m):
+    #Decodifica una trama ya validada como (samples, freqs, amps, rms, thd, fs)
+    rec = np.frombuffer(buf, dtype=dtype_trama(n, m), count=1, offset=offset)[0]
+    arm = rec['armonicos']
+    return (rec['samples'] / ESCALA_MUESTRAS,
+            arm['freq'].astype(np.float64), arm['amp'].astype(np.float64),
+            float(rec['rms']), float(rec['thd']), int(rec['fs']))
+
+
+def decodificar_lote(buf, n, m, offset=0, count=-1):
+    #Vista estructurada de tramas consecutivas de igual (N, M), sin copiar datos
+    return np.frombuffer(buf, dtype=dtype_trama(n, m), count=count, offset=offset)
+
+
+def crc_valido(lote):
+    #Máscara booleana con las tramas del lote cuyo CRC es correcto
+    raw = lote.view(np.uint8).reshape(len(lote), lote.dtype.itemsize)
+    calc = np.fromiter((binascii.crc32(fila[4:-4]) for fila in raw),
+                       dtype=np.uint32, count=len(lote))
+    return (lote['header'] == HEADER) & (calc == lote['crc'])
+
+
+def codificar_trama(samples, fs, freqs=(), amps=(), rms=0.0, thd=0.0):
+    #Arma una trama PICO a partir de muestras int16 y la lista de armónicos
+    samples = np.asarray(samples, dtype='<i2')
+    m = len(freqs)
+    rec = np.zeros(1, dtype=dtype_trama(len(samples), m))
+    rec['header'] = HEADER
+    rec['fs'] = fs
+    rec['n'] = len(samples)
+    rec['samples'] = samples
+    rec['m'] = m
+    rec['armonicos']['freq'] = freqs
+    rec['armonicos']['amp'] = amps
+    rec['rms'] = rms
+    rec['thd'] = thd
+    raw = rec.tobytes()
+    rec['crc'] = binascii.crc32(raw[4:-4]) & 0xffffffff
+    return rec.tobytes()
+
+
+# =====================================================
+#                  PROTOCOLO V2
+# =====================================================
+
+HEADER_V2 = b'PIC2'
+HEADER_NEG = b'PNEG'    # PC -> dispositivo: pedido de negociación
+HEADER_ACK = b'PACK'    # Dispositivo -> PC: respuesta de negociación
+
+OPC_SIN_MUESTRAS = 0x01
+OPC_DIEZMADO = 0x02
+OPC_DELTA = 0x04
+
+LEN_CABECERA_V2 = 16
+LEN_NEGOCIACION = 16
+BAUDIOS = (115200, 230400, 460800, 921600)
+
+# Los mensajes de negociación miden 16 bytes y cada palabra de 4 bytes es
+# >= 0xFFFF0000 o empieza con la cabecera: un firmware v1, que interpreta de a
+# 4 bytes como una nueva fs, los descarta por estar fuera de rango.
+_FMT_NEGOCIACION = '<4sBBHIHH'
+
+
+def mensaje_negociacion(version, opciones=0, diezmado=1, baud=115200, cabecera=HEADER_NEG):
+    #Arma un pedido (o respuesta) de negociación de 16 bytes
+    log_d = max(diezmado, 1).bit_length() - 1
+    cuerpo = struct.pack('<BBHI', version, (opciones & 0x0F) | (log_d << 4), 0xFFFF, baud)
+    crc = binascii.crc32(cuerpo) & 0xFFFF
+    return cabecera + cuerpo + struct.pack('<HH', crc, 0xFFFF)
+
+
+def leer_negociacion(buf, offset=0):
+    #Devuelve (version, opciones, diezmado, baud) o None si el CRC no coincide
+    _, version, opc, _, baud, crc, _ = struct.unpack_from(_FMT_NEGOCIACION, buf, offset)
+    if binascii.crc32(buf[offset + 4:offset + 12]) & 0xFFFF != crc:
+        return None
+    return version, opc & 0x0F, 1 << (opc >> 4), baud
+
+
+_UMBRALES_VARINT = np.uint64(1) << (np.uint64(7) * np.arange(1, 10, dtype=np.uint64))
+
+
+def codificar_varint(valores):
+    #Codifica enteros con diferencias sucesivas, zigzag y varint (LEB128), vectorizada
+    d = np.diff(np.asarray(valores, dtype=np.int64), prepend=0)
+    z = ((d << 1) ^ (d >> 63)).astype(np.uint64)
+    if z.size == 0 or z.max() < 0x80:
+        return z.astype(np.uint8).tobytes()     # Todos de un byte
+    # Bytes de cada valor y posición de cada byte de salida dentro de su valor
+    largos = np.searchsorted(_UMBRALES_VARINT, z, side='right') + 1
+    inicio = np.cumsum(largos) - largos
+    valor = np.repeat(np.arange(z.size), largos)
+    k = np.arange(int(inicio[-1] + largos[-1])) - inicio[valor]
+    grupos = (z[valor] >> (np.uint64(7) * k.astype(np.uint64))) & np.uint64(0x7F)
+    continuacion = (k < largos[valor] - 1).astype(np.uint64) << np.uint64(7)
+    return (grupos | continuacion).astype(np.uint8).tobytes()
+
+
+def decodificar_varint(buf):
+    #Inversa de codificar_varint, vectorizada
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if b.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    fin = (b & 0x80) == 0
+    inicio = np.flatnonzero(np.concatenate([[True], fin[:-1]]))
+    grupo = np.cumsum(np.concatenate([[0], fin[:-1]]))
+    pos = np.arange(b.size) - inicio[grupo]
+    z = np.add.reduceat((b & 0x7F).astype(np.int64) << (7 * pos), inicio)
+    return np.cumsum((z >> 1) ^ -(z & 1))
+
+
+def codificar_trama_v2(samples, fs, freqs=(), amps=(), rms=0.0, thd=0.0,
+                       opciones=0, diezmado=1):
+    #Arma una trama PIC2 a partir de muestras int16 (ver formato al inicio)
+    samples = np.asarray(samples, dtype='<i2')
+    n = len(samples)
+    if opciones & OPC_SIN_MUESTRAS:
+        enviadas = samples[:0]
+    else:
+        enviadas = samples[::diezmado] if opciones & OPC_DIEZMADO else samples
+    bloque = codificar_varint(enviadas) if opciones & OPC_DELTA else enviadas.tobytes()
+    d = diezmado if opciones & OPC_DIEZMADO else 1
+    cuerpo = (struct.pack('<BBIHHH', opciones, d, fs, n, len(enviadas), len(bloque)) + bloque
+              + struct.pack('<H', len(freqs))
+              + np.column_stack([freqs, amps]).astype('<f4').tobytes()
+              + struct.pack('<ff', rms, thd))
+    return HEADER_V2 + cuerpo + struct.pack('<I', binascii.crc32(cuerpo) & 0xffffffff)
+
+
+# =====================================================
+#              CANAL DE COMANDOS
+# =====================================================
+# 'PCMD' | comando u8 | secuencia u8 | 0xFFFF | valor u16 | 0xFFFF | crc16 u16 | 0xFFFF
+# 'PRSP' | comando u8 | secuencia u8 | estado u16 | valor u16 | 0xFFFF | crc16 u16 | 0xFFFF
+#
+# Igual que la negociación, cada palabra de un comando es >= 0xFFFF0000 o la
+# cabecera, así que un firmware v1 los descarta. La respuesta repite comando y
+# secuencia e informa el valor efectivamente aplicado.
+
+HEADER_CMD = b'PCMD'    # PC -> dispositivo: comando
+HEADER_RSP = b'PRSP'    # Dispositivo -> PC: respuesta al comando
+LEN_COMANDO = 16
+
+CMD_FS = 1              # Frecuencia de muestreo [Hz]
+CMD_N = 2               # Muestras por trama
+CMD_VENTANA = 3         # Índice en VENTANAS_CMD
+CMD_INTERVALO = 4       # Período mínimo entre tramas [ms]
+CMD_STREAMING = 5       # 0: deja de enviar tramas, 1: las reanuda
+CMD_OLED = 6            # 0: apaga la pantalla, 1: texto, 2: espectro y forma de onda
+CMD_SINCRONISMO = 7     # SINC_LIBRE, SINC_CRUCE o SINC_CICLOS
+CMD_TRAZA = 8           # 1: envía los tiempos de cada trama (mensaje 'PTIM'), 0: no
+
+SINC_LIBRE = 0          # Buffer libre, ventana + interpolación entre bins
+SINC_CRUCE = 1          # Cada buffer arranca en un cruce ascendente (con timeout)
+SINC_CICLOS = 2         # Buffer libre, análisis sobre un número entero de ciclos
+MODOS_SINCRONISMO = ('Libre', 'Cruce', 'Ciclos')
+
+VENTANAS_CMD = ('hann', 'blackman', 'flattop')
+MODOS_OLED = ('Apagada', 'Texto', 'Gráfico')   # Valores 0, 1 y 2 de CMD_OLED
+N_VALIDOS = (256, 512, 1024, 2048)   # Largos de trama aceptados por CMD_N
+
+EST_OK = 0
+EST_RANGO = 1           # Valor fuera de rango: no se aplicó
+EST_DESCONOCIDO = 2     # Comando no soportado
+
+_FMT_COMANDO = '<4sBBHHHHH'
+
+
+def mensaje_comando(comando, secuencia, valor, estado=0xFFFF, cabecera=HEADER_CMD):
+    #Arma un comando (o una respuesta, con estado y cabecera HEADER_RSP) de 16 bytes
+    cuerpo = struct.pack('<BBHHH', comando, secuencia & 0xFF, estado, valor, 0xFFFF)
+    return cabecera + cuerpo + struct.pack('<HH', binascii.crc32(cuerpo) & 0xFFFF, 0xFFFF)
+
+
+def leer_comando(buf, offset=0):
+    #Devuelve (comando, secuencia, estado, valor) o None si el CRC no coincide
+    _, comando, secuencia, estado, valor, _, crc, _ = struct.unpack_from(_FMT_COMANDO, buf, offset)
+    if binascii.crc32(buf[offset + 4:offset + 12]) & 0xFFFF != crc:
+        return None
+    return comando, secuencia, estado, valor
+
+
+# =====================================================
+#              TIEMPOS DEL DISPOSITIVO
+# =====================================================
+# Con CMD_TRAZA activo, el dispositivo envía después de cada trama la duración
+# de sus etapas para esa trama (no cambia el formato de las tramas):
+#   'PTIM' | muestreo_us u32 | procesar_us u32 | envio_us u32 | crc16 u16 | 0xFFFF
+
+HEADER_TIM = b'PTIM'
+LEN_TIEMPOS = 20
+_FMT_TIEMPOS = '<4sIIIHH'
+
+
+def leer_tiempos(buf, offset=0):
+    #Devuelve (muestreo_us, procesar_us, envio_us) o None si el CRC no coincide
+    _, muestreo, proceso, envio, crc, _ = struct.unpack_from(_FMT_TIEMPOS, buf, offset)
+    if binascii.crc32(buf[offset + 4:offset + 16]) & 0xFFFF != crc:
+        return None
+    return muestreo, proceso, envio
+
+
+# =====================================================
+#        ACCESO GENÉRICO (V1 / V2 / RESPUESTAS)
+# =====================================================
+
+def largo_en(buf, offset, disponible):
+    #Largo del mensaje que empieza en offset: (largo, definitivo).
+    #Si definitivo es False, largo es la cantidad de bytes necesaria para conocerlo
+    #(siempre mayor que disponible: basta con comparar largo con disponible).
+    cab = bytes(buf[offset:offset + 4])
+    if cab == HEADER_ACK:
+        return LEN_NEGOCIACION, True
+    if cab == HEADER_RSP:
+        return LEN_COMANDO, True
+    if cab == HEADER_TIM:
+        return LEN_TIEMPOS, True
+    if cab == HEADER_V2:
+        if disponible < LEN_CABECERA_V2:
+            return LEN_CABECERA_V2, False
+        fin_muestras = LEN_CABECERA_V2 + struct.unpack_from('<H', buf, offset + 14)[0]
+    else:
+        if disponible < LEN_CABECERA:
+            return LEN_CABECERA, False
+        fin_muestras = LEN_CABECERA + 2 * struct.unpack_from('<H', buf, offset + 8)[0]
+    if disponible < fin_muestras + 2:
+        return fin_muestras + 2, False
+    m = struct.unpack_from('<H', buf, offset + fin_muestras)[0]
+    return fin_muestras + 2 + DT_ARMONICO.itemsize * m + LEN_COLA, True
+
+
+def crc_ok(buf, offset, largo):
+    #Valida el CRC de una trama v1/v2 o de una respuesta (negociación o comando)
+    cab = bytes(buf[offset:offset + 4])
+    if cab == HEADER_ACK:
+        return leer_negociacion(buf, offset) is not None
+    if cab == HEADER_RSP:
+        return leer_comando(buf, offset) is not None
+    if cab == HEADER_TIM:
+        return leer_tiempos(buf, offset) is not None
+    crc = struct.unpack_from('<I', buf, offset + largo - 4)[0]
+    return binascii.crc32(buf[offset + 4:offset + largo - 4]) & 0xffffffff == crc
+
+
+def decodificar_en(buf, offset):
+    #Decodifica la trama v1 o v2 que empieza en offset (samples, freqs, amps, rms, thd, fs)
+    if bytes(buf[offset:offset + 4]) != HEADER_V2:
+        fs, n = struct.unpack_from('<IH', buf, offset + 4)
+        m = struct.unpack_from('<H', buf, offset + LEN_CABECERA + 2 * n)[0]
+        return decodificar(buf, offset, n, m)
+    flags, d, fs, n, n_env, largo_m = struct.unpack_from('<BBIHHH', buf, offset + 4)
+    ini = offset + LEN_CABECERA_V2
+    if flags & OPC_DELTA:
+        samples = decodificar_varint(buf[ini:ini + largo_m])
+    else:
+        samples = np.frombuffer(buf, dtype='<i2', count=n_env, offset=ini)
+    pos = ini + largo_m
+    m = struct.unpack_from('<H', buf, pos)[0]
+    arm = np.frombuffer(buf, dtype=DT_ARMONICO, count=m, offset=pos + 2)
+    rms, thd = struct.unpack_from('<ff', buf, pos + 2 + DT_ARMONICO.itemsize * m)
+    # Con muestras diezmadas, el eje de tiempo usa la frecuencia efectiva fs/d
+    return (samples / ESCALA_MUESTRAS,
+            arm['freq'].astype(np.float64), arm['amp'].astype(np.float64),
+            rms, thd, fs // d if d > 1 else fs)
+
+
+def dims_en(buf, offset):
+    #Devuelve (fs, N) de la trama v1 o v2 que empieza en offset
+    if bytes(buf[offset:offset + 4]) == HEADER_V2:
+        return struct.unpack_from('<IH', buf, offset + 6)
+    return struct.unpack_from('<IH', buf, offset + 4)
+
+
+def resumen_en(buf, offset, largo):
+    #Extrae (rms, thd, f1) de una trama v1/v2 sin decodificar las muestras
+    if bytes(buf[offset:offset + 4]) == HEADER_V2:
+        fin_muestras = LEN_CABECERA_V2 + struct.unpack_from('<H', buf, offset + 14)[0]
+    else:
+        fin_muestras = LEN_CABECERA + 2 * struct.unpack_from('<H', buf, offset + 8)[0]
+    m = struct.unpack_from('<H', buf, offset + fin_muestras)[0]
+    f1 = struct.unpack_from('<f', buf, offset + fin_muestras + 2)[0] if m else 0.0
+    rms, thd = struct.unpack_from('<ff', buf, offset + largo - LEN_COLA)
+    return rms, thd, f1
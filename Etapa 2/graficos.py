@@ -0,0 +1,155 @@
+import numpy as np
+
+MARGEN = 0.1          # Margen sobre la excursión de la señal, en fracción de la excursión
+ENCOGER_TRAS = 30     # Tramas seguidas usando menos de la mitad del rango antes de achicarlo
+
+
+# Renderizador incremental de los gráficos de señal y FFT.
+# Los artistas (línea de la señal, stems del espectro, títulos y anotación) se
+# crean una sola vez como "animated" y en cada trama sólo se actualizan sus
+# datos. El fondo (ejes, grilla, etiquetas) se guarda con copy_from_bbox luego
+# de cada dibujo completo y se restaura antes de redibujar los artistas; el
+# dibujo completo sólo se hace cuando cambian los límites de los ejes.
+# Los límites se ensanchan en cuanto los datos se salen y sólo se achican luego
+# de ENCOGER_TRAS tramas seguidas que usan menos de la mitad del rango, para
+# que una señal ruidosa no obligue a redibujar todo en cada trama.
+
+class PlotRenderer:
+    def __init__(self, fig, ax_time, ax_fft, canvas, t_max_ms=100):
+        self.fig = fig
+        self.ax_time = ax_time
+        self.ax_fft = ax_fft
+        self.canvas = canvas
+        self.t_max_ms = t_max_ms
+        self._fondo = None
+        self._chicas = {}     # Tramas seguidas que usaron menos de la mitad del rango, por eje
+
+        # Artistas persistentes
+        (self.linea,) = ax_time.plot([], [], color='blue', animated=True)
+        self.stems = ax_fft.vlines([], [], [], color='orange', linewidth=3, animated=True)
+        (self.marcas,) = ax_fft.plot([], [], 'o', color='darkorange', markersize=4, animated=True)
+        self.annotation = ax_fft.annotate(
+            "", xy=(0, 0), xytext=(0, 0),
+            arrowprops=dict(facecolor='black', shrink=0.05),
+            bbox=dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.7),
+            animated=True, visible=False)
+        ax_time.title.set_animated(True)
+        ax_fft.title.set_animated(True)
+        # Superposición con los tiempos de la traza (oculta salvo que se active)
+        self.hud = fig.text(0.01, 0.99, "", ha='left', va='top', family='monospace', fontsize=8,
+                            bbox=dict(boxstyle="round,pad=0.3", fc="white", alpha=0.8),
+                            animated=True, visible=False)
+        self._animados = [self.linea, self.stems, self.marcas,
+                          ax_time.title, ax_fft.title, self.annotation, self.hud]
+
+        ax_time.set_xlim(0, t_max_ms)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    # Manejo del fondo y del blitting
+
+    def _on_draw(self, event):
+        #Luego de un dibujo completo se guarda el fondo y se pintan los artistas
+        if self.canvas.supports_blit:
+            self._fondo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._dibujar_artistas()
+
+    def _dibujar_artistas(self):
+        for artista in self._animados:
+            self.fig.draw_artist(artista)
+
+    def blit(self):
+        #Repinta sólo los artistas sobre el fondo guardado
+        if self._fondo is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._fondo)
+        self._dibujar_artistas()
+        self.canvas.blit(self.fig.bbox)
+
+    def _ajustar_limites(self, eje, ax_lim, lo, hi):
+        #Devuelve nuevos límites si hay que cambiarlos para mostrar (lo, hi), o None
+        lo_act, hi_act = ax_lim
+        if eje not in self._chicas:
+            # Primera trama desde la creación o limpieza: se toman los límites de los datos
+            self._chicas[eje] = 0
+            return lo, hi
+        if lo < lo_act or hi > hi_act:
+            self._chicas[eje] = 0
+            return min(lo, lo_act), max(hi, hi_act)
+        if (hi_act - lo_act) > 2 * max(hi - lo, 1e-12):
+            self._chicas[eje] += 1
+            if self._chicas[eje] >= ENCOGER_TRAS:
+                self._chicas[eje] = 0
+                return lo, hi
+        else:
+            self._chicas[eje] = 0
+        return None
+
+    # Actualización de datos
+
+    def actualizar(self, samples, fs, freqs, amps, rms, thd):
+        #Actualiza los artistas con una nueva trama
+        if fs and fs > 0:
+            t = (np.arange(len(samples)) / fs) * 1000
+        else:
+            t = np.arange(len(samples))
+        self.linea.set_data(t, samples)
+        self.ax_time.set_title(f"Señal - RMS: {rms:.2f}")
+
+        self.stems.set_segments(np.stack(
+            [np.column_stack([freqs, np.zeros_like(amps)]),
+             np.column_stack([freqs, amps])], axis=1) if len(freqs) else [])
+        self.marcas.set_data(freqs, amps)
+        self.ax_fft.set_title(f"FFT - THD: {thd :.2f}%")
+
+        redibujar = False
+        if len(samples):
+            s_min, s_max = float(np.min(samples)), float(np.max(samples))
+            margen = MARGEN * (s_max - s_min) or 0.5
+            nuevos = self._ajustar_limites('t_y', self.ax_time.get_ylim(),
+                                           s_min - margen, s_max + margen)
+            if nuevos:
+                self.ax_time.set_ylim(*nuevos)
+                redibujar = True
+        if len(freqs):
+            f_max = float(np.max(freqs)) * 1.05 or 1
+            a_max = float(np.max(amps)) * 1.2 or 1
+            nuevos_x = self._ajustar_limites('f_x', self.ax_fft.get_xlim(), 0, f_max)
+            nuevos_y = self._ajustar_limites('f_y', self.ax_fft.get_ylim(), 0, a_max)
+            if nuevos_x:
+                self.ax_fft.set_xlim(*nuevos_x)
+                redibujar = True
+            if nuevos_y:
+                self.ax_fft.set_ylim(*nuevos_y)
+                redibujar = True
+
+        if redibujar or self._fondo is None:
+            self.canvas.draw()    # Dispara _on_draw: nuevo fondo + artistas
+        else:
+            self.blit()
+
+    def anotar(self, freq, amp, amp_max):
+        #Muestra la anotación de frecuencia y amplitud sobre el espectro
+        self.annotation.set_text(f"Freq: {freq:.2f} Hz\nAmp: {amp:.4f}")
+        self.annotation.xy = (freq, amp)
+        self.annotation.set_position((freq, amp + amp_max * 0.1))
+        self.annotation.set_visible(True)
+        self.blit()
+
+    def mostrar_hud(self, texto):
+        #Actualiza el texto de la superposición; None la oculta
+        self.hud.set_visible(texto is not None)
+        if texto is not None:
+            self.hud.set_text(texto)
+        self.blit()
+
+    def limpiar(self):
+        #Vacía los artistas y redibuja los ejes
+        self.linea.set_data([], [])
+        self.stems.set_segments([])
+        self.marcas.set_data([], [])
+        self.annotation.set_visible(False)
+        self.ax_time.set_title("Señal en el tiempo")
+        self.ax_fft.set_title("FFT")
+        self._chicas = {}
+        self.canvas.draw()
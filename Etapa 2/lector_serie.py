@@ -0,0 +1,120 @@
+import threading, queue, time, struct
+from parser_trama import FrameParser
+from formato_trama import mensaje_negociacion, mensaje_comando, CMD_FS
+
+# Lector del puerto serie de la PC, sin dependencias de la interfaz gráfica:
+# lo usan Codigo_PC.py y benchmark.py (que corre sin pantalla ni Tk).
+
+ESPERA_RESPUESTA = 0.5     # Segundos sin respuesta antes de reenviar un comando
+REINTENTOS = 3
+
+
+# Clase encargada de la lectura asíncrona del puerto serie.
+# Al arrancar envía el pedido de negociación (si se pidió algo distinto de v1
+# a 115200); un dispositivo v1 lo ignora y la lectura sigue en v1. Cuando
+# llega la respuesta, el puerto pasa a la velocidad acordada.
+# Los comandos de la GUI se encolan y los escribe este mismo hilo entre
+# lecturas; las respuestas vuelven a la GUI por la cola `respuestas`.
+# Con un RegistroTraza se anota el instante de lectura de cada trama y los
+# tiempos que informa el dispositivo.
+
+class SerialReader(threading.Thread):
+    def __init__(self, ser, data_queue, negociacion=(1, 0, 1), baud=115200, traza=None):
+        super().__init__(daemon=True)
+        self.ser = ser
+        self.data_queue = data_queue
+        self.running = True
+        self.parser = FrameParser()  # Buffer preasignado para armar paquetes completos
+        self.parser.on_respuesta = self._on_respuesta
+        self.parser.on_comando = self._on_comando
+        self.negociacion = negociacion
+        self.baud = baud
+        self.protocolo = f"v1 {ser.baudrate}"
+        self.traza = traza
+        self.bytes_recibidos = 0
+        if traza is not None:
+            self.parser.on_tiempos = traza.dispositivo
+
+        self.comandos = queue.Queue()     # (comando, valor) pendientes de envío
+        self.respuestas = queue.Queue()   # (comando, estado, valor); estado None: sin respuesta
+        self._pendientes = {}             # secuencia -> [comando, valor, instante, reintentos]
+        self._secuencia = 0
+
+    def run(self):
+        #Hilo principal de lectura del puerto serie
+        version, opciones, diezmado = self.negociacion
+        if version > 1 or self.baud != self.ser.baudrate:
+            self.ser.write(mensaje_negociacion(version, opciones, diezmado, self.baud))
+        while self.running:
+            try:
+                self._atender_comandos()
+                data = self.ser.read(self.ser.in_waiting or 1)
+                if data:
+                    t_lectura = time.perf_counter()
+                    self.bytes_recibidos += len(data)
+                    self.parser.alimentar(data)
+                    self._process_buffer(t_lectura)
+            except Exception:
+                break
+
+    def _process_buffer(self, t_lectura=None):
+        #Extrae las tramas válidas del buffer (CRC verificado) y las envía por la cola
+        for trama in self.parser.tramas():
+            if self.traza is not None:
+                trama = self.traza.recibida(trama, t_lectura)
+            # Envía los datos procesados al hilo principal (en modo sin pérdida espera lugar)
+            while self.running and not self.data_queue.put(trama, timeout=0.1):
+                pass
+
+    def _on_respuesta(self, respuesta):
+        #El dispositivo aceptó la negociación: se adopta la velocidad acordada
+        version, opciones, diezmado, baud = respuesta
+        if baud != self.ser.baudrate:
+            self.ser.baudrate = baud
+            self.parser.reset()     # Lo que quede en el buffer llegó a la velocidad anterior
+        self.protocolo = f"v{version} {baud}"
+
+    def enviar_comando(self, comando, valor):
+        #Encola un comando para el dispositivo; no bloquea al hilo que lo llama
+        self.comandos.put((comando, valor))
+
+    def _atender_comandos(self):
+        #Escribe los comandos encolados y reenvía los que siguen sin respuesta
+        ahora = time.monotonic()
+        while True:
+            try:
+                comando, valor = self.comandos.get_nowait()
+            except queue.Empty:
+                break
+            self._secuencia = (self._secuencia + 1) & 0xFF
+            self._pendientes[self._secuencia] = [comando, valor, ahora, 0]
+            self.ser.write(mensaje_comando(comando, self._secuencia, valor))
+        for secuencia, pendiente in list(self._pendientes.items()):
+            comando, valor, enviado, reintentos = pendiente
+            if ahora - enviado < ESPERA_RESPUESTA:
+                continue
+            if reintentos < REINTENTOS:
+                pendiente[2:] = [ahora, reintentos + 1]
+                self.ser.write(mensaje_comando(comando, secuencia, valor))
+                continue
+            del self._pendientes[secuencia]
+            if comando == CMD_FS:
+                # Sin respuesta: dispositivo v1, se envía la frecuencia como palabra suelta
+                self.ser.write(struct.pack('<I', valor))
+            self.respuestas.put((comando, None, valor))
+
+    def _on_comando(self, respuesta):
+        #Respuesta del dispositivo a un comando (los duplicados por reenvío se ignoran)
+        comando, secuencia, estado, valor = respuesta
+        if self._pendientes.pop(secuencia, None) is not None:
+            self.respuestas.put((comando, estado, valor))
+
+    def restablecer(self):
+        #Pide al dispositivo volver al protocolo v1 a 115200 antes de cerrar
+        if self.protocolo != "v1 115200":
+            self.ser.write(mensaje_negociacion(1))
+            self.ser.flush()
+
+    def stop(self):
+        """Detiene el hilo de lectura"""
+        self.running = False
@@ -0,0 +1,77 @@
+# Modo gráfico de la pantalla OLED: espectro de barras de los armónicos y un
+# tramo de la forma de onda, dibujados con las primitivas de framebuf.
+# Se copia a la Pico junto con sh1106.py.
+#
+#   fila 0-7   : f1 y THD en texto
+#   izquierda  : una barra por armónico (1 a N_BARRAS), altura en dB respecto de f1
+#   derecha    : CICLOS períodos de la señal, una muestra por columna
+try:
+    from ulab import numpy as np
+except ImportError:
+    import numpy as np   # Shim CPython
+import math
+
+N_BARRAS = 10        # Armónicos graficados
+RANGO_DB = 60        # Una barra de altura cero corresponde a -60 dB respecto de f1
+CICLOS = 2           # Períodos de la fundamental que ocupa la forma de onda
+V_PICO = 1.65        # Amplitud que llena media altura del gráfico de la señal
+
+
+class MiniGrafico:
+    def __init__(self, oled, ancho=128, alto=64):
+        self.oled = oled
+        self.y0 = 10                                # Primera fila debajo del texto
+        self.base = alto - 1                        # Fila base de las barras
+        self.h = alto - self.y0
+        # Mapeos de columnas precalculados: inicio de cada barra y zona de la onda
+        paso_barra = (ancho // 2) // N_BARRAS
+        self.ancho_barra = paso_barra - 1
+        self.x_barras = tuple(i * paso_barra for i in range(N_BARRAS))
+        self.x_onda = ancho // 2 + 1
+        self.ancho_onda = ancho - self.x_onda
+        self.y_medio = self.y0 + self.h // 2
+        self.escala_y = (self.h // 2 - 1) / V_PICO
+        self.escala_db = self.h / RANGO_DB
+
+    def _barras(self, armonicos, f1):
+        oled = self.oled
+        if not armonicos or f1 <= 0:
+            return
+        ref = armonicos[0][1]
+        for f, a in armonicos:
+            n = int(f / f1 + 0.5)
+            if n < 1 or n > N_BARRAS or a <= 0:
+                continue
+            alto = int((20 * math.log10(a / ref) + RANGO_DB) * self.escala_db)
+            if alto > 0:
+                alto = min(alto, self.h)
+                oled.fill_rect(self.x_barras[n - 1], self.base - alto + 1,
+                               self.ancho_barra, alto, 1)
+
+    def _onda(self, signal, fs, f1):
+        #Una muestra por columna, con el paso que hace entrar CICLOS períodos
+        N = len(signal)
+        if f1 > 0:
+            paso = max(1, int(CICLOS * fs / (f1 * self.ancho_onda)))
+        else:
+            paso = max(1, N // self.ancho_onda)
+        tramo = signal[:paso * self.ancho_onda:paso]
+        ys = np.clip(self.y_medio - tramo * self.escala_y, self.y0, self.base)
+        oled = self.oled
+        x = self.x_onda
+        prev = int(ys[0])
+        for y in ys:
+            y = int(y)
+            oled.line(x - 1, prev, x, y, 1)
+            prev = y
+            x += 1
+
+    def dibujar(self, signal, fs, armonicos, f1, THD):
+        #Redibuja la pantalla completa; show() sólo envía las páginas que cambiaron
+        oled = self.oled
+        oled.fill(0)
+        oled.text("{:.0f}Hz {:.1f}%".format(f1, THD), 0, 0)
+        self._barras(armonicos, f1)
+        oled.vline(self.x_onda - 2, self.y0, self.h, 1)
+        self._onda(signal, fs, f1)
+        oled.show()
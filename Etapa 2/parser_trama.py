@@ -0,0 +1,141 @@
+import re
+from formato_trama import (HEADER, HEADER_V2, HEADER_ACK, HEADER_RSP, HEADER_TIM, largo_en,
+                           crc_ok, decodificar_en, leer_negociacion, leer_comando, leer_tiempos)
+
+# Cabeceras reconocidas: tramas v1, tramas v2, respuestas de negociación y de
+# comandos y tiempos del dispositivo
+_RE_CABECERA = re.compile(b'|'.join(re.escape(h) for h in
+                                    (HEADER, HEADER_V2, HEADER_ACK, HEADER_RSP, HEADER_TIM)))
+
+
+# Deframer de tramas PICO (v1 y v2) sobre un buffer preasignado.
+# Los datos recibidos se copian una única vez dentro del buffer; la búsqueda
+# de cabecera, la validación del CRC y la decodificación trabajan sobre
+# memoryview, sin generar copias intermedias del backlog. Cuando se llega al
+# final del buffer, los bytes pendientes (a lo sumo una trama incompleta) se
+# desplazan al comienzo.
+
+class FrameParser:
+    def __init__(self, capacidad=1 << 20):
+        self._buf = bytearray(capacidad)
+        self._mv = memoryview(self._buf)
+        self._ini = 0      # Primer byte sin procesar
+        self._fin = 0      # Fin de los datos válidos
+
+        # Callback opcional que recibe cada trama cruda validada (memoryview), p. ej. el grabador
+        self.on_trama = None
+        # Callback opcional para las respuestas de negociación (version, opciones, diezmado, baud)
+        self.on_respuesta = None
+        # Callback opcional para las respuestas a comandos (comando, secuencia, estado, valor)
+        self.on_comando = None
+        # Callback opcional para los tiempos de la última trama (muestreo_us, procesar_us, envio_us)
+        self.on_tiempos = None
+
+        # Estadísticas
+        self.tramas_ok = 0
+        self.errores_crc = 0
+        self.bytes_descartados = 0
+
+    def __len__(self):
+        return self._fin - self._ini
+
+    @property
+    def capacidad(self):
+        return len(self._buf)
+
+    def reset(self):
+        #Descarta los datos pendientes
+        self._ini = self._fin = 0
+
+    def _compactar(self):
+        #Mueve los bytes pendientes al inicio del buffer
+        pendiente = self._fin - self._ini
+        if self._ini and pendiente:
+            # Copia explícita: origen y destino pueden solaparse
+            self._buf[:pendiente] = bytes(self._mv[self._ini:self._fin])
+        self._ini, self._fin = 0, pendiente
+
+    def alimentar(self, data):
+        #Agrega bytes recibidos al buffer
+        n = len(data)
+        if n == 0:
+            return
+        cap = len(self._buf)
+        if n >= cap:
+            # El bloque no entra completo: se conservan sólo los bytes más recientes
+            self.bytes_descartados += (self._fin - self._ini) + (n - cap)
+            self._buf[:] = memoryview(data)[n - cap:]
+            self._ini, self._fin = 0, cap
+            return
+        if self._fin + n > cap:
+            self._compactar()
+            if self._fin + n > cap:
+                # Se descartan los bytes más antiguos para hacer lugar
+                exceso = self._fin + n - cap
+                self.bytes_descartados += exceso
+                self._ini += exceso
+                self._compactar()
+        self._buf[self._fin:self._fin + n] = data
+        self._fin += n
+
+    def tramas(self):
+        #Generador de tramas decodificadas (samples, freqs, amps, rms, thd, fs)
+        while True:
+            trama = self._siguiente()
+            if trama is None:
+                return
+            yield trama
+
+    def _descartar_hasta(self, pos):
+        self.bytes_descartados += pos - self._ini
+        self._ini = pos
+
+    def _siguiente(self):
+        buf, mv = self._buf, self._mv
+        while True:
+            encontrado = _RE_CABECERA.search(buf, self._ini, self._fin)
+            if encontrado is None:
+                # Se conservan los últimos bytes por si la cabecera quedó cortada
+                self._descartar_hasta(max(self._ini, self._fin - 3))
+                return None
+            self._descartar_hasta(encontrado.start())
+
+            ini = self._ini
+            disponible = self._fin - ini
+
+            # Largo del mensaje (v1, v2 o respuesta), leyendo sólo los campos de cabecera
+            largo, _ = largo_en(buf, ini, disponible)
+            if disponible < largo:
+                if largo > len(buf):
+                    self._descartar_hasta(ini + 1)   # Longitud imposible: cabecera falsa
+                    continue
+                return None  # Paquete incompleto
+
+            # --- Validación del CRC ---
+            if not crc_ok(mv, ini, largo):
+                # Se resincroniza a partir del byte siguiente a la cabecera
+                self.errores_crc += 1
+                self._descartar_hasta(ini + 1)
+                continue
+            self._ini = ini + largo
+
+            if encontrado.group() == HEADER_ACK:
+                # Respuesta de negociación: no es una trama de datos
+                if self.on_respuesta is not None:
+                    self.on_respuesta(leer_negociacion(buf, ini))
+                continue
+            if encontrado.group() == HEADER_RSP:
+                if self.on_comando is not None:
+                    self.on_comando(leer_comando(buf, ini))
+                continue
+            if encontrado.group() == HEADER_TIM:
+                if self.on_tiempos is not None:
+                    self.on_tiempos(leer_tiempos(buf, ini))
+                continue
+
+            if self.on_trama is not None:
+                self.on_trama(mv[ini:ini + largo])
+
+            # --- Decodificación de los datos binarios (vistas sobre el buffer) ---
+            self.tramas_ok += 1
+            return decodificar_en(mv, ini)
@@ -0,0 +1,252 @@
+# Procesamiento FFT + armónicos del dispositivo.
+# Se copia a la Pico junto con "Codigo Raspberry.py" y sh1106.py. En CPython el
+# mismo módulo corre sobre NumPy, lo que permite probarlo en una PC Linux.
+try:
+    from ulab import numpy as np
+except ImportError:
+    import numpy as np   # Shim CPython: mismas operaciones sobre NumPy
+import math
+
+N_ARMONICOS = 10     # Armónicos a reportar
+TOLERANCIA = 0.10    # Tolerancia relativa para asociar un pico a n*f1
+UMBRAL_REL = 0.01    # Umbral de detección de picos relativo al máximo
+
+# Coeficientes de las ventanas de coseno: w[n] = sum_k (-1)^k a_k cos(2*pi*k*n/(N-1))
+VENTANAS = {
+    'hann': (0.5, 0.5),
+    'blackman': (0.42, 0.5, 0.08),
+    'flattop': (0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368),
+}
+
+
+def ventana(nombre, N):
+    #Genera la ventana de coseno indicada (hann, blackman o flattop)
+    fase = 2 * np.pi * np.arange(N) / (N - 1)
+    w = np.zeros(N)
+    signo = 1
+    for k, a in enumerate(VENTANAS[nombre]):
+        w = w + signo * a * np.cos(k * fase)
+        signo = -signo
+    return w
+
+
+# =====================================================
+#        INTERPOLACIÓN DE PICOS ENTRE BINS
+# =====================================================
+# Un tono a d bins del bin k produce, con una ventana de coseno de
+# coeficientes a_0..a_K, una amplitud proporcional al núcleo
+#   G(d) = [a_0 sinc(d) + sum_k a_k/2 (sinc(d - k) + sinc(d + k))] / a_0
+# (suma de sincs desplazados, normalizada a G(0) = 1). El cociente entre el
+# mayor vecino y el pico, G(1 - d) / G(d), crece de forma monótona con d en
+# [0, 0.5]: se tabula una vez por ventana y se invierte por interpolación
+# lineal, lo que da el desplazamiento d y la pérdida G(d) a corregir.
+# La misma tabla usan analisis.py en la PC y main.c en el firmware C.
+PUNTOS_TABLA = 65
+
+
+def _sinc(x):
+    return 1.0 if x == 0 else math.sin(math.pi * x) / (math.pi * x)
+
+
+def nucleo(coeficientes, d):
+    #Ganancia relativa G(d) de la ventana para un tono desplazado d bins
+    g = coeficientes[0] * _sinc(d)
+    for k in range(1, len(coeficientes)):
+        g += coeficientes[k] / 2 * (_sinc(d - k) + _sinc(d + k))
+    return abs(g) / coeficientes[0]
+
+
+_tablas = {}
+
+
+def tabla_interpolacion(nombre):
+    #Devuelve (razones, desplazamientos, ganancias) de la ventana, de a PUNTOS_TABLA
+    if nombre not in _tablas:
+        coef = VENTANAS[nombre]
+        desp = [0.5 * i / (PUNTOS_TABLA - 1) for i in range(PUNTOS_TABLA)]
+        gan = [nucleo(coef, d) for d in desp]
+        razones = [nucleo(coef, 1 - d) / g for d, g in zip(desp, gan)]
+        _tablas[nombre] = (razones, desp, gan)
+    return _tablas[nombre]
+
+
+def _interp(x, xs, ys):
+    #Interpolación lineal en una tabla creciente (con saturación en los extremos)
+    if x <= xs[0]:
+        return ys[0]
+    for i in range(1, len(xs)):
+        if x <= xs[i]:
+            t = (x - xs[i - 1]) / (xs[i] - xs[i - 1])
+            return ys[i - 1] + t * (ys[i] - ys[i - 1])
+    return ys[-1]
+
+
+def interpolar_pico(amplitudes, k, tabla):
+    #Devuelve (posición en bins, amplitud corregida) del pico en el bin k
+    razones, desp, gan = tabla
+    a = amplitudes[k]
+    izq, der = amplitudes[k - 1], amplitudes[k + 1]
+    signo = 1 if der > izq else -1
+    d = _interp((der if signo > 0 else izq) / a, razones, desp)
+    return k + signo * d, a / _interp(d, desp, gan)
+
+
+# Cache de ventana, eje de frecuencias y factor de escala.
+# Sólo se recalcula cuando cambia la clave (fs, N, ventana), es decir cuando
+# la PC cambia fs o N o elige otra ventana; en el resto de las tramas
+# procesar no aloca ni evalúa cosenos para armarlos.
+_cache_clave = None
+_cache_valor = None
+
+
+def parametros(fs, N, nombre='hann'):
+    #Devuelve (ventana, frecuencias positivas, escala de amplitud) desde la cache
+    global _cache_clave, _cache_valor
+    clave = (fs, N, nombre)
+    if clave != _cache_clave:
+        window = ventana(nombre, N)
+        correction_factor = 1 / (np.sum(window) / N)
+        # Bins de la FFT: k * fs / N
+        frequencies = np.arange(N // 2) * (fs / N)
+        _cache_valor = (window, frequencies, correction_factor * (2 / N))
+        _cache_clave = clave
+    return _cache_valor
+
+
+def invalidar_cache():
+    global _cache_clave, _cache_valor
+    _cache_clave = _cache_valor = None
+
+
+# =====================================================
+#                PROCESAMIENTO FFT + ARMÓNICOS
+# =====================================================
+def procesar(signal, fs, nombre_ventana='hann'):
+    N = len(signal)
+    signal = signal - np.mean(signal)
+
+    #Ventana, eje de frecuencias y escala precalculados
+    window, freqs_pos, escala = parametros(fs, N, nombre_ventana)
+    signal_windowed = signal * window
+
+    #Calculo de la FFT
+    spectrum = np.fft.fft(signal_windowed)
+    magnitudes = np.sqrt(spectrum.real**2 + spectrum.imag**2)
+    amplitudes_pos = escala * magnitudes[:N//2]
+
+    # Detección de picos con máscaras sobre los vecinos desplazados:
+    # picos[i] vale la amplitud del bin i+1 si es un máximo local sobre el umbral, 0 si no
+    umbral = UMBRAL_REL * np.max(amplitudes_pos)
+    centro = amplitudes_pos[1:-1]
+    picos = (centro * (centro > amplitudes_pos[:-2])
+             * (centro > amplitudes_pos[2:]) * (centro > umbral))
+
+    # Fundamental: el pico de mayor amplitud
+    i1 = int(np.argmax(picos))
+    a1 = float(picos[i1])
+    if a1 <= 0:
+        f1, a1 = 0.0, 0.0
+
+    #Calculo de TRMS
+    Vrms = np.sqrt(np.mean(signal ** 2))
+
+    # Armónicos: el mayor pico dentro de n*f1 ± 10% (indexado directo en bins).
+    # Cada pico elegido se interpola entre bins: frecuencia y amplitud sin
+    # cuantizar a la grilla de fs/N ni pérdida por festoneo de la ventana
+    armonicos_ordenados = []
+    if a1 > 0:
+        tabla = tabla_interpolacion(nombre_ventana)
+        df = fs / N
+        k1 = i1 + 1                  # Bin de la fundamental
+        pos1, a1 = interpolar_pico(amplitudes_pos, k1, tabla)
+        f1 = pos1 * df
+        tol = TOLERANCIA * k1
+        for h in range(1, N_ARMONICOS + 1):
+            lo = max(math.ceil(h * k1 - tol), 1)
+            hi = min(math.floor(h * k1 + tol), len(centro))
+            if lo > hi:
+                break
+            tramo_picos = picos[lo - 1:hi]
+            j = int(np.argmax(tramo_picos))
+            if tramo_picos[j] > 0:
+                pos, a = interpolar_pico(amplitudes_pos, lo + j, tabla)
+                armonicos_ordenados.append((pos * df, a))
+
+    # THD con los 10 armónicos
+    suma = 0
+    for fr, a in armonicos_ordenados[1:]:
+        suma += a*a
+    THD = (math.sqrt(suma) / (a1 + 1e-12)) * 100
+
+    return armonicos_ordenados, Vrms, THD, f1
+
+
+# =====================================================
+#        ANÁLISIS SINCRONIZADO A CICLOS ENTEROS
+# =====================================================
+# Con f1 ya estimada sobre el buffer libre, se toma el tramo que empieza en el
+# primer cruce ascendente (interpolado entre muestras) y abarca el mayor
+# número entero de períodos que entra en el buffer. Los extremos fraccionarios
+# se ponderan por la parte de la muestra que cae dentro del tramo, así que las
+# sumas integran exactamente K períodos: cada armónico se mide con una DFT a
+# su frecuencia exacta h*f1 sin ventana, sin fuga entre armónicos ni pérdida
+# por festoneo, y Vrms no depende de la fracción de ciclo sobrante.
+# Sólo se evalúan cos/sin para el fasor de la fundamental; el del armónico h
+# sale de multiplicar el del h-1 por el de la fundamental (rotación de ángulo
+# doble, sólo productos y sumas), que en la Pico cuesta mucho menos que la
+# trigonometría sobre toda la trama.
+
+def cruce_ascendente(x, hasta):
+    #Posición interpolada del primer cruce ascendente por cero en x[:hasta+1], o None
+    for i in range(min(hasta, len(x) - 1)):
+        a, b = x[i], x[i + 1]
+        if a < 0 <= b:
+            return i - a / (b - a)
+    return None
+
+
+def procesar_ciclos(signal, fs, f1):
+    #Devuelve (armonicos, Vrms, THD, f1, inicio) sobre ciclos enteros, o None si no entra uno
+    N = len(signal)
+    periodo = fs / f1                 # Muestras por ciclo
+    x = signal - np.mean(signal)
+    inicio = cruce_ascendente(x, int(periodo) + 1)
+    if inicio is None:
+        inicio = 0.0
+    ciclos = int((N - 1 - inicio) / periodo)
+    if ciclos < 1:
+        return None
+    fin = inicio + ciclos * periodo
+
+    # Peso de cada muestra: fracción de su intervalo [n - 0.5, n + 0.5] dentro del tramo
+    n = np.arange(N)
+    peso = (np.minimum(np.maximum(n - inicio + 0.5, 0), 1)
+            * np.minimum(np.maximum(fin - n + 0.5, 0), 1))
+    xw = x * peso
+    suma_pesos = float(np.sum(peso))
+    Vrms = math.sqrt(float(np.sum(xw * x)) / suma_pesos)
+
+    armonicos_ordenados = []
+    a1 = 0.0
+    fase = (2 * math.pi * f1 / fs) * n
+    c1, s1 = np.cos(fase), np.sin(fase)
+    c, s = c1, s1
+    for h in range(1, N_ARMONICOS + 1):
+        f = h * f1
+        if f >= fs / 2:
+            break
+        if h > 1:
+            c, s = c * c1 - s * s1, s * c1 + c * s1
+        re = float(np.sum(xw * c))
+        im = float(np.sum(xw * s))
+        a = 2 * math.sqrt(re * re + im * im) / suma_pesos
+        if h == 1:
+            a1 = a
+        if a >= UMBRAL_REL * a1:
+            armonicos_ordenados.append((f, a))
+
+    suma = 0
+    for fr, a in armonicos_ordenados[1:]:
+        suma += a*a
+    THD = (math.sqrt(suma) / (a1 + 1e-12)) * 100
+    return armonicos_ordenados, Vrms, THD, f1, inicio
@@ -0,0 +1,196 @@
+import argparse, time
+import numpy as np
+
+# Aritmética de punto fijo Qm.n sobre arrays enteros de NumPy.
+# Reemplaza a la convolución del TP1 hecha con el paquete fixedpoint (un
+# objeto por muestra) y sirve para evaluar pasar el procesamiento del RP2040 a
+# punto fijo: las mismas operaciones enteras que haría el firmware, pero
+# vectorizadas sobre int64.
+#
+#   - Un valor Qm.n se guarda como el entero round(x * 2^n), con 1 + m + n bits
+#     en complemento a dos (Q0.15 = Q15 de 16 bits, Q16.16 = 's16.16' del TP1).
+#   - Los productos y las sumas se hacen en int64 sin pérdida (acumulador
+#     ancho, como un MAC de DSP) y se reescalan una sola vez al final con el
+#     redondeo elegido; el resultado se satura o se envuelve a los bits del formato.
+#   - fft reproduce bit a bit fft_q15 de "Codigo C/fft.c" con FormatoQ(0, 15):
+#     radix-2 DIT, twiddles de la misma tabla de FFT_MAX_N puntos y escala 1/2
+#     por etapa (la salida es FFT(x) / n). banco_fft.py compara ambas.
+
+FFT_MAX_N = 4096                 # Igual que en Codigo C/fft.h
+REDONDEOS = ('cercano', 'truncar', 'par')
+
+
+def twiddles_q(bits_frac, n_max=FFT_MAX_N):
+    #Tablas cos/sin(2*pi*k/n_max), k < n_max/2, cuantizadas con bits_frac bits fraccionarios
+    ang = 2 * np.pi * np.arange(n_max // 2) / n_max
+    escala = 1 << bits_frac
+    limite = escala - 1
+    return tuple(np.clip(np.round(v * escala), -escala, limite).astype(np.int64)
+                 for v in (np.cos(ang), np.sin(ang)))
+
+
+def _bit_reverso(n):
+    #Permutación bit-reversal de n puntos (n potencia de 2)
+    bits = n.bit_length() - 1
+    i = np.arange(n)
+    r = np.zeros(n, dtype=np.int64)
+    for b in range(bits):
+        r |= ((i >> b) & 1) << (bits - 1 - b)
+    return r
+
+
+class FormatoQ:
+    def __init__(self, m, n, redondeo='cercano', saturar=True):
+        if redondeo not in REDONDEOS:
+            raise ValueError(f"Redondeo desconocido: {redondeo}")
+        if 1 + m + n > 32:
+            raise ValueError("El formato debe entrar en 32 bits")
+        self.m = m
+        self.n = n
+        self.bits = 1 + m + n
+        self.redondeo = redondeo
+        self.saturar = saturar
+        self.minimo = -(1 << (self.bits - 1))
+        self.maximo = (1 << (self.bits - 1)) - 1
+        self.lsb = 2.0 ** -n
+        self._twiddles = None
+
+    def __repr__(self):
+        return f"Q{self.m}.{self.n}"
+
+    # --- Conversión y reescalado ---
+
+    def limitar(self, q):
+        #Lleva enteros al rango del formato: saturando o envolviendo en complemento a dos
+        if self.saturar:
+            return np.clip(q, self.minimo, self.maximo)
+        return ((q - self.minimo) & ((1 << self.bits) - 1)) + self.minimo
+
+    def ajustar(self, v, desplazamiento, limitar=True):
+        #Divide enteros int64 por 2^desplazamiento con el redondeo del formato
+        v = np.asarray(v, dtype=np.int64)
+        if desplazamiento > 0:
+            if self.redondeo == 'cercano':
+                v = (v + (1 << (desplazamiento - 1))) >> desplazamiento
+            elif self.redondeo == 'truncar':
+                v = v >> desplazamiento
+            else:
+                # Convergente: los empates van al par más cercano
+                q = v >> desplazamiento
+                resto = v - (q << desplazamiento)
+                mitad = 1 << (desplazamiento - 1)
+                v = q + ((resto > mitad) | ((resto == mitad) & (q & 1).astype(bool)))
+        return self.limitar(v) if limitar else v
+
+    def cuantizar(self, x):
+        #Convierte valores reales a enteros del formato
+        x = np.asarray(x, dtype=np.float64) * (1 << self.n)
+        if self.redondeo == 'cercano':
+            q = np.floor(x + 0.5)
+        elif self.redondeo == 'truncar':
+            q = np.floor(x)
+        else:
+            q = np.rint(x)
+        return self.limitar(q.astype(np.int64))
+
+    def a_float(self, q):
+        return np.asarray(q, dtype=np.float64) * self.lsb
+
+    # --- Operaciones ---
+
+    def suma(self, a, b):
+        return self.limitar(np.asarray(a, dtype=np.int64) + b)
+
+    def mul(self, a, b):
+        #Producto elemento a elemento (el producto exacto tiene 2n bits fraccionarios)
+        return self.ajustar(np.asarray(a, dtype=np.int64) * b, self.n)
+
+    def mac(self, a, b, axis=-1):
+        #Suma de productos sobre un eje con acumulador ancho y un único redondeo
+        producto = np.asarray(a, dtype=np.int64) * np.asarray(b, dtype=np.int64)
+        return self.ajustar(np.sum(producto, axis=axis), self.n)
+
+    def convolucion(self, x, h):
+        #Convolución completa (como np.convolve) con acumulador ancho
+        acumulada = np.convolve(np.asarray(x, dtype=np.int64), np.asarray(h, dtype=np.int64))
+        return self.ajustar(acumulada, self.n)
+
+    def fft(self, re, im=None):
+        #FFT compleja sobre el último eje, escalada por 1/n; devuelve (re, im) del formato
+        re = np.array(re, dtype=np.int64)
+        im = np.zeros_like(re) if im is None else np.array(im, dtype=np.int64)
+        n = re.shape[-1]
+        if n < 2 or n > FFT_MAX_N or n & (n - 1):
+            raise ValueError(f"Tamaño no soportado: {n}")
+        if self._twiddles is None:
+            self._twiddles = twiddles_q(self.n)
+        tabla_cos, tabla_sin = self._twiddles
+
+        orden = _bit_reverso(n)
+        re = np.ascontiguousarray(re[..., orden])
+        im = np.ascontiguousarray(im[..., orden])
+        forma = re.shape[:-1]
+        largo = 2
+        while largo <= n:
+            # Todas las mariposas de la etapa juntas: (grupo, [u, v], j)
+            mitad = largo // 2
+            k = np.arange(mitad) * (FFT_MAX_N // largo)
+            wr, wi = tabla_cos[k], -tabla_sin[k]
+            r = re.reshape(forma + (n // largo, 2, mitad))
+            i = im.reshape(forma + (n // largo, 2, mitad))
+            ur, ui = r[..., 0, :], i[..., 0, :]
+            xr, xi = r[..., 1, :], i[..., 1, :]
+            vr = self.ajustar(xr * wr - xi * wi, self.n, limitar=False)
+            vi = self.ajustar(xr * wi + xi * wr, self.n, limitar=False)
+            r0, i0 = self.ajustar(ur + vr, 1), self.ajustar(ui + vi, 1)
+            r1, i1 = self.ajustar(ur - vr, 1), self.ajustar(ui - vi, 1)
+            r[..., 0, :], i[..., 0, :] = r0, i0
+            r[..., 1, :], i[..., 1, :] = r1, i1
+            largo <<= 1
+        return re, im
+
+
+# Comparación con punto flotante y con la convolución del TP1 (paquete fixedpoint)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precisión y velocidad del motor de punto fijo")
+    parser.add_argument("-N", type=int, default=1024, help="Puntos de la FFT")
+    parser.add_argument("-B", type=int, default=1000, help="Tramas por lote de FFT")
+    args = parser.parse_args()
+
+    # Convolución de los dos pulsos cuadrados del TP1 en s16.16
+    q = FormatoQ(15, 16)
+    t = np.arange(1000)
+    p1 = ((t >= 200) & (t < 300)).astype(float)
+    p2 = ((t >= 400) & (t < 500)).astype(float)
+    t0 = time.perf_counter()
+    y = q.a_float(q.convolucion(q.cuantizar(p1), q.cuantizar(p2)))
+    dt = time.perf_counter() - t0
+    print(f"Convolución {q}: {dt * 1e3:.2f} ms, error {np.max(np.abs(y - np.convolve(p1, p2))):.1e}")
+    try:
+        from fixedpoint import FixedPoint
+        t0 = time.perf_counter()
+        x_fp = [FixedPoint(v, 's16.16') for v in p1[150:350]]
+        h_fp = [FixedPoint(v, 's16.16') for v in p2[350:550]]
+        for k, h_val in enumerate(h_fp):
+            for n, x_val in enumerate(x_fp):
+                x_val * h_val
+        dt_fp = (time.perf_counter() - t0) * (len(p1) / 200) ** 2
+        print(f"  fixedpoint (estimado para 1000 x 1000): {dt_fp:.1f} s")
+    except ImportError:
+        pass
+
+    # FFT Q15 de un lote de tramas: tono con armónicos a media escala
+    q15 = FormatoQ(0, 15)
+    rng = np.random.default_rng(0)
+    n = np.arange(args.N)
+    f = rng.uniform(5, args.N / 8, size=(args.B, 1))
+    x = 0.5 * np.sin(2 * np.pi * f * n / args.N) + 0.1 * np.sin(2 * np.pi * 3 * f * n / args.N)
+    t0 = time.perf_counter()
+    re, im = q15.fft(q15.cuantizar(x))
+    dt = time.perf_counter() - t0
+    ref = np.fft.fft(x, axis=1) / args.N
+    err = np.abs(q15.a_float(re) + 1j * q15.a_float(im) - ref)
+    snr = 10 * np.log10(np.sum(np.abs(ref) ** 2) / np.sum(err ** 2))
+    print(f"FFT {q15} de {args.B} x {args.N}: {args.B * args.N / dt / 1e6:.2f} Mmuestras/s,"
+          f" error máx {np.max(err):.1e}, SNR {snr:.1f} dB")
@@ -0,0 +1,113 @@
+import argparse, csv, os, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from captura import CaptureIndex
+from formato_trama import decodificar_lote, dims_en, largo_trama, DT_ARMONICO
+from analisis import analizar_lote, muestras_a_volts, N_ARMONICOS
+
+# Re-procesamiento offline de capturas grandes con varios procesos.
+# La captura se divide en bloques de tramas consecutivas; cada proceso abre la
+# captura y su índice con np.memmap y lee sólo su rango (no se serializan
+# muestras entre procesos: sólo viajan la ruta y los límites del bloque, y de
+# vuelta la tabla de resultados del bloque).
+
+DT_RESULTADO = np.dtype([
+    ('trama', '<i8'), ('t', '<f8'), ('fs', '<u4'),
+    ('f1', '<f8'), ('vrms', '<f8'), ('thd', '<f8'),
+    ('n_arm', '<i2'), ('arm_f', '<f8', (N_ARMONICOS,)), ('arm_a', '<f8', (N_ARMONICOS,)),
+])
+
+
+def _tramos(captura, i0, i1):
+    #Divide [i0, i1) en tramos homogéneos: (a, b, es_v2). Las tramas v1 de un
+    #tramo son contiguas en el archivo y de igual (fs, N, M); las v2 comparten
+    #fs, N, flags y diezmado
+    indice = captura.indice[i0:i1]
+    offsets = indice['offset'].astype(np.int64)
+    largos = indice['largo'].astype(np.int64)
+    cab = captura.datos[offsets[:, None] + np.arange(12)]
+    v2 = cab[:, 3] == ord('2')
+    fs = np.where(v2, cab[:, 6:10].copy().view('<u4').ravel(), cab[:, 4:8].copy().view('<u4').ravel())
+    forma_v2 = cab[:, 4:12].copy().view('<u8').ravel()    # flags, diezmado, fs, N
+    corte = np.flatnonzero(
+        (v2[1:] != v2[:-1]) | (fs[1:] != fs[:-1])
+        | (~v2[1:] & ((offsets[1:] != offsets[:-1] + largos[:-1]) | (largos[1:] != largos[:-1])))
+        | (v2[1:] & (forma_v2[1:] != forma_v2[:-1]))) + 1
+    bordes = np.concatenate([[0], corte, [len(indice)]])
+    for a, b in zip(bordes[:-1], bordes[1:]):
+        yield i0 + a, i0 + b, bool(v2[a])
+
+
+def analizar_bloque(path, i0, i1):
+    #Analiza las tramas [i0, i1) de una captura; se ejecuta en un proceso del pool
+    captura = CaptureIndex(path)
+    salida = np.zeros(i1 - i0, dtype=DT_RESULTADO)
+    for a, b, es_v2 in _tramos(captura, i0, i1):
+        fila = salida[a - i0:b - i0]
+        fila['trama'] = np.arange(a, b)
+        fila['t'] = captura.indice['t'][a:b] - captura.t0
+        offset = int(captura.indice['offset'][a])
+        if es_v2:
+            # Tramas v2 (largo variable): se decodifican de a una y se apilan
+            tramas = [captura.trama(i) for i in range(a, b)]
+            fs = tramas[0][5]
+            samples = np.stack([t[0] for t in tramas])
+        else:
+            fs, n = dims_en(captura.datos, offset)
+            m = (int(captura.indice['largo'][a]) - largo_trama(n, 0)) // DT_ARMONICO.itemsize
+            samples = decodificar_lote(captura.datos, n, m, offset=offset, count=b - a)['samples']
+        fila['fs'] = fs
+        if samples.shape[1] == 0:
+            # Tramas sin muestras (sólo espectro): no hay nada que re-analizar
+            fila['f1'] = fila['vrms'] = fila['thd'] = np.nan
+            fila['arm_f'] = fila['arm_a'] = np.nan
+            continue
+        r = analizar_lote(muestras_a_volts(samples), fs)
+        fila['f1'], fila['vrms'], fila['thd'] = r.f1, r.vrms, r.thd
+        fila['n_arm'] = r.n_arm
+        fila['arm_f'] = r.arm_f
+        fila['arm_a'] = r.arm_a
+    return salida
+
+
+def reprocesar(path, procesos=None, bloque=4096):
+    #Reprocesa toda la captura en paralelo y devuelve la tabla ordenada por trama
+    total = len(CaptureIndex(path))
+    limites = [(i, min(i + bloque, total)) for i in range(0, total, bloque)]
+    if not limites:
+        return np.zeros(0, dtype=DT_RESULTADO)
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        partes = list(pool.map(analizar_bloque, [path] * len(limites),
+                               [a for a, _ in limites], [b for _, b in limites]))
+    return np.concatenate(partes)
+
+
+def guardar(resultados, destino):
+    #Guarda la tabla como .npy (estructurado) o .csv (una columna por armónico)
+    if destino.endswith('.npy'):
+        np.save(destino, resultados)
+        return
+    with open(destino, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['trama', 't', 'fs', 'f1', 'vrms', 'thd', 'n_arm']
+                        + [f'arm_f{k + 1}' for k in range(N_ARMONICOS)]
+                        + [f'arm_a{k + 1}' for k in range(N_ARMONICOS)])
+        for r in resultados:
+            writer.writerow([r['trama'], r['t'], r['fs'], r['f1'], r['vrms'], r['thd'], r['n_arm']]
+                            + r['arm_f'].tolist() + r['arm_a'].tolist())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-procesa una captura PICO en paralelo")
+    parser.add_argument("captura", help="Archivo .pico")
+    parser.add_argument("-o", "--salida", help="Archivo de resultados (.npy o .csv)")
+    parser.add_argument("-j", "--procesos", type=int, default=os.cpu_count())
+    parser.add_argument("-b", "--bloque", type=int, default=4096, help="Tramas por bloque")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    resultados = reprocesar(args.captura, args.procesos, args.bloque)
+    dt = time.perf_counter() - t0
+    print(f"{len(resultados)} tramas en {dt:.2f} s ({len(resultados) / max(dt, 1e-9):.0f} tramas/s)")
+    if args.salida:
+        guardar(resultados, args.salida)
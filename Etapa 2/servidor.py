@@ -0,0 +1,267 @@
+import argparse, asyncio, json, socket, struct, threading
+import serial
+from parser_trama import FrameParser
+from formato_trama import decodificar_en
+
+try:
+    import serial_asyncio   # pyserial-asyncio (opcional)
+except ImportError:
+    serial_asyncio = None
+
+# Servicio de adquisición sin interfaz gráfica para varios dispositivos.
+# Un único event loop de asyncio atiende todos los puertos serie (sin un hilo
+# por puerto): cada uno tiene su propio FrameParser y las tramas validadas se
+# publican, sin volver a codificarlas, a los suscriptores conectados por TCP
+# local. Una o varias GUIs pueden engancharse con ClienteServidor.
+#
+# Protocolo con los suscriptores:
+#   servidor -> cliente: una línea JSON {"dispositivos": [nombre, ...]}
+#   cliente -> servidor: una línea con los índices a recibir ("0,2") o "*"
+#   servidor -> cliente: registros | dispositivo u16 | largo u32 | trama PICO cruda |
+#
+# Para probarlo sin hardware alcanza con pares de pseudo-terminales
+# (os.openpty o `socat -d -d pty,raw,echo=0 pty,raw,echo=0`).
+
+PUERTO_SERVIDOR = 8750
+MAX_PENDIENTE = 1 << 20          # Bytes encolados por suscriptor antes de descartar tramas
+PERIODO_ESTADISTICAS = 5.0       # Segundos entre reportes por consola
+_REGISTRO = struct.Struct('<HI')
+
+
+# Transporte mínimo sobre pyserial para cuando no está pyserial-asyncio:
+# registra el descriptor del puerto en el event loop (POSIX) y entrega al
+# protocolo lo que haya disponible en cada aviso de lectura.
+
+class _TransporteSerie(asyncio.Transport):
+    def __init__(self, loop, ser, protocolo):
+        super().__init__()
+        self._loop = loop
+        self._ser = ser
+        self._protocolo = protocolo
+        self._cerrado = False
+        loop.add_reader(ser.fileno(), self._leer)
+        protocolo.connection_made(self)
+
+    def _leer(self):
+        try:
+            data = self._ser.read(self._ser.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self._cerrar(e)
+            return
+        if data:
+            self._protocolo.data_received(data)
+
+    def write(self, data):
+        self._ser.write(data)
+
+    def is_closing(self):
+        return self._cerrado
+
+    def close(self):
+        self._cerrar(None)
+
+    def _cerrar(self, exc):
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self._loop.remove_reader(self._ser.fileno())
+        self._ser.close()
+        self._protocolo.connection_lost(exc)
+
+
+# Un puerto serie: arma las tramas con su propio parser y las publica
+
+class Dispositivo(asyncio.Protocol):
+    def __init__(self, indice, nombre, servidor):
+        self.indice = indice
+        self.nombre = nombre
+        self.servidor = servidor
+        self.transport = None
+        self.conectado = False
+        self.parser = FrameParser()
+        self.parser.on_trama = self._publicar
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.conectado = True
+
+    def data_received(self, data):
+        self.parser.alimentar(data)
+        for _ in self.parser.tramas():
+            pass   # Las tramas ya se publicaron crudas desde on_trama
+
+    def connection_lost(self, exc):
+        self.conectado = False
+        print(f"[{self.nombre}] desconectado", exc or "")
+
+    def _publicar(self, trama):
+        self.servidor.publicar(self.indice, trama)
+
+
+class Suscriptor:
+    def __init__(self, writer, filtro):
+        self.writer = writer
+        self.filtro = filtro     # None: todos los dispositivos
+        self.enviadas = 0
+        self.descartadas = 0
+
+
+class ServidorAdquisicion:
+    def __init__(self, puertos, baud=115200, host='127.0.0.1', puerto=PUERTO_SERVIDOR):
+        self.puertos = list(puertos)
+        self.baud = baud
+        self.host = host
+        self.puerto = puerto
+        self.dispositivos = []
+        self.suscriptores = set()
+        self._servidor = None
+
+    async def _abrir(self, indice, nombre):
+        #Abre un puerto serie y lo conecta a su Dispositivo
+        loop = asyncio.get_running_loop()
+        fabrica = lambda: Dispositivo(indice, nombre, self)
+        if serial_asyncio is not None:
+            _, protocolo = await serial_asyncio.create_serial_connection(
+                loop, fabrica, nombre, baudrate=self.baud)
+            return protocolo
+        protocolo = fabrica()
+        _TransporteSerie(loop, serial.Serial(nombre, self.baud, timeout=0), protocolo)
+        return protocolo
+
+    async def iniciar(self):
+        #Abre todos los puertos (los que fallan se informan y se omiten) y el socket
+        for indice, nombre in enumerate(self.puertos):
+            try:
+                self.dispositivos.append(await self._abrir(indice, nombre))
+            except (serial.SerialException, OSError) as e:
+                print(f"[{nombre}] no se pudo abrir:", e)
+                self.dispositivos.append(Dispositivo(indice, nombre, self))
+        self._servidor = await asyncio.start_server(self._atender_suscriptor,
+                                                    self.host, self.puerto)
+        print(f"Servidor en {self.host}:{self.puerto} con {len(self.puertos)} dispositivos")
+
+    async def servir(self):
+        #Corre el servidor hasta que se cancele, reportando estadísticas periódicas
+        await self.iniciar()
+        try:
+            while True:
+                await asyncio.sleep(PERIODO_ESTADISTICAS)
+                self.reportar()
+        finally:
+            self.cerrar()
+
+    def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+        for d in self.dispositivos:
+            if d.transport is not None:
+                d.transport.close()
+        for s in self.suscriptores:
+            s.writer.close()
+
+    async def _atender_suscriptor(self, reader, writer):
+        nombres = [d.nombre for d in self.dispositivos]
+        writer.write((json.dumps({'dispositivos': nombres}) + '\n').encode())
+        linea = (await reader.readline()).decode().strip()
+        filtro = None if linea in ('', '*') else {int(i) for i in linea.split(',')}
+        suscriptor = Suscriptor(writer, filtro)
+        self.suscriptores.add(suscriptor)
+        try:
+            await reader.read()      # Hasta que el cliente cierre la conexión
+        except ConnectionError:
+            pass
+        finally:
+            self.suscriptores.discard(suscriptor)
+            writer.close()
+
+    def publicar(self, indice, trama):
+        #Envía una trama validada a los suscriptores interesados
+        registro = None
+        for s in self.suscriptores:
+            if s.filtro is not None and indice not in s.filtro:
+                continue
+            # Un suscriptor lento no frena a los demás ni a la lectura: se le descartan tramas
+            if s.writer.transport.get_write_buffer_size() > MAX_PENDIENTE:
+                s.descartadas += 1
+                continue
+            if registro is None:
+                registro = _REGISTRO.pack(indice, len(trama)) + trama
+            s.writer.write(registro)
+            s.enviadas += 1
+
+    def reportar(self):
+        for d in self.dispositivos:
+            p = d.parser
+            estado = "ok" if d.conectado else "desconectado"
+            print(f"[{d.nombre}] {estado}  tramas: {p.tramas_ok}  CRC: {p.errores_crc}"
+                  f"  descartados: {p.bytes_descartados} B")
+        for s in self.suscriptores:
+            print(f"  suscriptor {s.writer.get_extra_info('peername')}:"
+                  f" enviadas {s.enviadas}, descartadas {s.descartadas}")
+
+
+# Cliente para la GUI: se suscribe a un dispositivo del servidor y alimenta el
+# mismo canal de datos que SerialReader o ReplaySource. El timeout sólo se usa
+# para conectar y leer el saludo: luego la lectura espera sin límite (el
+# dispositivo puede no enviar tramas por un buen rato). Si la conexión se
+# cierra o falla, el hilo termina y deja el motivo en `error` para la GUI.
+
+class ClienteServidor(threading.Thread):
+    def __init__(self, data_queue, dispositivo=0, host='127.0.0.1', puerto=PUERTO_SERVIDOR):
+        super().__init__(daemon=True)
+        self.data_queue = data_queue
+        self.dispositivo = dispositivo
+        self.running = True
+        self.tramas = 0
+        self.error = None
+        self.sock = socket.create_connection((host, puerto), timeout=5)
+        self.archivo = self.sock.makefile('rb')
+        self.dispositivos = json.loads(self.archivo.readline())['dispositivos']
+        self.sock.sendall(f"{dispositivo}\n".encode())
+        self.sock.settimeout(None)
+
+    def run(self):
+        leer = self.archivo.read
+        while self.running:
+            try:
+                cabecera = leer(_REGISTRO.size)
+                if len(cabecera) < _REGISTRO.size:
+                    self.error = "El servidor cerró la conexión"
+                    break
+                _, largo = _REGISTRO.unpack(cabecera)
+                datos = leer(largo)
+                if len(datos) < largo:
+                    self.error = "El servidor cerró la conexión"
+                    break
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+                break
+            trama = decodificar_en(datos, 0)
+            while self.running and not self.data_queue.put(trama, timeout=0.1):
+                pass
+            self.tramas += 1
+        self.running = False
+
+    def stop(self):
+        """Detiene la suscripción"""
+        self.running = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de adquisición PICO para varios dispositivos")
+    parser.add_argument("puertos", nargs='+', help="Puertos serie (COM3, /dev/ttyACM0, /dev/pts/N, ...)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--puerto", type=int, default=PUERTO_SERVIDOR)
+    args = parser.parse_args()
+
+    servidor = ServidorAdquisicion(args.puertos, args.baud, args.host, args.puerto)
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        pass
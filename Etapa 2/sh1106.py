@@ -1,5 +1,12 @@
 from machine import Pin, I2C
-import framebuf
+from array import array
+import framebuf, binascii
+
+# Refresco parcial: show() sólo transmite las páginas (bandas de 8 filas) cuyo
+# contenido cambió desde el último envío. Cada página se compara por su CRC32,
+# sin copias del buffer; los comandos de direccionamiento de una página van en
+# una sola transacción I2C y los datos se envían con writevto directamente
+# desde una vista preasignada de la página, sin alocar en cada refresco.
 
 class SH1106_I2C(framebuf.FrameBuffer):
     def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
@@ -11,16 +18,28 @@ class SH1106_I2C(framebuf.FrameBuffer):
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
+
+        mv = memoryview(self.buffer)
+        self._paginas = [mv[p * width:(p + 1) * width] for p in range(self.pages)]
+        self._crc = array('I', [0] * self.pages)   # CRC de lo último enviado por página
+        self._sucias = True                        # Fuerza un envío completo
+        self._cmd1 = bytearray(2)                  # Control 0x00 + un comando
+        self._cmd_pagina = bytearray(b'\x00\xb0\x02\x10')   # Página, columna baja/alta
+        self._datos = [b'\x40', None]              # Control 0x40 + vista de la página
         self.init_display()
 
     def write_cmd(self, cmd):
-        self.i2c.writeto(self.addr, bytearray([0x00, cmd]))
+        self._cmd1[1] = cmd
+        self.i2c.writeto(self.addr, self._cmd1)
 
     def write_data(self, buf):
-        self.i2c.writeto(self.addr, b'\x40' + buf)
+        self._datos[1] = buf
+        self.i2c.writevto(self.addr, self._datos)
 
     def init_display(self):
-        for cmd in (
+        # Toda la secuencia va en una única transacción (byte de control 0x00)
+        self.i2c.writeto(self.addr, bytes((
+            0x00,  # control: siguen comandos
             0xAE,  # display off
             0xA8, self.height - 1,
             0xD3, 0x00,
@@ -34,16 +53,35 @@ class SH1106_I2C(framebuf.FrameBuffer):
             0xA4,  # display follows RAM
             0xA6,  # normal display
             0xAF,  # display on
-        ):
-            self.write_cmd(cmd)
+        )))
         self.fill(0)
+        self.invalidar()
         self.show()
 
+    def poweroff(self):
+        self.write_cmd(0xAE)
+
+    def poweron(self):
+        self.write_cmd(0xAF)
+        self.invalidar()
+
+    def invalidar(self):
+        #El próximo show() reenvía todas las páginas
+        self._sucias = True
+
     def show(self):
-        for page in range(0, self.pages):
-            self.write_cmd(0xB0 + page)
-            self.write_cmd(0x02)      # lower column start (shift)
-            self.write_cmd(0x10)      # higher column start
-            start = self.width * page
-            end = start + self.width
-            self.write_data(self.buffer[start:end])
+        #Envía las páginas modificadas; devuelve cuántas se transmitieron
+        enviadas = 0
+        for page in range(self.pages):
+            vista = self._paginas[page]
+            crc = binascii.crc32(vista)
+            if crc == self._crc[page] and not self._sucias:
+                continue
+            self._crc[page] = crc
+            self._cmd_pagina[1] = 0xB0 + page   # lower column start 0x02 (shift), higher 0x10
+            self.i2c.writeto(self.addr, self._cmd_pagina)
+            self._datos[1] = vista
+            self.i2c.writevto(self.addr, self._datos)
+            enviadas += 1
+        self._sucias = False
+        return enviadas
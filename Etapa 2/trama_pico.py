@@ -0,0 +1,236 @@
+# Serializador de tramas PICO del dispositivo.
+# Se copia a la Pico junto con "Codigo Raspberry.py"; en CPython corre sobre
+# NumPy con el mismo código.
+try:
+    from ulab import numpy as np
+except ImportError:
+    import numpy as np   # Shim CPython
+import struct, binascii
+
+HEADER = b'PICO'
+HEADER_V2 = b'PIC2'
+HEADER_NEG = b'PNEG'
+HEADER_ACK = b'PACK'
+HEADER_CMD = b'PCMD'
+HEADER_RSP = b'PRSP'
+HEADER_TIM = b'PTIM'
+LEN_TIEMPOS = 20
+MAX_ARMONICOS = 10
+BLOQUE_DELTA = 16      # Muestras por bloque de ancho fijo en la codificación delta
+
+# Opciones del protocolo v2 (mismos valores que formato_trama.py en la PC)
+OPC_SIN_MUESTRAS = 0x01
+OPC_DIEZMADO = 0x02
+OPC_DELTA = 0x04
+BAUDIOS = (115200, 230400, 460800, 921600)
+
+# Comandos y estados de respuesta (mismos valores que formato_trama.py)
+CMD_FS = 1
+CMD_N = 2
+CMD_VENTANA = 3
+CMD_INTERVALO = 4
+CMD_STREAMING = 5
+CMD_OLED = 6
+CMD_SINCRONISMO = 7
+SINC_LIBRE = 0
+SINC_CRUCE = 1
+SINC_CICLOS = 2
+CMD_TRAZA = 8
+VENTANAS_CMD = ('hann', 'blackman', 'flattop')
+EST_OK = 0
+EST_RANGO = 1
+EST_DESCONOCIDO = 2
+
+
+# Arma la trama sobre un bytearray preasignado para N muestras.
+# Las muestras se convierten a int16 en una sola operación y se escriben
+# directamente dentro de la trama a través de una vista; el CRC se va
+# acumulando por bloques a medida que se completa cada sección.
+#
+#   v1: 'PICO' | fs u32 | N u16 | N x int16 | M u16 | M x (f f32, a f32) | rms f32 | thd f32 | crc u32
+#   v2: 'PIC2' | flags u8 | diezmado u8 | fs u32 | N u16 | n_muestras u16 | largo_muestras u16
+#              | bloque de muestras | M u16 | M x (f f32, a f32) | rms f32 | thd f32 | crc u32
+#
+# Con OPC_DELTA las diferencias zigzag se calculan sobre arrays y los bytes del
+# varint se escriben con asignaciones por rebanadas, de a BLOQUE_DELTA
+# muestras: todas las del bloque usan el ancho (1, 2 o 3 bytes) de la mayor.
+# Las menores quedan con un varint no mínimo (bytes 0x80 de relleno), que el
+# decodificador LEB128 de la PC lee igual; a cambio no hay un lazo por muestra.
+
+def largo_maximo(N, max_armonicos=MAX_ARMONICOS):
+    #Peor caso de trama para N muestras: v2 con deltas de 3 bytes por muestra
+    return 16 + 3 * N + 2 + 8 * max_armonicos + 12
+
+
+class SerializadorTrama:
+    def __init__(self, N, max_armonicos=MAX_ARMONICOS):
+        self.N = N
+        self.fin_muestras = 10 + 2 * N
+        self.frame = bytearray(largo_maximo(N, max_armonicos))
+        self.mv = memoryview(self.frame)
+        # Vista int16 sobre la sección de muestras de la trama v1
+        self.muestras = np.frombuffer(self.frame, dtype=np.int16,
+                                      offset=10, count=N)
+        # Muestras cuantizadas para la trama v2 y vista de bytes para los varint
+        self.q = np.zeros(N, dtype=np.int16)
+        self.octetos = np.frombuffer(self.frame, dtype=np.uint8)
+
+    def _cola(self, pos, crc, armonicos_ordenados, Vrms, THD):
+        #Escribe armónicos, RMS, THD y CRC desde pos; devuelve el largo total
+        inicio = pos
+        M = len(armonicos_ordenados)
+        struct.pack_into('<H', self.frame, pos, M)
+        pos += 2
+        for f, a in armonicos_ordenados:
+            struct.pack_into('<ff', self.frame, pos, f, a)
+            pos += 8
+
+        # RMS y THD
+        struct.pack_into('<ff', self.frame, pos, Vrms, THD)
+        pos += 8
+
+        # CRC (desde el byte 4 en adelante)
+        crc = binascii.crc32(self.mv[inicio:pos], crc) & 0xFFFFFFFF
+        struct.pack_into('<I', self.frame, pos, crc)
+        return pos + 4
+
+    def armar(self, signal, fs, armonicos_ordenados, Vrms, THD):
+        #Completa la trama v1 y devuelve un memoryview con su largo exacto
+        self.frame[0:4] = HEADER
+        struct.pack_into('<IH', self.frame, 4, fs, self.N)
+
+        # Muestras en int16 (conversión vectorizada, sin listas intermedias)
+        self.muestras[:] = np.clip(signal / 3.3 * 32767, -32767, 32767)
+        crc = binascii.crc32(self.mv[4:self.fin_muestras])
+
+        largo = self._cola(self.fin_muestras, crc, armonicos_ordenados, Vrms, THD)
+        return self.mv[:largo]
+
+    def armar_v2(self, signal, fs, armonicos_ordenados, Vrms, THD, opciones, diezmado=1):
+        #Completa una trama v2 con las opciones negociadas
+        frame = self.frame
+        frame[0:4] = HEADER_V2
+        d = diezmado if opciones & OPC_DIEZMADO else 1
+        pos = 16
+        n_env = 0
+        if not opciones & OPC_SIN_MUESTRAS:
+            self.q[:] = np.clip(signal / 3.3 * 32767, -32767, 32767)
+            enviadas = self.q[::d] if d > 1 else self.q
+            n_env = len(enviadas)
+            if opciones & OPC_DELTA:
+                pos = self._deltas(enviadas, pos)
+            else:
+                vista = np.frombuffer(frame, dtype=np.int16, offset=16, count=n_env)
+                vista[:] = enviadas
+                pos += 2 * n_env
+        struct.pack_into('<BBIHHH', frame, 4, opciones, d, fs, self.N, n_env, pos - 16)
+        crc = binascii.crc32(self.mv[4:pos])
+
+        largo = self._cola(pos, crc, armonicos_ordenados, Vrms, THD)
+        return self.mv[:largo]
+
+    def _deltas(self, enviadas, pos):
+        #Escribe las diferencias sucesivas en zigzag + varint desde pos; devuelve el final
+        x = enviadas * 1.0                  # En float: las diferencias no entran en int16
+        d = x * 1.0
+        d[1:] = x[1:] - x[:-1]
+        z = np.where(d < 0, -2 * d - 1, 2 * d)
+        n = len(z)
+        salida = self.octetos
+        if np.max(z) < 0x80:
+            # Caso común (señal suave): un byte por muestra, de una vez
+            salida[pos:pos + n] = z
+            return pos + n
+
+        # Ancho de cada bloque según su mayor valor
+        completos = n // BLOQUE_DELTA
+        maximos = []
+        if completos:
+            maximos = np.max(z[:completos * BLOQUE_DELTA].reshape((completos, BLOQUE_DELTA)),
+                             axis=1).tolist()
+        if n > completos * BLOQUE_DELTA:
+            maximos.append(np.max(z[completos * BLOQUE_DELTA:]))
+        anchos = [1 if m < 0x80 else 2 if m < 0x4000 else 3 for m in maximos]
+
+        # Grupos de 7 bits; los que no son el último llevan el bit de continuación
+        z1 = np.floor(z / 0x80)
+        z2 = np.floor(z / 0x4000)
+        c0 = z - z1 * 0x80 + 0x80
+        c1 = z1 - z2 * 0x80 + 0x80
+
+        # Cada tramo de bloques consecutivos del mismo ancho se escribe de una vez
+        b = 0
+        while b < len(anchos):
+            ancho = anchos[b]
+            fin = b + 1
+            while fin < len(anchos) and anchos[fin] == ancho:
+                fin += 1
+            i, j = b * BLOQUE_DELTA, min(fin * BLOQUE_DELTA, n)
+            k = j - i
+            if ancho == 1:
+                salida[pos:pos + k] = z[i:j]
+            elif ancho == 2:
+                salida[pos:pos + 2 * k:2] = c0[i:j]
+                salida[pos + 1:pos + 2 * k:2] = z1[i:j]
+            else:
+                salida[pos:pos + 3 * k:3] = c0[i:j]
+                salida[pos + 1:pos + 3 * k:3] = c1[i:j]
+                salida[pos + 2:pos + 3 * k:3] = z2[i:j]
+            pos += ancho * k
+            b = fin
+        return pos
+
+
+# =====================================================
+#            NEGOCIACIÓN DEL PROTOCOLO
+# =====================================================
+# 'PNEG'/'PACK' | version u8 | opciones u8 (bits 4-7: log2 diezmado) | 0xFFFF
+#               | baud u32 | crc16 u16 | 0xFFFF
+
+def leer_negociacion(data):
+    #Devuelve (version, opciones, diezmado, baud) o None si el CRC no coincide
+    version, opc, _, baud, crc, _ = struct.unpack_from('<BBHIHH', data, 4)
+    if binascii.crc32(data[4:12]) & 0xFFFF != crc:
+        return None
+    return version, opc & 0x0F, 1 << (opc >> 4), baud
+
+
+def mensaje_ack(version, opciones, diezmado, baud):
+    #Arma la respuesta de negociación
+    log_d = 0
+    while (1 << (log_d + 1)) <= diezmado:
+        log_d += 1
+    cuerpo = struct.pack('<BBHI', version, (opciones & 0x0F) | (log_d << 4), 0xFFFF, baud)
+    return HEADER_ACK + cuerpo + struct.pack('<HH', binascii.crc32(cuerpo) & 0xFFFF, 0xFFFF)
+
+
+# =====================================================
+#               CANAL DE COMANDOS
+# =====================================================
+# 'PCMD' | comando u8 | secuencia u8 | 0xFFFF | valor u16 | 0xFFFF | crc16 u16 | 0xFFFF
+# 'PRSP' | comando u8 | secuencia u8 | estado u16 | valor u16 | 0xFFFF | crc16 u16 | 0xFFFF
+
+def leer_comando(data):
+    #Devuelve (comando, secuencia, valor) o None si el CRC no coincide
+    comando, secuencia, _, valor, _, crc, _ = struct.unpack_from('<BBHHHHH', data, 4)
+    if binascii.crc32(data[4:12]) & 0xFFFF != crc:
+        return None
+    return comando, secuencia, valor
+
+
+def mensaje_respuesta(comando, secuencia, estado, valor):
+    #Arma la respuesta a un comando con el valor efectivamente aplicado
+    cuerpo = struct.pack('<BBHHH', comando, secuencia, estado, valor & 0xFFFF, 0xFFFF)
+    return HEADER_RSP + cuerpo + struct.pack('<HH', binascii.crc32(cuerpo) & 0xFFFF, 0xFFFF)
+
+
+# =====================================================
+#             TIEMPOS DE CADA TRAMA
+# =====================================================
+# 'PTIM' | muestreo_us u32 | procesar_us u32 | envio_us u32 | crc16 u16 | 0xFFFF
+
+def mensaje_tiempos(muestreo_us, procesar_us, envio_us):
+    #Arma el mensaje con la duración de las etapas de la trama recién enviada
+    cuerpo = struct.pack('<III', muestreo_us & 0xFFFFFFFF, procesar_us & 0xFFFFFFFF,
+                         envio_us & 0xFFFFFFFF)
+    return HEADER_TIM + cuerpo + struct.pack('<HH', binascii.crc32(cuerpo) & 0xFFFF, 0xFFFF)
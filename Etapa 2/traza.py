@@ -0,0 +1,143 @@
+import csv, json, time
+import numpy as np
+
+# Traza de latencia por trama del lado de la PC.
+# Los ganchos de SerialReader y de la GUI anotan instantes de time.perf_counter
+# en un anillo preasignado (un registro por trama). Cada trama recibida se
+# entrega como TramaNumerada, la misma tupla con su número de secuencia, que
+# ubica su registro cuando sale de la cola (aunque otras se hayan descartado):
+#
+#   lectura   read() del puerto devolvió el bloque que completó la trama
+#   trama     el parser validó y decodificó la trama (deframing + CRC)
+#   retirada  la GUI sacó la trama de la cola de entrega
+#   dibujo    inicio y fin de _redraw_plots
+#
+# Con CMD_TRAZA activo, el dispositivo agrega sus duraciones de muestreo,
+# procesamiento y envío (mensaje 'PTIM' que sigue a cada trama).
+#
+# exportar() escribe CSV con los registros crudos o JSON en formato Trace
+# Event (chrome://tracing, ui.perfetto.dev). Las etapas del dispositivo se
+# ubican terminando en el instante de lectura: su duración es exacta, pero la
+# posición en el eje de tiempo es aproximada (no hay reloj común).
+
+CAPACIDAD = 4096
+DT_TRAZA = np.dtype([('secuencia', '<i8'), ('lectura', '<f8'), ('trama', '<f8'),
+                     ('retirada', '<f8'), ('dibujo_ini', '<f8'), ('dibujo_fin', '<f8'),
+                     ('muestreo_us', '<f8'), ('procesar_us', '<f8'), ('envio_us', '<f8')])
+# Etapas del HUD: (nombre, inicio, fin) sobre los campos del registro
+ETAPAS_PC = (('deframing', 'lectura', 'trama'), ('cola', 'trama', 'retirada'),
+             ('dibujo', 'dibujo_ini', 'dibujo_fin'), ('total', 'lectura', 'dibujo_fin'))
+ETAPAS_DISPOSITIVO = ('muestreo_us', 'procesar_us', 'envio_us')
+
+
+class TramaNumerada(tuple):
+    # Tupla de la trama decodificada (se desarma igual) con su número de secuencia
+    def __new__(cls, trama, secuencia):
+        t = super().__new__(cls, trama)
+        t.secuencia = secuencia
+        return t
+
+
+class RegistroTraza:
+    def __init__(self, capacidad=CAPACIDAD):
+        self.registros = np.zeros(capacidad, dtype=DT_TRAZA)
+        self.registros['secuencia'] = -1
+        self.capacidad = capacidad
+        self.secuencia = 0
+        self._ultima = -1                # Posición de la última trama recibida
+        self._actual = -1                # Posición de la última trama retirada por la GUI
+
+    # --- Ganchos ---
+
+    def recibida(self, trama, t_lectura):
+        #SerialReader: trama validada, leída en t_lectura; devuelve la trama numerada a encolar
+        pos = self.secuencia % self.capacidad
+        r = self.registros[pos]
+        r['secuencia'] = self.secuencia
+        r['lectura'] = t_lectura
+        r['trama'] = time.perf_counter()
+        r['retirada'] = r['dibujo_ini'] = r['dibujo_fin'] = np.nan
+        r['muestreo_us'] = r['procesar_us'] = r['envio_us'] = np.nan
+        self._ultima = pos
+        numerada = TramaNumerada(trama, self.secuencia)
+        self.secuencia += 1
+        return numerada
+
+    def dispositivo(self, tiempos):
+        #Parser: tiempos del dispositivo para la trama recién recibida
+        if tiempos is not None and self._ultima >= 0:
+            r = self.registros[self._ultima]
+            r['muestreo_us'], r['procesar_us'], r['envio_us'] = tiempos
+
+    def retirada(self, trama):
+        #GUI: la trama salió de la cola de entrega
+        self._actual = -1
+        secuencia = getattr(trama, 'secuencia', None)
+        if secuencia is None:
+            return                       # Trama de otra fuente (captura, servidor)
+        pos = secuencia % self.capacidad
+        if self.registros[pos]['secuencia'] == secuencia:   # Si no la pisó una más nueva
+            self._actual = pos
+            self.registros[pos]['retirada'] = time.perf_counter()
+
+    def dibujada(self, t_ini, t_fin):
+        #GUI: duración del redibujo de la última trama retirada
+        if self._actual >= 0:
+            r = self.registros[self._actual]
+            r['dibujo_ini'], r['dibujo_fin'] = t_ini, t_fin
+
+    # --- Consulta y exportación ---
+
+    def ordenados(self):
+        #Registros válidos en orden de llegada
+        validos = self.registros[self.registros['secuencia'] >= 0]
+        return validos[np.argsort(validos['secuencia'])]
+
+    def resumen(self, ventana_s=2.0):
+        #Mediana y p99 de cada etapa [ms], fps y tramas/s de los últimos ventana_s segundos
+        r = self.ordenados()
+        ahora = time.perf_counter()
+        r = r[r['lectura'] >= ahora - ventana_s]
+        etapas = {}
+        for nombre, ini, fin in ETAPAS_PC:
+            d = (r[fin] - r[ini]) * 1e3
+            d = d[~np.isnan(d)]
+            if len(d):
+                etapas[nombre] = (float(np.median(d)), float(np.percentile(d, 99)))
+        for campo in ETAPAS_DISPOSITIVO:
+            d = r[campo][~np.isnan(r[campo])] / 1e3
+            if len(d):
+                etapas[campo[:-3]] = (float(np.median(d)), float(np.percentile(d, 99)))
+        dibujadas = np.count_nonzero(~np.isnan(r['dibujo_fin']))
+        return {'etapas': etapas, 'fps': float(dibujadas) / ventana_s, 'recibidas_s': len(r) / ventana_s}
+
+    def exportar(self, path):
+        #Guarda la traza como CSV (registros crudos) o JSON (Trace Event)
+        r = self.ordenados()
+        if not path.endswith('.json'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(DT_TRAZA.names)
+                writer.writerows(r.tolist())
+            return
+        t0 = np.nanmin(r['lectura']) if len(r) else 0.0
+        eventos = []
+
+        def evento(nombre, hilo, ini, dur, secuencia):
+            if not (np.isnan(ini) or np.isnan(dur)):
+                eventos.append({'name': nombre, 'ph': 'X', 'pid': 0, 'tid': hilo,
+                                'ts': (ini - t0) * 1e6, 'dur': dur * 1e6,
+                                'args': {'trama': int(secuencia)}})
+        for x in r:
+            s = x['secuencia']
+            # Dispositivo: muestreo, procesar y envío consecutivos, terminando en la lectura
+            fin = x['lectura']
+            for campo in reversed(ETAPAS_DISPOSITIVO):
+                dur = x[campo] / 1e6
+                evento(campo[:-3], 'dispositivo', fin - dur, dur, s)
+                fin = fin - dur if not np.isnan(dur) else fin
+            evento('deframing', 'lector', x['lectura'], x['trama'] - x['lectura'], s)
+            evento('cola', 'cola', x['trama'], x['retirada'] - x['trama'], s)
+            evento('dibujo', 'gui', x['dibujo_ini'], x['dibujo_fin'] - x['dibujo_ini'], s)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, f)